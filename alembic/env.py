@@ -3,7 +3,7 @@ from logging.config import fileConfig
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 from sqlmodel import SQLModel
-from app.model import event, eventpermission, eventversion, user
+from app.model import event, eventpermission, eventversion, user, revokedtoken
 from app.config import settings
 from alembic import context
 
@@ -0,0 +1,36 @@
+"""add event search index
+
+Revision ID: 178f1fc64eab
+Revises: 97b1885fc116
+Create Date: 2026-10-18 13:05:52.904417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+revision: str = '178f1fc64eab'
+down_revision: Union[str, None] = '97b1885fc116'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # generated column, must match app.model.event.SEARCH_VECTOR_EXPRESSION
+    op.add_column('event', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(
+        "setweight(to_tsvector('simple', title), 'A') "
+        "|| setweight(to_tsvector('simple', description), 'B') "
+        "|| setweight(to_tsvector('simple', coalesce(location, '')), 'C')",
+        persisted=True
+    ), nullable=True))
+    op.create_index('ix_event_search_vector', 'event', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_event_search_vector', table_name='event', postgresql_using='gin')
+    op.drop_column('event', 'search_vector')
@@ -0,0 +1,100 @@
+"""store event versions as deltas
+
+Revision ID: 356778fc2f69
+Revises: b8b1481c4436
+Create Date: 2026-10-18 20:38:33.769132
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = '356778fc2f69'
+down_revision: Union[str, None] = 'b8b1481c4436'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+CONTENT_COLUMNS = (
+    ('title', sa.VARCHAR()),
+    ('description', sa.VARCHAR()),
+    ('start_time', postgresql.TIMESTAMP()),
+    ('end_time', postgresql.TIMESTAMP()),
+    ('is_recurring', sa.BOOLEAN()),
+    ('owner_id', sa.INTEGER()),
+)
+VERSIONED_FIELDS = ('title', 'description', 'start_time', 'end_time', 'location', 'is_recurring', 'recurrence_pattern', 'owner_id')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('eventversion', sa.Column('seq', sa.Integer(), nullable=True))
+    op.add_column('eventversion', sa.Column('is_snapshot', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column('eventversion', sa.Column('changed_fields', sa.ARRAY(sa.String()), nullable=True))
+    # existing versions are full copies: number them in edit order and keep them as snapshots
+    op.execute("""
+        UPDATE eventversion v
+        SET seq = numbered.seq, is_snapshot = true
+        FROM (
+            SELECT id, row_number() OVER (PARTITION BY event_id ORDER BY edited_at, id) AS seq
+            FROM eventversion
+        ) numbered
+        WHERE numbered.id = v.id
+    """)
+    # versions used to store str(RecurrencePattern.WEEKLY); keep the plain value like the API does
+    op.execute("""
+        UPDATE eventversion
+        SET recurrence_pattern = lower(split_part(recurrence_pattern, '.', 2))
+        WHERE recurrence_pattern LIKE 'RecurrencePattern.%'
+    """)
+    op.alter_column('eventversion', 'seq', existing_type=sa.Integer(), nullable=False)
+    op.alter_column('eventversion', 'is_snapshot', existing_type=sa.Boolean(), server_default=None)
+    for column, type_ in CONTENT_COLUMNS:
+        op.alter_column('eventversion', column, existing_type=type_, nullable=True)
+    op.create_index('ix_eventversion_event_id_seq', 'eventversion', ['event_id', 'seq'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # deltas of a deleted event with no snapshot after them have nothing left to rebuild from
+    op.execute("""
+        DELETE FROM eventversion v
+        WHERE NOT v.is_snapshot
+          AND NOT EXISTS (SELECT 1 FROM event e WHERE e.id = v.event_id)
+          AND NOT EXISTS (SELECT 1 FROM eventversion w WHERE w.event_id = v.event_id AND w.seq > v.seq AND w.is_snapshot)
+    """)
+    # turn every delta back into a full copy: a field's value is the one held by the first version at or
+    # after it that stored the field, or the event's current value when no newer version did
+    for field in VERSIONED_FIELDS:
+        holder = f"""
+            FROM eventversion w
+            WHERE w.event_id = v.event_id AND w.seq >= v.seq
+              AND (w.is_snapshot OR '{field}' = ANY(w.changed_fields))
+        """
+        current = f"lower(e.{field}::text)" if field == 'recurrence_pattern' else f"e.{field}"
+        op.execute(f"""
+            UPDATE eventversion v
+            SET {field} = (SELECT w.{field} {holder} ORDER BY w.seq LIMIT 1)
+            WHERE NOT v.is_snapshot AND EXISTS (SELECT 1 {holder})
+        """)
+        op.execute(f"""
+            UPDATE eventversion v
+            SET {field} = {current}
+            FROM event e
+            WHERE e.id = v.event_id AND NOT v.is_snapshot AND NOT EXISTS (SELECT 1 {holder})
+        """)
+    op.execute("""
+        UPDATE eventversion
+        SET recurrence_pattern = 'RecurrencePattern.' || upper(recurrence_pattern)
+        WHERE recurrence_pattern IS NOT NULL
+    """)
+    op.drop_index('ix_eventversion_event_id_seq', table_name='eventversion')
+    for column, type_ in CONTENT_COLUMNS:
+        op.alter_column('eventversion', column, existing_type=type_, nullable=False)
+    op.drop_column('eventversion', 'changed_fields')
+    op.drop_column('eventversion', 'is_snapshot')
+    op.drop_column('eventversion', 'seq')
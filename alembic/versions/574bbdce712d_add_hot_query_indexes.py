@@ -0,0 +1,41 @@
+"""add hot query indexes
+
+Revision ID: 574bbdce712d
+Revises: 81bc1c45c58d
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+revision: str = '574bbdce712d'
+down_revision: Union[str, None] = '81bc1c45c58d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # share_event used to insert a second row when a role changed; keep the latest grant per user
+    op.execute("""
+        DELETE FROM eventpermission a
+        USING eventpermission b
+        WHERE a.event_id = b.event_id
+          AND a.user_id = b.user_id
+          AND a.id < b.id
+    """)
+    op.create_unique_constraint('uq_eventpermission_event_id_user_id', 'eventpermission', ['event_id', 'user_id'])
+    op.create_index('ix_eventpermission_user_id_event_id', 'eventpermission', ['user_id', 'event_id'], unique=False)
+    op.create_index('ix_eventversion_event_id_edited_at', 'eventversion', ['event_id', 'edited_at'], unique=False)
+    op.create_index(op.f('ix_user_email'), 'user', ['email'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_user_email'), table_name='user')
+    op.drop_index('ix_eventversion_event_id_edited_at', table_name='eventversion')
+    op.drop_index('ix_eventpermission_user_id_event_id', table_name='eventpermission')
+    op.drop_constraint('uq_eventpermission_event_id_user_id', 'eventpermission', type_='unique')
@@ -0,0 +1,28 @@
+"""add event keyset index
+
+Revision ID: 97b1885fc116
+Revises: 574bbdce712d
+Create Date: 2026-10-18 11:40:07.552193
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+revision: str = '97b1885fc116'
+down_revision: Union[str, None] = '574bbdce712d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # supports ORDER BY start_time, id with (start_time, id) > (:start_time, :id) in cursor pagination
+    op.create_index('ix_event_start_time_id', 'event', ['start_time', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_event_start_time_id', table_name='event')
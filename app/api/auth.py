@@ -2,10 +2,10 @@ from fastapi import APIRouter, status, Depends, HTTPException, status
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
 from app.schema.User import RegisterUser, ReadUser 
 from app.schema.token import Token
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.db.db_session import get_session
 from app.crud.user import create_user, get_user_by_email
-from app.services.auth_service import create_jwt_token, verify_jwt_token, token_blacklist
+from app.services.auth_service import create_jwt_token, verify_jwt_token, revoke_jwt_token
 from app.utils.hash import verify_hash
 
 router = APIRouter()
@@ -14,9 +14,10 @@ router = APIRouter()
 
 @router.post("/register", status_code=status.HTTP_201_CREATED, response_model=ReadUser, responses={
     400: {"description": "Bad Request"},
-    500: {"description": "Internal Server Error"}
+    500: {"description": "Internal Server Error"},
+    503: {"description": "Too many passwords being hashed, retry after the Retry-After delay"}
 })
-async def register_new_user(user: RegisterUser, session: Session = Depends(get_session))->ReadUser:
+async def register_new_user(user: RegisterUser, session: AsyncSession = Depends(get_session))->ReadUser:
     created_user = await create_user(user=user, session=session)
     return created_user
 
@@ -25,14 +26,14 @@ async def register_new_user(user: RegisterUser, session: Session = Depends(get_s
 @router.post("/login", status_code=status.HTTP_200_OK, response_model=Token, responses={
     403: {"description": "User Not Found"}    
 })
-async def login_and_get_token(user_credentials: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session))->Token:
+async def login_and_get_token(user_credentials: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_session))->Token:
     try:
         user = await get_user_by_email(user_credentials.username, session)        
     except HTTPException as e:
         raise e
-    access_token = await create_jwt_token(data = {"email":user.email, "id": user.id})
     if not await verify_hash(user_credentials.password, user.password_hashed):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Invalid Password or Email Id")
+    access_token = await create_jwt_token(data = {"email":user.email, "id": user.id})
     read_token = Token(access_token=access_token, token_type='bearer')
     return read_token
 
@@ -41,7 +42,7 @@ async def login_and_get_token(user_credentials: OAuth2PasswordRequestForm = Depe
 @router.post("/refresh", status_code=status.HTTP_200_OK, response_model=Token, responses={
     403: {"description": "User Not Found"}    
 })
-async def refresh_token(user_token_data:Token, session: Session = Depends(get_session))->Token:    
+async def refresh_token(user_token_data:Token, session: AsyncSession = Depends(get_session))->Token:    
     credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Invalid Credentials")
     try:        
         user = await verify_jwt_token(token=user_token_data.access_token, credentials_exception=credentials_exception)
@@ -57,14 +58,14 @@ async def refresh_token(user_token_data:Token, session: Session = Depends(get_se
 @router.post("/logout", status_code=status.HTTP_200_OK, responses={
     403: {"description": "User Not Found"}    
 })
-async def invalidate_token(user_token_data:Token, session: Session = Depends(get_session)):    
+async def invalidate_token(user_token_data:Token, session: AsyncSession = Depends(get_session)):    
     credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Invalid Credentials")
     try:        
         user = await verify_jwt_token(token=user_token_data.access_token, credentials_exception=credentials_exception)
         await get_user_by_email(user.email, session)                
     except HTTPException as e:
         raise e    
-    token_blacklist.add(user_token_data.access_token)
+    await revoke_jwt_token(user_token_data.access_token)
     return {"Message":"Logged Out"}
 
 
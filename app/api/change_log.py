@@ -1,56 +1,119 @@
-from fastapi import APIRouter, status, HTTPException, Depends
-from sqlmodel import Session
+from fastapi import APIRouter, status, HTTPException, Depends, Query, Header
+from fastapi.responses import StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.db.db_session import get_session
 from app.services.auth_service import get_current_user
-from app.model.eventversion import EventVersion
+from app.schema.eventversion import ReadEventVersion, ChangelogMode, VersionDiff
 from app.schema.token import TokenUserData
-from app.crud.change_log import get_logs_by_event_id
-from app.crud.collaboration import is_collaborator
-from app.crud.version_history import get_event_version_by_uuid
-from typing import List, Any
+from app.crud.change_log import get_changelog_page, get_latest_version_id, stream_changelog, get_version_diffs
+from app.crud.collaboration import get_role
+from app.schema.permission import EffectiveRole
+from app.crud.version_history import get_event_versions_by_uuids
+from typing import List, Any, Optional
 from uuid import UUID
 from app.utils.compare_version import compare_event_versions
-from fastapi_cache.decorator import cache
+from app.services.response_cache import response_cache, event_tag
+from app.utils.etag import changelog_etag, etag_matches, not_modified
+from pydantic import TypeAdapter
 
 
 router = APIRouter()
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+change_log_adapter = TypeAdapter(List[ReadEventVersion])
+version_diff_adapter = TypeAdapter(dict[str, dict[str, Any]])
+version_diffs_adapter = TypeAdapter(List[VersionDiff])
 
 # GET /api/events/{id}/changelog - Get a chronological log of all changes to an event
 
-@router.get("/{id}/changelog", status_code=status.HTTP_200_OK,response_model=List[EventVersion])
-@cache(expire=10)
-async def get_event_change_logs(id: int, current_user:TokenUserData = Depends(get_current_user), session: Session = Depends(get_session)):
-    logs = await get_logs_by_event_id(id, session)    
-    if not logs:
-        raise HTTPException(status_code=404, detail="Changelogs are not available")
-    has_access = (
-            logs[0].owner_id == current_user.id
-            or await is_collaborator(event_id=id, user_id=current_user.id, session=session)        
-        )        
-    if not has_access:
+@router.get("/{id}/changelog", status_code=status.HTTP_200_OK,response_model=List[ReadEventVersion],
+    responses={
+        200: {"content": {NDJSON_MEDIA_TYPE: {}}, "description": "A page of versions, newest first (mode=stream: every version, one JSON object per line)"},
+        304: {"description": "No version added since the ETag sent in If-None-Match"},
+        400: {"description": "Invalid pagination cursor"},
+        403: {"description": "Permission denied"},
+        404: {"description": "Event or changelog not found"}
+    })
+async def get_event_change_logs(id: int, limit: int = Query(default=100, ge=1, le=1000), cursor: Optional[str] = None, mode: ChangelogMode = ChangelogMode.page, if_none_match: Optional[str] = Header(default=None), current_user:TokenUserData = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
+    role = await get_role(event_id=id, user_id=current_user.id, session=session)
+    if role is None:
+        raise HTTPException(status_code=404, detail=f"Event with id={id} not found")
+    if role not in (EffectiveRole.owner, EffectiveRole.editor):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Permission denied: you are not allowed to view changelog")
-    return logs
+    # the latest version id is an index-only lookup; while it stands, every page is what the client already holds
+    latest_version_id = await get_latest_version_id(id, session)
+    etag = changelog_etag(latest_version_id) if latest_version_id else None
+    if etag and etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    headers = {"ETag": etag} if etag else None
+    if mode == ChangelogMode.stream:
+        # the whole history from the cursor on, read through a server-side cursor and sent as it is rebuilt
+        versions = stream_changelog(id, cursor)
+        return StreamingResponse((version.model_dump_json().encode() + b"\n" async for version in versions), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+    async def load_logs():
+        # keyset pagination over seq, newest first; the next page's cursor is returned in X-Next-Cursor
+        logs, next_cursor = await get_changelog_page(id, limit, cursor, session)
+        if not logs and not cursor:
+            raise HTTPException(status_code=404, detail="Changelogs are not available")
+        return logs, next_cursor
+    return await response_cache.cached_page(
+        # keyed by the latest version as well, so the cached page is never older than the ETag sent with it
+        key=f"changelog:{id}:{latest_version_id}:{role.value}:{limit}:{cursor or ''}",
+        tags=[event_tag(id)],
+        adapter=change_log_adapter,
+        load=load_logs,
+        headers=headers
+    )
 
 # GET /api/events/{id}/diff/{versionId1}/{versionId2} - Get a diff between two versions
 
 @router.get("/{id}/diff/{versionId1}/{versionId2}", status_code=status.HTTP_200_OK,response_model=dict[str, dict[str, Any]])
-@cache(expire=120)
-async def diff_versions(id: int, versionId1: UUID, versionId2: UUID, current_user:TokenUserData = Depends(get_current_user), session: Session = Depends(get_session)):
-    version1 = await get_event_version_by_uuid(id=versionId1, event_id=id, session=session)    
-    version2 = await get_event_version_by_uuid(id=versionId2, event_id=id, session=session)    
-    
-    if not version1:
-        raise HTTPException(status_code=404, detail=f"Event version not found with {versionId1}")
-    if not version2:
-        raise HTTPException(status_code=404, detail=f"Event version not found with {versionId2}")
-    has_access = (
-            version1.owner_id == current_user.id
-            or await is_collaborator(event_id=id, user_id=current_user.id, session=session)        
-        )        
-    if not has_access:
+async def diff_versions(id: int, versionId1: UUID, versionId2: UUID, current_user:TokenUserData = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
+    role = await get_role(event_id=id, user_id=current_user.id, session=session)
+    if role is None:
+        raise HTTPException(status_code=404, detail=f"Event with id={id} not found")
+    if role not in (EffectiveRole.owner, EffectiveRole.editor):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Permission denied: you are not allowed to view difference of versions")
-    
-    version_difference = await compare_event_versions(version1=version1, version2=version2)
+    async def load_difference():
+        # both versions are rebuilt from one query
+        versions = {version.version_id: version for version in await get_event_versions_by_uuids([versionId1, versionId2], event_id=id, session=session)}
+        version1 = versions.get(versionId1)
+        version2 = versions.get(versionId2)
+        
+        if not version1:
+            raise HTTPException(status_code=404, detail=f"Event version not found with {versionId1}")
+        if not version2:
+            raise HTTPException(status_code=404, detail=f"Event version not found with {versionId2}")
+        
+        return await compare_event_versions(version1=version1, version2=version2)
+    return await response_cache.cached_json(
+        key=f"diff:{id}:{versionId1}:{versionId2}:{role.value}",
+        tags=[event_tag(id)],
+        adapter=version_diff_adapter,
+        load=load_difference
+    )
 
-    return version_difference
-    
\ No newline at end of file
+# GET /api/events/{id}/diffs/{versionId1}/{versionId2} - Get every consecutive diff between two versions
+
+@router.get("/{id}/diffs/{versionId1}/{versionId2}", status_code=status.HTTP_200_OK, response_model=List[VersionDiff],
+    responses={
+        403: {"description": "Permission denied"},
+        404: {"description": "Event or version not found"}
+    })
+async def diff_version_range(id: int, versionId1: UUID, versionId2: UUID, current_user:TokenUserData = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
+    role = await get_role(event_id=id, user_id=current_user.id, session=session)
+    if role is None:
+        raise HTTPException(status_code=404, detail=f"Event with id={id} not found")
+    if role not in (EffectiveRole.owner, EffectiveRole.editor):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Permission denied: you are not allowed to view difference of versions")
+    async def load_differences():
+        # the diffs stored with each version, oldest first, whichever order the two versions are given in
+        diffs = await get_version_diffs(id, versionId1, versionId2, session)
+        if diffs is None:
+            raise HTTPException(status_code=404, detail=f"Event version not found with {versionId1} or {versionId2}")
+        return diffs
+    return await response_cache.cached_json(
+        key=f"diffs:{id}:{versionId1}:{versionId2}:{role.value}",
+        tags=[event_tag(id)],
+        adapter=version_diffs_adapter,
+        load=load_differences
+    )
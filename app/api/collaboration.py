@@ -1,15 +1,13 @@
 from fastapi import APIRouter, status, Depends, HTTPException, status
-from app.schema.permission import PermissionInfo, ShareEventRequest, UpdatePermissionRequest
+from app.schema.permission import PermissionInfo, ShareEventRequest, UpdatePermissionRequest, EffectiveRole, PermissionPatchRequest, PermissionOperationType
 from app.schema.token import TokenUserData
 from typing import List
 from copy import deepcopy
 from app.services.auth_service import get_current_user
 from app.db.db_session import get_session
-from app.crud.event import get_event_by_id
-from app.crud.user import get_user_by_id
-from app.crud.collaboration import check_existing_permission, insert_event_permissions_batch, is_collaborator, list_event_permissions, update_event_permission, delete_event_permission
-from sqlmodel import Session
-from fastapi_cache.decorator import cache
+from app.crud.user import get_users_by_ids
+from app.crud.collaboration import insert_event_permissions_batch, get_role, get_effective_role, list_event_permissions, update_event_permission, delete_event_permission, apply_permission_operations
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 router = APIRouter()
 
@@ -21,19 +19,20 @@ router = APIRouter()
         403: {"description": "Permission denied"},
         500: {"description": "Internal server error"}
     })
-async def share_event(id: int, share_event_req: ShareEventRequest, session: Session = Depends(get_session), current_user: TokenUserData = Depends(get_current_user)):
+async def share_event(id: int, share_event_req: ShareEventRequest, session: AsyncSession = Depends(get_session), current_user: TokenUserData = Depends(get_current_user)):
     updated_events = deepcopy(share_event_req)
-    event = await get_event_by_id(id, session)
-    if not event:
+    event, role = await get_effective_role(event_id=id, user_id=current_user.id, session=session)
+    if event is None:
         raise HTTPException(status_code=404, detail=f"Event with id={id} not found")
-    if (event.owner_id != current_user.id and not await is_collaborator(event_id=id, user_id=current_user.id, session=session)):
+    if role not in (EffectiveRole.owner, EffectiveRole.editor):
         raise HTTPException(status_code=403, detail="Permission denied ! You need to be a owner of the event to share")
+    # the upsert would overwrite the owner's own grant, as PATCH /permissions refuses to
+    if any(user_req.user_id == event.owner_id for user_req in share_event_req.users):
+        raise HTTPException(status_code=400, detail="The event owner's permission cannot be modified")
     
-    for user_reqs in share_event_req.users:                    
-            await get_user_by_id(user_reqs.user_id, session)
-    
-    event_req_to_insert = await check_existing_permission(share_event_req=share_event_req, event_id=id, session=session)    
-    await insert_event_permissions_batch(event_req_to_insert=event_req_to_insert, event_id=id, session=session)
+    # one IN query validates every user, one upsert writes every grant
+    await get_users_by_ids([user_req.user_id for user_req in share_event_req.users], session)
+    await insert_event_permissions_batch(event_req_to_insert=share_event_req, event_id=id, session=session)
     return updated_events
 
 # GET /api/events/{id}/permissions - List all permissions for an event
@@ -44,15 +43,36 @@ async def share_event(id: int, share_event_req: ShareEventRequest, session: Sess
         403: {"description": "Permission denied"},
         500: {"description": "Internal server error"}
     })
-async def list_permissions(id: int, session: Session = Depends(get_session), current_user:TokenUserData = Depends(get_current_user)):
-    event = await get_event_by_id(id, session)
-    if not event:
+async def list_permissions(id: int, session: AsyncSession = Depends(get_session), current_user:TokenUserData = Depends(get_current_user)):
+    role = await get_role(event_id=id, user_id=current_user.id, session=session)
+    if role is None:
         raise HTTPException(status_code=404, detail=f"Event with id={id} not found")
-    if (event.owner_id != current_user.id and not await is_collaborator(event_id=id, user_id=current_user.id, session=session)):
+    if role not in (EffectiveRole.owner, EffectiveRole.editor):
         raise HTTPException(status_code=403, detail="Permission denied: you are not allowed to view permissions")
     permissions = await list_event_permissions(event_id=id, session=session)            
     return permissions
 
+# PATCH /api/events/{id}/permissions - Grant, change and revoke access for many users in one transaction
+
+@router.patch("/{id}/permissions", response_model=List[PermissionInfo], status_code=status.HTTP_200_OK,
+    responses={
+        400: {"description": "Bad request"},
+        404: {"description": "Event, user or permission not found"},
+        403: {"description": "Permission denied"},
+        500: {"description": "Internal server error"}
+    })
+async def patch_permissions(id: int, patch_req: PermissionPatchRequest, session: AsyncSession = Depends(get_session), current_user:TokenUserData = Depends(get_current_user)):
+    # authorized once for the whole list; the response is the event's ACL after every operation applied
+    event, role = await get_effective_role(event_id=id, user_id=current_user.id, session=session)
+    if event is None:
+        raise HTTPException(status_code=404, detail=f"Event with id={id} not found")
+    if role not in (EffectiveRole.owner, EffectiveRole.editor):
+        raise HTTPException(status_code=403, detail="Permission denied: you are not allowed to update permissions")
+    granted = [operation.user_id for operation in patch_req.operations if operation.op == PermissionOperationType.grant]
+    if granted:
+        await get_users_by_ids(granted, session)
+    return await apply_permission_operations(event=event, operations=patch_req.operations, session=session)
+
 # PUT /api/events/{id}/permissions/{userId} - Update permissions for a user
 
 @router.put("/{id}/permissions/{user_id}", response_model=PermissionInfo, status_code=status.HTTP_200_OK, 
@@ -61,11 +81,11 @@ async def list_permissions(id: int, session: Session = Depends(get_session), cur
         403: {"description": "Permission denied"},
         500: {"description": "Internal server error"}
     })
-async def update_permission(id: int, user_id: int, permission_req: UpdatePermissionRequest, session: Session = Depends(get_session), current_user:TokenUserData = Depends(get_current_user)):
-    event = await get_event_by_id(id, session)
-    if not event:
+async def update_permission(id: int, user_id: int, permission_req: UpdatePermissionRequest, session: AsyncSession = Depends(get_session), current_user:TokenUserData = Depends(get_current_user)):
+    role = await get_role(event_id=id, user_id=current_user.id, session=session)
+    if role is None:
         raise HTTPException(status_code=404, detail=f"Event with id={id} not found")
-    if (event.owner_id != current_user.id and not await is_collaborator(event_id=id, user_id=current_user.id, session=session)):
+    if role not in (EffectiveRole.owner, EffectiveRole.editor):
         raise HTTPException(status_code=403, detail="Permission denied: you are not allowed to update permissions")
 
     updated_permission = await update_event_permission(event_id=id, user_id=user_id, permission_to_update=permission_req, session=session)
@@ -79,11 +99,11 @@ async def update_permission(id: int, user_id: int, permission_req: UpdatePermiss
         403: {"description": "Permission denied"},
         500: {"description": "Internal server error"}
     })
-async def delete_permission(id: int, user_id: int, session: Session = Depends(get_session), current_user:TokenUserData = Depends(get_current_user)):
-    event = await get_event_by_id(id, session)
-    if not event:
+async def delete_permission(id: int, user_id: int, session: AsyncSession = Depends(get_session), current_user:TokenUserData = Depends(get_current_user)):
+    role = await get_role(event_id=id, user_id=current_user.id, session=session)
+    if role is None:
         raise HTTPException(status_code=404, detail=f"Event with id={id} not found")
-    if (event.owner_id != current_user.id and not await is_collaborator(event_id=id, user_id=current_user.id, session=session)):
+    if role not in (EffectiveRole.owner, EffectiveRole.editor):
         raise HTTPException(status_code=403, detail="Permission denied: you are not allowed to delete permissions")
 
     updated_permission = await delete_event_permission(event_id=id, user_id=user_id, session=session)
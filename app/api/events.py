@@ -1,18 +1,61 @@
-from typing import List, Optional
-from fastapi import APIRouter, status, Depends, HTTPException, status, BackgroundTasks
+import logging
+from typing import List, Optional, Tuple
+from datetime import datetime
+from itertools import islice
+from fastapi import APIRouter, status, Depends, HTTPException, status, Response, Request, Header, Query
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
 from pydantic import EmailStr
 from app.schema.token import TokenUserData
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.db.db_session import get_session
-from app.crud.event import create_event, get_event_by_id, delete_event_by_id, update_event_by_id, create_events_batch, get_all_event_of_current_user
+from app.crud.event import create_event, get_event_by_id, delete_event_by_id, update_event_by_id, get_event_revision, get_events_in_window, create_events_batch, get_all_event_of_current_user, get_event_page_of_current_user
 from app.services.auth_service import get_current_user
-from app.schema.event import Event, ReadEvent, ReadListEvent
+from app.schema.event import Event, ReadEvent, ReadListEvent, EventConflict, EventOccurrence, PaginationMode, SearchMode
 from app.model.event import Event as WriteEvent
-from app.crud.collaboration import is_collaborator, is_viewer
-from app.utils.email_utils import send_email
-from fastapi_cache.decorator import cache
-
+from app.crud.collaboration import get_role
+from app.crud.freebusy import get_owner_conflicts
+from app.schema.permission import EffectiveRole
+from app.services.response_cache import response_cache, event_tag
+from app.services.event_import import stream_import_ndjson
+from app.utils.recurrence import naive_utc, occurrences_in_window
+from app.utils.etag import event_etag, if_match_revisions, etag_matches, not_modified
+from pydantic import TypeAdapter
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
 router = APIRouter()
+read_event_adapter = TypeAdapter(ReadListEvent)
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl")
+
+class UploadProgressResponse(StreamingResponse):
+    # progress is sent while the request body is still being read; under ASGI spec < 2.4 Starlette would
+    # also listen for a disconnect on the same receive channel and swallow the body's chunks
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+
+def window_bounds(window_start: Optional[datetime], window_end: Optional[datetime]) -> Tuple[Optional[datetime], Optional[datetime]]:
+    # event times are stored without a zone; an offset in the window is converted to UTC and dropped
+    window_start = naive_utc(window_start) if window_start else None
+    window_end = naive_utc(window_end) if window_end else None
+    if window_start and window_end and window_end <= window_start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'to' must be after 'from'")
+    return window_start, window_end
+
+async def owner_conflicts(event: WriteEvent, session) -> Optional[List[EventConflict]]:
+    # called once the write is committed: if the database fails the conflict check, the saved event is
+    # returned with conflicts=None (unknown) rather than reported as a failed request
+    try:
+        return await get_owner_conflicts(event, session)
+    except (SQLAlchemyError, HTTPException) as e:
+        # crud reports database failures as 500s; anything else is a real error
+        if isinstance(e, HTTPException) and e.status_code != status.HTTP_500_INTERNAL_SERVER_ERROR:
+            raise
+        logger.exception("Failed to check conflicts of event %s", event.id)
+        return None
 
 # POST /api/events - Create a new event
 
@@ -21,78 +64,111 @@ router = APIRouter()
         400: {"description": "bad request"},
         500: {"description": "internal server error"}
 })
-async def create_new_event(event: Event, current_user:TokenUserData = Depends(get_current_user), session: Session = Depends(get_session)):    
+async def create_new_event(event: Event, current_user:TokenUserData = Depends(get_current_user), session: AsyncSession = Depends(get_session)):    
     event = WriteEvent(**event.model_dump())
     event.owner_id = current_user.id
     created_event = await create_event(event=event, session=session)    
-    return created_event
+    # the event is created either way; occurrences of the owner's other events it overlaps are reported with it
+    result = ReadEvent(**created_event.model_dump())
+    result.conflicts = await owner_conflicts(created_event, session)
+    return result
 
 # GET /api/events - List all events the user has access to with pagination and filtering
 
 @router.get("/", status_code=status.HTTP_200_OK, response_model=List[ReadListEvent], 
     responses={
+        400: {"description": "empty or inverted window"},
         404: {"description": "event not found"},
         500: {"description": "internal server error"}
 })
-async def get_all_event(limit: int = 5, skip: int = 0, search: Optional[str] = "", current_user:TokenUserData = Depends(get_current_user), session: Session = Depends(get_session)):
-    events = await get_all_event_of_current_user(current_user.id, limit, skip, search, session)
+async def get_all_event(response: Response, limit: int = 5, skip: int = 0, search: Optional[str] = "", search_mode: SearchMode = SearchMode.like, pagination: PaginationMode = PaginationMode.offset, cursor: Optional[str] = None, window_start: Optional[datetime] = Query(default=None, alias="from"), window_end: Optional[datetime] = Query(default=None, alias="to"), current_user:TokenUserData = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
+    # the query only returns events the caller holds a permission on, so no further access check is needed
+    # from/to keep events overlapping [from, to), either bound may be left out
+    window_start, window_end = window_bounds(window_start, window_end)
+    if pagination == PaginationMode.cursor:
+        # keyset pagination over (start_time, id); the next page's cursor is returned in X-Next-Cursor
+        events, next_cursor = await get_event_page_of_current_user(current_user.id, limit, cursor, search, session, search_mode, window_start, window_end)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return events
+    # search_mode=fulltext matches title, description and location by word prefix, ranked by relevance
+    events = await get_all_event_of_current_user(current_user.id, limit, skip, search, session, search_mode, window_start, window_end)
     if not events:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Events not found")
-    has_access = (
-        events[0].owner_id == current_user.id
-        or await is_collaborator(event_id=events[0].id, user_id=current_user.id, session=session)
-        or await is_viewer(event_id=events[0].id, user_id=current_user.id, session=session)
-    )    
-    if not has_access:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Permission denied: you are not allowed to view events")
     return events
 
+# GET /api/events/occurrences - Occurrences of every accessible event within a time window
+
+@router.get("/occurrences", status_code=status.HTTP_200_OK, response_model=List[EventOccurrence],
+    responses={
+        400: {"description": "empty or inverted window"},
+        500: {"description": "internal server error"}
+})
+async def get_occurrences(window_start: datetime = Query(alias="from"), window_end: datetime = Query(alias="to"), limit: int = Query(default=1000, ge=1, le=10000), current_user:TokenUserData = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
+    window_start, window_end = window_bounds(window_start, window_end)
+    events = await get_events_in_window(current_user.id, window_start, window_end, session)
+    # [from, to) in start time order; series are expanded lazily, so only the first `limit` occurrences are computed
+    return [
+        EventOccurrence(event_id=event.id, title=event.title, location=event.location, recurrence_pattern=event.recurrence_pattern, start_time=start, end_time=end)
+        for start, end, event in islice(occurrences_in_window(events, window_start, window_end), limit)
+    ]
 
 # GET /api/events/{id} - Get a specific event by ID
 
 @router.get("/{id:int}", status_code=status.HTTP_200_OK, response_model=ReadListEvent, 
     responses={
+        304: {"description": "event unchanged since the ETag sent in If-None-Match"},
         404: {"description": "event not found"},
         500: {"description": "internal server error"}
 })
-@cache(expire=10)
-async def get_event(id: int, current_user:TokenUserData = Depends(get_current_user), session: Session = Depends(get_session)):
-    event = await get_event_by_id(id, session)
-    if not event:
+async def get_event(id: int, if_none_match: Optional[str] = Header(default=None), current_user:TokenUserData = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
+    role = await get_role(event_id=id, user_id=current_user.id, session=session)
+    if role is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Event with id={id} not found")
-    has_access = (
-        event.owner_id == current_user.id
-        or await is_collaborator(event_id=id, user_id=current_user.id, session=session)
-        or await is_viewer(event_id=id, user_id=current_user.id, session=session)
-    )    
-    if not has_access:
+    if role == EffectiveRole.none:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Permission denied: you are not allowed to view event")
-    return event
+    # the validator is an index-only lookup; an unchanged event is neither fetched nor serialized
+    revision = await get_event_revision(id, session)
+    if revision is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Event with id={id} not found")
+    etag = event_etag(id, revision)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    # keyed by revision as well, so the cached body is never older than the ETag sent with it
+    return await response_cache.cached_json(
+        key=f"event:{id}:{revision}:{role.value}",
+        tags=[event_tag(id)],
+        adapter=read_event_adapter,
+        load=lambda: get_event_by_id(id, session),
+        headers={"ETag": etag}
+    )
 
 # PUT /api/events/{id} - Update an event by ID
 
 @router.put('/{id}', status_code=status.HTTP_200_OK, response_model=ReadEvent, summary="Update Event (For Real time update, check your spam too)", 
     responses={
         404: {"description": "event not found"},
+        409: {"description": "event kept changing while the update was retried"},
+        412: {"description": "If-Match does not name the event's current revision"},
         500: {"description": "internal server error"}
     })
-async def update_event(id: int, event: Event, email: EmailStr, background_task: BackgroundTasks, current_user:TokenUserData = Depends(get_current_user), session: Session = Depends(get_session)):    
+async def update_event(id: int, event: Event, response: Response, email: Optional[EmailStr] = None, if_match: Optional[str] = Header(default=None), current_user:TokenUserData = Depends(get_current_user), session: AsyncSession = Depends(get_session)):    
     event = WriteEvent(**event.model_dump())    
     try:
-        event_to_delete = await get_event_by_id(id, session)        
-        if not event_to_delete:
+        role = await get_role(event_id=id, user_id=current_user.id, session=session)
+        if role is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Event with id={id} not found")        
-        has_access = (
-            event_to_delete.owner_id == current_user.id
-            or await is_collaborator(event_id=id, user_id=current_user.id, session=session)        
-        )        
-        if not has_access:
+        if role not in (EffectiveRole.owner, EffectiveRole.editor):
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Permission denied: you are not allowed to update event")
-        event = await update_event_by_id(id, event, email, current_user.id, session)
-        background_task.add_task(send_email, subject="Event Update Notification from CEMS",  body=f"The event with id='{event.id}' and title='{event.title}' has been successfully updated.", to_email=email)        
+        # If-Match: the ETag of the revision the client edited; a newer revision fails with 412 instead of being overwritten
+        # owners and editors get a digest of the edit (and those close after it); `email`, when given, gets it too
+        event = await update_event_by_id(id, event, email or current_user.email, current_user.id, session, expected_revisions=if_match_revisions(if_match, id), notify_email=email)
+        response.headers["ETag"] = event_etag(event.id, event.revision)
     except Exception as e:
         raise HTTPException(status_code=e.status_code, detail=f"{e}")
-    return event
+    result = ReadEvent(**event.model_dump())
+    result.conflicts = await owner_conflicts(event, session)
+    return result
 
 # DELETE /api/events/{id} - Delete an event by ID
 
@@ -101,15 +177,11 @@ async def update_event(id: int, event: Event, email: EmailStr, background_task:
         404: {"description": "event not found"},
         500: {"description": "internal server error"}
     })
-async def delete_event(id: int, current_user:TokenUserData = Depends(get_current_user), session: Session = Depends(get_session)):
-    event_to_delete = await get_event_by_id(id, session)
-    if not event_to_delete:
+async def delete_event(id: int, current_user:TokenUserData = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
+    role = await get_role(event_id=id, user_id=current_user.id, session=session)
+    if role is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Event with id={id} not found")    
-    has_access = (
-            event_to_delete.owner_id == current_user.id
-            or await is_collaborator(event_id=id, user_id=current_user.id, session=session)        
-        )        
-    if not has_access:
+    if role not in (EffectiveRole.owner, EffectiveRole.editor):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Permission denied: you are not allowed to delete event")
     event = await delete_event_by_id(id, session)    
     return event
@@ -123,10 +195,27 @@ async def delete_event(id: int, current_user:TokenUserData = Depends(get_current
         500: {"description": "Internal server error"},
     }
 )
-async def register_events_in_batch(events: List[Event], current_user: TokenUserData = Depends(get_current_user), session: Session = Depends(get_session)):        
-    events = [WriteEvent(**event.model_dump(), owner_id = current_user.id) for event in events]        
-    created_events = await create_events_batch(events=events, session=session)
+async def register_events_in_batch(events: List[Event], current_user: TokenUserData = Depends(get_current_user), session: AsyncSession = Depends(get_session)):        
+    created_events = await create_events_batch(events=events, owner_id=current_user.id, session=session)
     return created_events
 
+# POST /api/events/import - Stream events in as NDJSON (one event per line), inserted chunk by chunk, with progress streamed back
+
+@router.post("/import", status_code=status.HTTP_200_OK, response_class=UploadProgressResponse,
+    responses={
+        200: {"content": {"application/x-ndjson": {}}, "description": "One {\"chunk\": ...} line per committed chunk, then a {\"summary\": ...} line"},
+        415: {"description": "body is not application/x-ndjson"},
+        500: {"description": "Internal server error"},
+    },
+    openapi_extra={"requestBody": {"required": True, "content": {"application/x-ndjson": {"schema": {"type": "string", "format": "binary"}}}}}
+)
+async def import_events(request: Request, current_user: TokenUserData = Depends(get_current_user)):
+    # the body is consumed as it arrives and each chunk is reported once committed; the status is sent with the
+    # first line, so a chunk that fails is reported in its line and the summary lists the first invalid lines
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in NDJSON_CONTENT_TYPES:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=f"Expected one of {', '.join(NDJSON_CONTENT_TYPES)}")
+    return UploadProgressResponse(stream_import_ndjson(request.stream(), owner_id=current_user.id), media_type="application/x-ndjson")
+
 
     
\ No newline at end of file
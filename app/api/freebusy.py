@@ -0,0 +1,34 @@
+from datetime import timedelta
+from fastapi import APIRouter, status, Depends, HTTPException
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.config import settings
+from app.db.db_session import get_session
+from app.services.auth_service import get_current_user
+from app.schema.token import TokenUserData
+from app.schema.freebusy import FreeBusyRequest, FreeBusyResponse
+from app.crud.user import get_users_by_ids
+from app.crud.freebusy import get_freebusy
+from app.utils.recurrence import naive_utc
+
+router = APIRouter()
+
+# POST /api/events/freebusy - Busy blocks of many users and the slots when all of them are free
+
+@router.post("/freebusy", response_model=FreeBusyResponse, status_code=status.HTTP_200_OK,
+    responses={
+        400: {"description": "Invalid window or too many users"},
+        404: {"description": "User not found"},
+        500: {"description": "Internal server error"}
+    })
+async def freebusy(freebusy_req: FreeBusyRequest, current_user: TokenUserData = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
+    # only times are returned, never what the events are
+    window_start, window_end = naive_utc(freebusy_req.window_start), naive_utc(freebusy_req.window_end)
+    if window_end <= window_start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'to' must be after 'from'")
+    if window_end - window_start > timedelta(days=settings.freebusy_max_window_days):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"The window can span at most {settings.freebusy_max_window_days} days")
+    if len(set(freebusy_req.user_ids)) > settings.freebusy_max_users:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {settings.freebusy_max_users} users per request")
+    await get_users_by_ids(freebusy_req.user_ids, session)
+    # every user's events come from one query; recurring ones are expanded within the window
+    return await get_freebusy(freebusy_req.user_ids, window_start, window_end, timedelta(minutes=freebusy_req.min_free_minutes), session)
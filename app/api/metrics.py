@@ -0,0 +1,53 @@
+from fastapi import APIRouter, status, Depends
+from app.db.db_session import get_pool_stats
+from app.services.permission_cache import permission_cache
+from app.services.response_cache import response_cache
+from app.utils.hash import hash_pool
+from app.services.auth_service import token_stats, get_current_user
+from app.services.mail_dispatcher import mail_dispatcher
+from app.services.change_notifier import change_notifier
+
+# pool sizes, queue depths and cache counters describe the deployment's load; only signed-in users see them
+router = APIRouter(dependencies=[Depends(get_current_user)])
+
+# GET /api/metrics/db-pool - Live connection pool statistics
+
+@router.get("/db-pool", status_code=status.HTTP_200_OK)
+async def db_pool_stats():
+    return get_pool_stats()
+
+# GET /api/metrics/permission-cache - Permission cache hit/miss/eviction counters
+
+@router.get("/permission-cache", status_code=status.HTTP_200_OK)
+async def permission_cache_stats():
+    return permission_cache.stats()
+
+# GET /api/metrics/response-cache - Response cache hit ratio and backend usage
+
+@router.get("/response-cache", status_code=status.HTTP_200_OK)
+async def response_cache_stats():
+    return response_cache.stats()
+
+# GET /api/metrics/password-hashing - bcrypt worker pool usage and queue depth
+
+@router.get("/password-hashing", status_code=status.HTTP_200_OK)
+async def password_hashing_stats():
+    return hash_pool.stats()
+
+# GET /api/metrics/auth-tokens - Verified-claims cache and revocation store sizes
+
+@router.get("/auth-tokens", status_code=status.HTTP_200_OK)
+async def auth_token_stats():
+    return token_stats()
+
+# GET /api/metrics/mail - Outbound mail queue depth, throughput, retries and SMTP connections opened
+
+@router.get("/mail", status_code=status.HTTP_200_OK)
+async def mail_stats():
+    return mail_dispatcher.stats()
+
+# GET /api/metrics/notifications - Edits coalesced into digests and the mail they queued
+
+@router.get("/notifications", status_code=status.HTTP_200_OK)
+async def notification_stats():
+    return change_notifier.stats()
@@ -1,54 +1,70 @@
-from fastapi import APIRouter, status, HTTPException, Depends
-from sqlmodel import Session
+from fastapi import APIRouter, status, HTTPException, Depends, Header, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.db.db_session import get_session
 from app.services.auth_service import get_current_user
-from app.model.eventversion import EventVersion
+from app.schema.eventversion import ReadEventVersion
 from app.model.event import Event, RecurrencePattern
 from app.schema.token import TokenUserData
 from uuid import UUID
+from typing import Optional
+from app.utils.etag import event_etag, version_etag, etag_matches, not_modified, if_match_revisions
 from app.crud.version_history import get_event_version_by_uuid
-from app.crud.event import get_event_by_id
-from app.crud.collaboration import is_collaborator
+from app.crud.collaboration import get_role
+from app.schema.permission import EffectiveRole
 from app.crud.event import update_event_by_id
-from fastapi_cache.decorator import cache
+from app.services.response_cache import response_cache, event_tag
+from pydantic import TypeAdapter
 
 router = APIRouter()
+event_version_adapter = TypeAdapter(ReadEventVersion)
 
 # GET /api/events/{id}/history/{versionId} - Get a specific version of an event
 
-@router.get("/{id}/history/{version_id}", status_code=status.HTTP_200_OK,response_model=EventVersion)
-@cache(expire=240)
-async def get_event_version(id: int, version_id: UUID, current_user:TokenUserData = Depends(get_current_user), session: Session = Depends(get_session)):
-    print(version_id)
-    version = await get_event_version_by_uuid(version_id, id, session)    
-    if not version:
-        raise HTTPException(status_code=404, detail="Event version not found")
-    has_access = (
-            version.owner_id == current_user.id
-            or await is_collaborator(event_id=id, user_id=current_user.id, session=session)        
-        )        
-    if not has_access:
+@router.get("/{id}/history/{version_id}", status_code=status.HTTP_200_OK,response_model=ReadEventVersion,
+    responses={
+        304: {"description": "Version already held by the client (If-None-Match)"}
+    })
+async def get_event_version(id: int, version_id: UUID, if_none_match: Optional[str] = Header(default=None), current_user:TokenUserData = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
+    role = await get_role(event_id=id, user_id=current_user.id, session=session)
+    if role is None:
+        raise HTTPException(status_code=404, detail=f"Event with id={id} not found")
+    if role not in (EffectiveRole.owner, EffectiveRole.editor):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Permission denied: you are not allowed to retrieve event version")
-    return version
+    # a version never changes once written, so a client that holds it needs no lookup at all
+    etag = version_etag(version_id)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    async def load_version():
+        version = await get_event_version_by_uuid(version_id, id, session)    
+        if not version:
+            raise HTTPException(status_code=404, detail="Event version not found")
+        return version
+    return await response_cache.cached_json(
+        key=f"version:{id}:{version_id}:{role.value}",
+        tags=[event_tag(id)],
+        adapter=event_version_adapter,
+        load=load_version,
+        headers={"ETag": etag}
+    )
     
 
 
 # POST /api/events/{id}/rollback/{versionId} - Rollback to a previous version
 
-@router.post("/{id}/rollback/{version_id}", status_code=status.HTTP_200_OK)
-async def rollback_event(id: int, version_id: UUID, current_user:TokenUserData=Depends(get_current_user), session: Session = Depends(get_session)):
-    event_exist = await get_event_by_id(id, session)
-    if not event_exist:
+@router.post("/{id}/rollback/{version_id}", status_code=status.HTTP_200_OK,
+    responses={
+        409: {"description": "Event kept changing while the rollback was retried"},
+        412: {"description": "If-Match does not name the event's current revision"}
+    })
+async def rollback_event(id: int, version_id: UUID, response: Response, if_match: Optional[str] = Header(default=None), current_user:TokenUserData=Depends(get_current_user), session: AsyncSession = Depends(get_session)):
+    role = await get_role(event_id=id, user_id=current_user.id, session=session)
+    if role is None:
         raise HTTPException(status_code=404, detail=f"Event with id={id} not found")
+    if role not in (EffectiveRole.owner, EffectiveRole.editor):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Permission denied: you are not allowed to rollback event version")
     version = await get_event_version_by_uuid(version_id, id, session)    
     if not version:
         raise HTTPException(status_code=404, detail="Version not found")
-    has_access = (
-            version.owner_id == current_user.id
-            or await is_collaborator(event_id=id, user_id=current_user.id, session=session)        
-        )        
-    if not has_access:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Permission denied: you are not allowed to rollback event version")
     event = Event(id=id, 
                   title=version.title, 
                   description=version.description, 
@@ -56,6 +72,7 @@ async def rollback_event(id: int, version_id: UUID, current_user:TokenUserData=D
                   end_time=version.end_time,
                   location=version.location,
                   is_recurring=version.is_recurring,
-                  recurrence_pattern=RecurrencePattern[version.recurrence_pattern.split('.')[-1]])
-    updated_event = await update_event_by_id(id=id, event=event, user_id=current_user.id, session=session)    
+                  recurrence_pattern=RecurrencePattern(version.recurrence_pattern) if version.recurrence_pattern else None)
+    updated_event = await update_event_by_id(id=id, event=event, email=current_user.email, user_id=current_user.id, session=session, expected_revisions=if_match_revisions(if_match, id))    
+    response.headers["ETag"] = event_etag(updated_event.id, updated_event.revision)
     return {"detail": f"Event rolled back to version {version_id}", "event": updated_event}
\ No newline at end of file
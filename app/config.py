@@ -11,6 +11,50 @@ class Settings(BaseSettings):
     access_token_expire_minutes: int
     email_password: str
     email_id: str    
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_pool_timeout: float = 30.0
+    db_statement_timeout_ms: int = 15000
+    permission_cache_size: int = 50000
+    permission_cache_ttl_seconds: float = 30.0
+    response_cache_backend: str = "memory"
+    response_cache_max_bytes: int = 64 * 1024 * 1024
+    response_cache_ttl_seconds: int = 300
+    redis_url: str = "redis://localhost:6379/0"
+    password_hash_workers: int = 4
+    password_hash_max_pending: int = 256
+    token_cache_size: int = 100000
+    token_sweep_interval_seconds: float = 60.0
+    token_revocation_backend: str = "database"
+    token_revocation_sync_seconds: float = 5.0
+    token_revocation_full_sync_seconds: float = 300.0
+    token_revocation_bloom_capacity: int = 100000
+    token_revocation_bloom_error_rate: float = 0.01
+    event_batch_chunk_size: int = 1000
+    event_import_max_errors: int = 100
+    event_import_max_line_bytes: int = 65536
+    version_snapshot_interval: int = 10
+    changelog_stream_batch_size: int = 500
+    freebusy_max_users: int = 500
+    freebusy_max_window_days: int = 92
+    conflict_horizon_days: int = 90
+    smtp_host: str = "smtp.gmail.com"
+    smtp_port: int = 587
+    smtp_use_tls: bool = True
+    smtp_auth: bool = True
+    smtp_timeout_seconds: float = 10.0
+    mail_workers: int = 2
+    mail_queue_size: int = 10000
+    mail_batch_size: int = 50
+    mail_max_retries: int = 3
+    mail_retry_backoff_seconds: float = 1.0
+    mail_idle_close_seconds: float = 60.0
+    mail_shutdown_timeout_seconds: float = 10.0
+    notification_debounce_seconds: float = 60.0
+    notification_max_delay_seconds: float = 300.0
+    notification_max_retries: int = 3
     
     class Config:
         env_file = ".env"
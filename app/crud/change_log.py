@@ -1,9 +1,116 @@
+from app.model.event import Event
 from app.model.eventversion import EventVersion
+from app.schema.eventversion import ReadEventVersion, VersionDiff
+from app.crud.version_history import chain_query, read_version, reconstruct_versions, target_seqs, version_chain_query
+from app.db.db_session import async_session_maker
+from app.utils.cursor import encode_cursor, decode_cursor
+from app.utils.version_delta import VERSIONED_FIELDS, VersionChainGap, apply_version, check_follows, event_state
+from app.utils.compare_version import compare_event_versions
+from app.config import settings
 from uuid import UUID
 from sqlmodel import select
-from typing import List
+from sqlalchemy import and_, func, or_
+from typing import AsyncIterator, List, Optional, Tuple
 
-async def get_logs_by_event_id(event_id, session)->List[EventVersion]:        
-        query = select(EventVersion).where(EventVersion.event_id == event_id).order_by(EventVersion.edited_at.desc())
-        result = session.exec(query).all()
-        return result
\ No newline at end of file
+def changelog_query(event_id: int, before_seq: Optional[int]):
+        # newest first by seq, the order the reverse deltas chain in (edit timestamps come from app host clocks
+        # and need not agree with it); served by ix_eventversion_event_id_seq
+        query = select(EventVersion).where(EventVersion.event_id == event_id)
+        if before_seq is not None:
+            query = query.where(EventVersion.seq < before_seq)
+        return query.order_by(EventVersion.seq.desc())
+
+def newer_versions_query(event_id: int, before_seq: int):
+        # versions from the cursor on (i.e. newer than the page) down to the first snapshot among them;
+        # applied to the current event they give the state the page's first delta is relative to
+        newer = and_(EventVersion.event_id == event_id, EventVersion.seq >= before_seq)
+        snapshot_seq = select(func.min(EventVersion.seq)).where(newer, EventVersion.is_snapshot).scalar_subquery()
+        return select(EventVersion).where(
+            newer, or_(snapshot_seq.is_(None), EventVersion.seq <= snapshot_seq)
+        ).order_by(EventVersion.seq.desc())
+
+def latest_version_query(event_id: int):
+        # answered from ix_eventversion_event_id_seq alone, which carries version_id for this lookup
+        return select(EventVersion.version_id).where(EventVersion.event_id == event_id).order_by(EventVersion.seq.desc()).limit(1)
+
+async def get_latest_version_id(event_id: int, session) -> Optional[UUID]:
+        return (await session.exec(latest_version_query(event_id))).first()
+
+def cursor_position(cursor: Optional[str]) -> Optional[int]:
+        # the seq of the last version on the previous page
+        return decode_cursor(cursor, int)[0] if cursor else None
+
+async def get_changelog_page(event_id: int, limit: int, cursor: Optional[str], session) -> Tuple[List[ReadEventVersion], Optional[str]]:
+        # one extra row tells us whether another page exists
+        position = cursor_position(cursor)
+        rows = (await session.exec(changelog_query(event_id, position).limit(limit + 1))).all()
+        page = rows[:limit]
+        if not page:
+            return [], None
+        newer = []
+        if position is not None and not page[0].is_snapshot:
+            newer = (await session.exec(newer_versions_query(event_id, position))).all()
+        versions = (await reconstruct_versions(event_id, newer + page, session))[len(newer):]
+        next_cursor = encode_cursor(page[-1].seq) if len(rows) > limit else None
+        return versions, next_cursor
+
+def stream_changelog(event_id: int, cursor: Optional[str]) -> AsyncIterator[ReadEventVersion]:
+        # the cursor is checked here, before a streamed response has started and a 400 can still be sent
+        return _stream_versions(event_id, cursor_position(cursor))
+
+async def _stream_versions(event_id: int, position: Optional[int]) -> AsyncIterator[ReadEventVersion]:
+        # runs on its own session: a streamed response outlives the request's session dependency
+        async with async_session_maker() as session:
+            # the event and every version are read from one snapshot, so an edit landing mid-stream cannot skew the walk
+            await session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            event = await session.get(Event, event_id)
+            if event is None:
+                return
+            state = event_state(event)
+            newer = None
+            if position is not None:
+                for newer in (await session.exec(newer_versions_query(event_id, position))).all():
+                    state = apply_version(newer, state)
+            # server-side cursor: rows arrive batch by batch and each is rebuilt and sent before the next is fetched
+            query = changelog_query(event_id, position).execution_options(yield_per=settings.changelog_stream_batch_size)
+            result = await session.stream(query)
+            async for version in result.scalars():
+                try:
+                    check_follows(version, newer)
+                    state = apply_version(version, state)
+                    rebuilt = read_version(version, state)
+                except VersionChainGap:
+                    # not relative to the state in hand: rebuilt from the chain as stored instead, which
+                    # fails rather than send a wrong state if the history itself has a gap
+                    chain = (await session.exec(chain_query(event_id, version.seq, version.seq))).all()
+                    rebuilt = (await reconstruct_versions(event_id, chain, session))[0]
+                    state = {field: getattr(rebuilt, field) for field in VERSIONED_FIELDS}
+                newer = version
+                yield rebuilt
+
+
+def version_diffs_query(event_id: int, version_id1: UUID, version_id2: UUID):
+        # the two versions and every one between them, oldest first, with the diff each stored against its predecessor
+        targets = target_seqs(event_id, [version_id1, version_id2]).subquery()
+        return select(EventVersion.version_id, EventVersion.diff).where(
+            EventVersion.event_id == event_id,
+            EventVersion.seq.between(select(func.min(targets.c.seq)).scalar_subquery(), select(func.max(targets.c.seq)).scalar_subquery())
+        ).order_by(EventVersion.seq)
+
+async def get_version_diffs(event_id: int, version_id1: UUID, version_id2: UUID, session) -> Optional[List[VersionDiff]]:
+        # every consecutive diff from the older of the two versions to the newer, oldest first; None if either is missing
+        rows = (await session.exec(version_diffs_query(event_id, version_id1, version_id2))).all()
+        if not rows or {rows[0].version_id, rows[-1].version_id} != {version_id1, version_id2}:
+            return None
+        if all(row.diff is not None for row in rows[1:]):
+            return [
+                VersionDiff(from_version_id=previous.version_id, to_version_id=row.version_id, changes=row.diff)
+                for previous, row in zip(rows, rows[1:])
+            ]
+        # versions written before diffs were stored: rebuild the range and diff it here
+        chain = (await session.exec(version_chain_query([version_id1, version_id2], event_id))).all()
+        versions = (await reconstruct_versions(event_id, chain, session))[::-1][:len(rows)]
+        return [
+            VersionDiff(from_version_id=previous.version_id, to_version_id=version.version_id, changes=await compare_event_versions(previous, version))
+            for previous, version in zip(versions, versions[1:])
+        ]
@@ -1,116 +1,136 @@
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from fastapi import HTTPException, status
-from app.schema.permission import ShareEventRequest, PermissionInfo, UpdatePermissionRequest
+from app.schema.permission import ShareEventRequest, PermissionInfo, UpdatePermissionRequest, EffectiveRole, PermissionOperation, PermissionOperationType
 from app.model.eventpermission import EventPermission, PermissionLevel
 from app.model.event import Event
+from app.model.user import User
+from app.services.permission_cache import permission_cache
+from app.utils.lru_cache import MISSING
 from sqlmodel import select
+from sqlalchemy import ARRAY, Integer, and_, any_, delete, func, literal, update
+from sqlalchemy.dialects.postgresql import insert
 
-async def check_existing_permission(share_event_req: ShareEventRequest, event_id: int, session) -> ShareEventRequest:
-    try:
-        user_ids = [user.user_id for user in share_event_req.users]                
-        query = select(EventPermission.user_id, EventPermission.permission).where(
-            EventPermission.event_id == event_id,
-            EventPermission.user_id.in_(user_ids)
-        )
-        existing_permission = session.exec(query).all()        
-        existing_map = {user_id: permission for user_id, permission in existing_permission}
-        
-        to_update = [
-            user for user in share_event_req.users
-            if existing_map.get(user.user_id) != user.role
-        ]
-
-        return ShareEventRequest(users=to_update)
-
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error checking existing permissions: {str(e)}"
+def _upsert_permissions(event_id: int, roles: Dict[int, PermissionLevel]):
+    # ids and roles travel as two array parameters, so the statement size does not grow with the user count
+    permission_type = EventPermission.__table__.c.permission.type
+    query = insert(EventPermission).from_select(
+        ["event_id", "user_id", "permission"],
+        select(
+            literal(event_id, Integer),
+            func.unnest(literal(list(roles.keys()), ARRAY(Integer))),
+            func.unnest(literal(list(roles.values()), ARRAY(permission_type)))
         )
+    )
+    # (event_id, user_id) is unique, so a changed role updates the existing grant in place
+    # and an unchanged one is left alone
+    return query.on_conflict_do_update(
+        constraint="uq_eventpermission_event_id_user_id",
+        set_={"permission": query.excluded.permission},
+        where=EventPermission.permission.is_distinct_from(query.excluded.permission)
+    )
 
 async def insert_event_permissions_batch(event_req_to_insert: ShareEventRequest, event_id: int, session):
     try:        
-        new_permissions = [
-            EventPermission(
-                event_id=event_id,
-                user_id=user.user_id,
-                permission=user.role
-            )
-            for user in event_req_to_insert.users
-        ]
-        session.add_all(new_permissions)
-        session.commit()
+        # one row per user; when a user is listed twice the last role wins, as it would with one call per entry
+        roles = {user.user_id: user.role for user in event_req_to_insert.users}
+        if roles:
+            await session.exec(_upsert_permissions(event_id, roles))
+            await session.commit()
+            forget_effective_roles(session)
+            permission_cache.invalidate(event_id, roles.keys())
 
         return {"Message": "Permissions successfully assigned"}
 
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to assign permissions: {str(e)}"
         )
 
 
-async def insert_event_permission_owner(events:List[Event], user_id: int, session):
-    try:        
-        permissions = [
-            EventPermission(event_id=event.id, user_id=user_id, permission=PermissionLevel.owner)
-            for event in events
-        ]
+def forget_effective_roles(session):
+    session.info.pop("effective_roles", None)
 
-        session.add_all(permissions)
-        session.commit()
 
-        return {"Message": "Permissions successfully assigned"}
+def effective_role_query(event_id: int, user_id: int):
+    # the event with the user's permission row, if any, in one lookup
+    return select(Event, EventPermission.permission).outerjoin(
+        EventPermission,
+        and_(EventPermission.event_id == Event.id, EventPermission.user_id == user_id)
+    ).where(Event.id == event_id)
 
+
+async def get_effective_role(event_id: int, user_id: int, session) -> Tuple[Optional[Event], EffectiveRole]:
+    # memoized on the request-scoped session so repeated checks in one request hit the database once
+    memo = session.info.setdefault("effective_roles", {})
+    if (event_id, user_id) in memo:
+        return memo[(event_id, user_id)]
+    generation = permission_cache.generation()
+    try:
+        row = (await session.exec(effective_role_query(event_id, user_id))).first()
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to assign permissions: {str(e)}"
+            detail=f"Failed to resolve effective role : {str(e)}"
         )
+    if row is None:
+        result = (None, EffectiveRole.none)
+    else:
+        event, permission = row
+        if event.owner_id == user_id:
+            permission = PermissionLevel.owner
+        permission_cache.set(event_id, user_id, permission, generation)
+        result = (event, _role_for(permission))
+    memo[(event_id, user_id)] = result
+    return result
 
 
-async def is_collaborator(event_id: int, user_id: int, session) -> bool:
-    try:
-        query = select(EventPermission).where(
-            EventPermission.event_id == event_id,
-            EventPermission.user_id == user_id,
-            EventPermission.permission == PermissionLevel.editor  
-        )
-        result = session.exec(query).first()
-        return result is not None
+async def get_role(event_id: int, user_id: int, session) -> Optional[EffectiveRole]:
+    # role-only authorization check; served from the permission cache when possible.
+    # returns None when the event does not exist
+    permission = permission_cache.get(event_id, user_id)
+    if permission is not MISSING:
+        return _role_for(permission)
+    event, role = await get_effective_role(event_id=event_id, user_id=user_id, session=session)
+    return role if event else None
 
-    except Exception as e:
-        session.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to find collaboration status : {str(e)}"
-        )
 
+def _role_for(permission: Optional[PermissionLevel]) -> EffectiveRole:
+    if permission == PermissionLevel.owner:
+        return EffectiveRole.owner
+    if permission == PermissionLevel.editor:
+        return EffectiveRole.editor
+    if permission == PermissionLevel.view:
+        return EffectiveRole.viewer
+    return EffectiveRole.none
 
-async def is_viewer(event_id: int, user_id: int, session) -> bool:
-    try:
-        query = select(EventPermission).where(
-            EventPermission.event_id == event_id,
-            EventPermission.user_id == user_id,
-            EventPermission.permission == PermissionLevel.view  
-        )
-        result = session.exec(query).first()
-        return result is not None
+def notification_recipients_query(event_id: int):
+    # the event with the address of each owner and editor, the collaborators told about edits; viewers are not
+    return (select(Event, User.id, User.email)
+        .join(EventPermission, EventPermission.event_id == Event.id)
+        .join(User, User.id == EventPermission.user_id)
+        .where(Event.id == event_id, EventPermission.permission.in_([PermissionLevel.owner, PermissionLevel.editor])))
 
+async def get_notification_recipients(event_id: int, session) -> Tuple[Optional[Event], Dict[int, str]]:
+    try:
+        rows = (await session.exec(notification_recipients_query(event_id))).all()
+        if not rows:
+            return None, {}
+        return rows[0][0], {user_id: email for _, user_id, email in rows}
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to find viewer status : {str(e)}"
+            detail=f"Failed to get_notification_recipients : {str(e)}"
         )
 
 async def list_event_permissions(event_id: int, session) -> List[PermissionInfo]:
     try:
         
         query = select(EventPermission).where(EventPermission.event_id == event_id)
-        result = session.exec(query).all()
+        result = (await session.exec(query)).all()
         if not result:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Event has no permissions yet")
         
@@ -121,7 +141,7 @@ async def list_event_permissions(event_id: int, session) -> List[PermissionInfo]
         return permissions
 
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to find the list of event permissions : {str(e)}"
@@ -133,7 +153,7 @@ async def update_event_permission(event_id: int, user_id: int, permission_to_upd
             EventPermission.event_id == event_id,
             EventPermission.user_id == user_id
         )
-        existing_permission = session.exec(query).first()
+        existing_permission = (await session.exec(query)).first()
 
         if not existing_permission:
             raise HTTPException(
@@ -143,12 +163,14 @@ async def update_event_permission(event_id: int, user_id: int, permission_to_upd
         
         existing_permission.permission = permission_to_update.permission
 
-        session.commit()
-        session.refresh(existing_permission)
+        await session.commit()
+        forget_effective_roles(session)
+        permission_cache.invalidate(event_id, [user_id])
+        await session.refresh(existing_permission)
         updated_permission = PermissionInfo(user_id=user_id, permission=existing_permission.permission)
         return updated_permission
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to update_event_permission: {str(e)}"
@@ -161,7 +183,7 @@ async def delete_event_permission(event_id: int, user_id: int, session) -> Permi
             EventPermission.event_id == event_id,
             EventPermission.user_id == user_id
         )
-        existing_permission = session.exec(query).first()
+        existing_permission = (await session.exec(query)).first()
         if not existing_permission:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -171,13 +193,81 @@ async def delete_event_permission(event_id: int, user_id: int, session) -> Permi
             user_id=existing_permission.user_id,
             permission=existing_permission.permission
         )
-        session.delete(existing_permission)
-        session.commit()
+        await session.delete(existing_permission)
+        await session.commit()
+        forget_effective_roles(session)
+        permission_cache.invalidate(event_id, [user_id])
 
         return deleted_permission_info
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to delete_event_permission: {str(e)}"
         )
+
+
+async def apply_permission_operations(event: Event, operations: List[PermissionOperation], session) -> List[PermissionInfo]:
+    # grant = upsert, change = update of existing grants only, revoke = delete; everything commits together
+    # or not at all, and each kind of operation is one statement however many users it covers
+    grants: Dict[int, PermissionLevel] = {}
+    changes: Dict[int, PermissionLevel] = {}
+    revokes: List[int] = []
+    seen = set()
+    for operation in operations:
+        if operation.user_id in seen:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"User {operation.user_id} appears in more than one operation")
+        seen.add(operation.user_id)
+        if operation.user_id == event.owner_id:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The event owner's permission cannot be modified")
+        if operation.op == PermissionOperationType.revoke:
+            revokes.append(operation.user_id)
+            continue
+        if operation.role is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{operation.op.value} for user {operation.user_id} needs a role")
+        if operation.op == PermissionOperationType.grant:
+            grants[operation.user_id] = operation.role
+        else:
+            changes[operation.user_id] = operation.role
+
+    try:
+        if grants:
+            await session.exec(_upsert_permissions(event.id, grants))
+        if changes:
+            permission_type = EventPermission.__table__.c.permission.type
+            new_roles = select(
+                func.unnest(literal(list(changes.keys()), ARRAY(Integer))).label("user_id"),
+                func.unnest(literal(list(changes.values()), ARRAY(permission_type))).label("permission")
+            ).subquery()
+            changed = (await session.exec(update(EventPermission)
+                .where(EventPermission.event_id == event.id, EventPermission.user_id == new_roles.c.user_id)
+                .values(permission=new_roles.c.permission)
+                .returning(EventPermission.user_id))).scalars().all()
+            _require_all(changes.keys(), changed)
+        if revokes:
+            revoked = (await session.exec(delete(EventPermission)
+                .where(EventPermission.event_id == event.id, EventPermission.user_id == any_(literal(revokes, ARRAY(Integer))))
+                .returning(EventPermission.user_id))).scalars().all()
+            _require_all(revokes, revoked)
+        acl = (await session.exec(select(EventPermission.user_id, EventPermission.permission)
+            .where(EventPermission.event_id == event.id)
+            .order_by(EventPermission.user_id))).all()
+        await session.commit()
+    except HTTPException:
+        await session.rollback()
+        raise
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to apply_permission_operations: {str(e)}"
+        )
+    forget_effective_roles(session)
+    permission_cache.invalidate(event.id, seen)
+    return [PermissionInfo(user_id=user_id, permission=permission) for user_id, permission in acl]
+
+
+def _require_all(requested, affected):
+    missing = set(requested) - set(affected)
+    if missing:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No permission found for users {sorted(missing)} on this event")
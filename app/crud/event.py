@@ -1,117 +1,294 @@
-from typing import List
+from typing import List, Optional, Tuple
 from fastapi import HTTPException, status
-from app.schema.event import ReadEvent
+from app.schema.event import ReadEvent, SearchMode, Event as NewEvent
 from app.schema.permission import ShareEventRequest, UserPermissionInput, PermissionLevel
-from app.model.event import Event
+from app.model.event import Event, event_period, is_series
 from app.model.eventversion import EventVersion
 from app.model.eventpermission import EventPermission
-from app.crud.collaboration import insert_event_permissions_batch, insert_event_permission_owner
+from app.crud.collaboration import insert_event_permissions_batch, forget_effective_roles
+from app.services.permission_cache import permission_cache
+from app.services.response_cache import response_cache, event_tag
+from app.services.change_notifier import change_notifier
+from app.utils.cursor import encode_cursor, decode_cursor
+from app.utils.version_delta import event_state, step_diff, version_columns
+from app.config import settings
 from sqlmodel import select
+from sqlalchemy import ARRAY, DateTime, Integer, and_, bindparam, func, insert, literal_column, or_, true, tuple_, update
 from uuid import uuid4
+from pydantic_core import to_jsonable_python
 from datetime import datetime
+import re
 
 async def create_event(event: Event, session)->ReadEvent:        
     try:                
         session.add(event)
-        session.commit()    
+        await session.commit()    
     except Exception as e: 
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"{str(e)}")
-    session.refresh(event)
+    await session.refresh(event)
     share_event_req = ShareEventRequest(users=[UserPermissionInput(user_id=event.owner_id, role=PermissionLevel.owner)])
     await insert_event_permissions_batch(event_req_to_insert=share_event_req, event_id=event.id, session=session)
     return event
 
 async def get_event_by_id(id: int, session)->ReadEvent:
         try:
-            event = session.get(Event, id)
+            # reloaded even if the permission check already put it in the session: the response must not be
+            # older than the revision its ETag was taken from
+            event = await session.get(Event, id, populate_existing=True)
             return event
         except Exception as e:
-            session.rollback()
+            await session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Failed to delete_event_by_id : {str(e)}"
             )
         
+def event_revision_query(id: int):
+    # answered from ix_event_id_revision alone, without touching the event row
+    return select(Event.revision).where(Event.id == id)
 
-async def get_all_event_of_current_user(user_id, limit, skip, search, session):    
-    all_post = session.exec(select(Event)
-    .join(EventPermission, EventPermission.event_id == Event.id)
-    .where(
-        EventPermission.user_id == user_id,
-        Event.title.contains(search)
-    )
+async def get_event_revision(id: int, session) -> Optional[int]:
+    try:
+        return (await session.exec(event_revision_query(id))).first()
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get_event_revision : {str(e)}"
+        )
+
+
+def _accessible_by(user_id: int):
+    # semi-join instead of join + DISTINCT: (event_id, user_id) is unique, so no duplicates to remove
+    return Event.id.in_(select(EventPermission.event_id).where(EventPermission.user_id == user_id))
+
+def overlapping_window(window_start: Optional[datetime], window_end: Optional[datetime]) -> list:
+    # events overlapping [window_start, window_end) (either end may be open): the period overlap is what the
+    # GiST index answers, the plain comparisons trim its closed bounds to the exact half-open window
+    window = func.tsrange(bindparam(None, window_start, type_=DateTime), bindparam(None, window_end, type_=DateTime), literal_column("'[]'"))
+    conditions = [event_period.op("&&")(window)]
+    if window_start is not None:
+        conditions.append(Event.end_time > window_start)
+    if window_end is not None:
+        conditions.append(Event.start_time < window_end)
+    return conditions
+
+search_vector = Event.__table__.c.search_vector
+
+def _prefix_tsquery(search: str):
+    # every word must match, the last characters of each word may be a prefix ("quart rev" finds "Quarterly review")
+    terms = re.findall(r"\w+", search or "")
+    if not terms:
+        return None
+    return func.to_tsquery(literal_column("'simple'"), " & ".join(f"{term}:*" for term in terms))
+
+def event_list_query(user_id: int, search: str, search_mode: SearchMode = SearchMode.like, window_start: Optional[datetime] = None, window_end: Optional[datetime] = None):
+    # offset pages: ranked by relevance for a full-text search, otherwise by start time
+    tsquery = _prefix_tsquery(search) if search_mode == SearchMode.fulltext else None
+    if tsquery is not None:
+        query = (select(Event)
+        .where(_accessible_by(user_id), search_vector.op("@@")(tsquery))
+        .order_by(func.ts_rank(search_vector, tsquery).desc(), Event.id))
+    else:
+        query = (select(Event)
+        .where(_accessible_by(user_id), Event.title.contains(search))
+        .order_by(Event.start_time, Event.id))
+    if window_start is not None or window_end is not None:
+        query = query.where(*overlapping_window(window_start, window_end))
+    return query
+
+def event_page_query(user_id: int, cursor: Optional[str], search: str, search_mode: SearchMode = SearchMode.like, window_start: Optional[datetime] = None, window_end: Optional[datetime] = None):
+    # keyset pages: rows are (event, sort key), the key of the last row is the next cursor
+    tsquery = _prefix_tsquery(search) if search_mode == SearchMode.fulltext else None
+    if tsquery is not None:
+        # ranked results page over (rank desc, id)
+        rank = func.ts_rank(search_vector, tsquery)
+        query = select(Event, rank).where(_accessible_by(user_id), search_vector.op("@@")(tsquery))
+        if cursor:
+            last_rank, event_id = decode_cursor(cursor, float, int)
+            query = query.where(or_(rank < last_rank, and_(rank == last_rank, Event.id > event_id)))
+        query = query.order_by(rank.desc(), Event.id)
+    else:
+        query = select(Event, Event.start_time).where(_accessible_by(user_id), Event.title.contains(search))
+        if cursor:
+            start_time, event_id = decode_cursor(cursor, datetime.fromisoformat, int)
+            query = query.where(tuple_(Event.start_time, Event.id) > tuple_(start_time, event_id))
+        query = query.order_by(Event.start_time, Event.id)
+    if window_start is not None or window_end is not None:
+        query = query.where(*overlapping_window(window_start, window_end))
+    return query
+
+async def get_all_event_of_current_user(user_id, limit, skip, search, session, search_mode: SearchMode = SearchMode.like, window_start: Optional[datetime] = None, window_end: Optional[datetime] = None):    
+    all_post = (await session.exec(event_list_query(user_id, search, search_mode, window_start, window_end)
     .limit(limit)
-    .offset(skip)
-    .distinct()).all()
+    .offset(skip))).all()
     if not all_post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="no event found for user")
     return all_post
 
-async def update_event_by_id(id: int, event: Event, email: str, user_id:int, session)->ReadEvent:    
+async def get_event_page_of_current_user(user_id: int, limit: int, cursor: Optional[str], search: str, session, search_mode: SearchMode = SearchMode.like, window_start: Optional[datetime] = None, window_end: Optional[datetime] = None) -> Tuple[List[Event], Optional[str]]:
+    # one extra row tells us whether another page exists
+    rows = (await session.exec(event_page_query(user_id, cursor, search, search_mode, window_start, window_end).limit(limit + 1))).all()
+    events = [event for event, _ in rows[:limit]]
+    if len(rows) <= limit:
+        return events, None
+    last_event, last_key = rows[limit - 1]
+    return events, encode_cursor(last_key, last_event.id)
+
+def occurs_in_window(window_start: datetime, window_end: datetime):
+    # events that can have an occurrence in [window_start, window_end): a one-off event overlapping it,
+    # or a series that started before it ends (series never end); each branch has its own index
+    return or_(and_(*overlapping_window(window_start, window_end)), and_(is_series, Event.start_time < window_end))
+
+def events_in_window_query(user_id: int, window_start: datetime, window_end: datetime):
+    return select(Event).where(_accessible_by(user_id), occurs_in_window(window_start, window_end)).order_by(Event.id)
+
+async def get_events_in_window(user_id: int, window_start: datetime, window_end: datetime, session) -> List[Event]:
     try:
-        event_to_update = session.exec(select(Event).where(Event.id == id)).first()    
-        if event_to_update:
-            event_version = EventVersion(
-                event_id=event_to_update.id,
-                version_id=uuid4(),
-                title=event_to_update.title,
-                description=event_to_update.description,
-                start_time=event_to_update.start_time,
-                end_time=event_to_update.end_time,
-                location=event_to_update.location,
-                is_recurring=event_to_update.is_recurring,
-                recurrence_pattern=str(event_to_update.recurrence_pattern) if event_to_update.recurrence_pattern else None,
-                owner_id=event_to_update.owner_id,
-                edited_by=user_id,
-                edited_at=datetime.now(), 
-                editor_email=email       
+        return (await session.exec(events_in_window_query(user_id, window_start, window_end))).all()
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get_events_in_window : {str(e)}"
+        )
+
+event_table = Event.__table__
+version_table = EventVersion.__table__
+# every column an Event is loaded with (the generated search_vector is never read back)
+event_columns = [column for column in event_table.c if column.name != "search_vector"]
+UPDATE_ATTEMPTS = 5
+
+def _conditional_update(id: int, values: dict, expected_revisions: Optional[List[int]]):
+    # UPDATE event ... FROM (the row as this statement's snapshot sees it, with the event's latest version)
+    # WHERE the revision is still the one that snapshot saw: the old values, the previous version and the new
+    # row all come back from this one statement, and a concurrent edit makes it match nothing instead of waiting
+    # on a lock taken up front
+    current = event_table.alias("current")
+    previous = select(version_table).where(version_table.c.event_id == current.c.id).order_by(version_table.c.seq.desc()).limit(1).lateral("previous")
+    old = select(
+        *[current.c[column.name].label(f"old_{column.name}") for column in event_columns],
+        *[previous.c[column.name].label(f"previous_{column.name}") for column in version_table.c]
+    ).select_from(current.outerjoin(previous, true())).where(current.c.id == id).subquery("old")
+    conditions = [event_table.c.id == old.c.old_id, event_table.c.revision == old.c.old_revision]
+    if expected_revisions is not None:
+        conditions.append(old.c.old_revision.in_(expected_revisions))
+    # ORM-enabled so an Event this session already holds is refreshed from RETURNING rather than left stale
+    return (update(Event)
+        .where(*conditions)
+        .values(**values, revision=Event.revision + 1)
+        .returning(*event_columns, *old.c)
+        .execution_options(synchronize_session="fetch"))
+
+async def update_event_by_id(id: int, event: Event, email: str, user_id:int, session, expected_revisions: Optional[List[int]] = None, notify_email: Optional[str] = None)->ReadEvent:    
+    # expected_revisions comes from If-Match: None writes whatever the current revision is, otherwise the
+    # event must still be at one of them or the update fails with 412
+    values = {field: getattr(event, field) for field in NewEvent.model_fields}
+    try:
+        row = None
+        for _ in range(UPDATE_ATTEMPTS):
+            if expected_revisions == []:
+                break
+            row = (await session.exec(_conditional_update(id, values, expected_revisions))).first()
+            if row is not None:
+                break
+            revision = (await session.exec(event_revision_query(id))).first()
+            if revision is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Event with id={id} not found")
+            if expected_revisions is not None and revision not in expected_revisions:
+                break
+            # edited between this statement's snapshot and its update; the next attempt sees the new row
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED if expected_revisions is not None else status.HTTP_409_CONFLICT,
+                detail=f"Event with id={id} was modified by another request, reload it and retry"
             )
-            session.add(event_version)
-
-        if event_to_update: 
-            event.id = id
-            event_to_update = session.merge(event)
-            session.add(event_to_update)
-            session.commit()
-            session.refresh(event_to_update)             
-        return event_to_update  
+        fields = row._mapping
+        before = event_state(Event(**{column.name: fields[f"old_{column.name}"] for column in event_columns}))
+        updated_event = Event(**{column.name: fields[column.name] for column in event_columns})
+        previous = None
+        if fields["previous_id"] is not None:
+            previous = EventVersion(**{column.name: fields[f"previous_{column.name}"] for column in version_table.c})
+        # the row stays locked by the update until commit, so versions are numbered and stamped in edit order
+        event_version = EventVersion(
+            event_id=id,
+            version_id=uuid4(),
+            edited_by=user_id,
+            edited_at=datetime.now(), 
+            editor_email=email,
+            # diffed once here so history views only read it back
+            diff=to_jsonable_python(step_diff(previous, before, user_id, email)) if previous else None,
+            **version_columns(before, event_state(updated_event), previous.seq + 1 if previous else 1, settings.version_snapshot_interval)
+        )
+        session.add(event_version)
+        await session.commit()
+    except HTTPException:
+        await session.rollback()
+        raise
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to update_event_by_id : {str(e)}"
         ) 
+    await response_cache.invalidate(event_tag(id))
+    # collaborators hear about the edit in a digest, together with the edits that follow it closely
+    change_notifier.edited(id, before, user_id, also_notify=notify_email)
+    return updated_event
      
 
 async def delete_event_by_id(id: int, session)->ReadEvent:       
     try:
-        event = session.get(Event, id)
+        event = await session.get(Event, id)
         if not event:
             return print("Delete Event by ID")   
-        session.delete(event)
-        session.commit()
+        await session.delete(event)
+        await session.commit()
+        forget_effective_roles(session)
+        permission_cache.invalidate_event(id)
+        await response_cache.invalidate(event_tag(id))
         return event
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to delete_event_by_id : {str(e)}"
         )
 
 
-async def create_events_batch(events: List[Event], session) -> List[Event]:
+async def insert_events_with_owner(rows: List[dict], owner_id: int, session) -> List[Event]:
+    # one multi-row INSERT ... RETURNING for the events and one multi-row INSERT for their owner permissions;
+    # the caller owns the transaction
+    created = (await session.exec(insert(Event).returning(Event, sort_by_parameter_order=True), params=rows)).scalars().all()
+    if created:
+        # the ids travel as one array parameter, so the statement compiles once and is reused for every chunk
+        await session.exec(insert(EventPermission.__table__).from_select(
+            ["event_id", "user_id", "permission"],
+            select(
+                func.unnest(bindparam("event_ids", type_=ARRAY(Integer))),
+                bindparam("owner_id", type_=Integer),
+                bindparam("permission", type_=EventPermission.__table__.c.permission.type)
+            )
+        ), params={"event_ids": [event.id for event in created], "owner_id": owner_id, "permission": PermissionLevel.owner})
+    return created
+
+
+async def create_events_batch(events: List[NewEvent], owner_id: int, session) -> List[Event]:
     try:
-        session.add_all(events)
-        session.commit()        
-        for event in events:
-            session.refresh(event)   
-        await insert_event_permission_owner(events=events, user_id=events[0].owner_id, session=session)        
-        return events
+        created = []
+        create_dtm = datetime.now()
+        # chunks keep each statement under the driver's 32767 bind parameter limit
+        chunk_size = settings.event_batch_chunk_size
+        for start in range(0, len(events), chunk_size):
+            rows = [{**event.model_dump(), "owner_id": owner_id, "create_dtm": create_dtm} for event in events[start:start + chunk_size]]
+            created.extend(await insert_events_with_owner(rows, owner_id, session))
+        await session.commit()
+        forget_effective_roles(session)
+        return created
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to create_events_batch : {str(e)}"
         )
-
@@ -0,0 +1,75 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from fastapi import HTTPException, status
+from sqlmodel import select
+from sqlalchemy import ARRAY, Integer, any_, literal
+from app.config import settings
+from app.crud.event import occurs_in_window
+from app.model.event import Event
+from app.model.eventpermission import EventPermission
+from app.schema.event import EventConflict
+from app.schema.freebusy import FreeBusyResponse, TimeBlock, UserBusy
+from app.utils.intervals import find_overlaps, free_slots, merge_intervals
+from app.utils.recurrence import event_occurrences
+
+def busy_events_query(user_ids: List[int], window_start: datetime, window_end: datetime, exclude_event_id: Optional[int] = None):
+    # every event on the users' calendars (any permission, owners included) that can occur in the window,
+    # once per user holding it; the ids travel as one array parameter. Only the columns the expansion reads
+    # are loaded: a month of 200 calendars is thousands of rows, and full Event objects cost more than the sweep
+    query = (select(EventPermission.user_id, Event.id, Event.title, Event.start_time, Event.end_time, Event.is_recurring, Event.recurrence_pattern)
+        .join(Event, Event.id == EventPermission.event_id)
+        .where(EventPermission.user_id == any_(literal(list(user_ids), ARRAY(Integer))), occurs_in_window(window_start, window_end)))
+    if exclude_event_id is not None:
+        query = query.where(Event.id != exclude_event_id)
+    return query
+
+async def get_busy_events(user_ids: List[int], window_start: datetime, window_end: datetime, session, exclude_event_id: Optional[int] = None) -> list:
+    try:
+        return (await session.exec(busy_events_query(user_ids, window_start, window_end, exclude_event_id))).all()
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get_busy_events : {str(e)}"
+        )
+
+def _expanded(rows: list, window_start: datetime, window_end: datetime) -> Dict[int, list]:
+    # occurrences per event, expanded once however many of the users share the event
+    occurrences = {}
+    for event in rows:
+        if event.id not in occurrences:
+            occurrences[event.id] = list(event_occurrences(event, window_start, window_end))
+    return occurrences
+
+async def get_freebusy(user_ids: List[int], window_start: datetime, window_end: datetime, min_free: timedelta, session) -> FreeBusyResponse:
+    rows = await get_busy_events(user_ids, window_start, window_end, session)
+    occurrences = _expanded(rows, window_start, window_end)
+    intervals = defaultdict(list)
+    for event in rows:
+        # an event without duration blocks no time
+        intervals[event.user_id].extend(block for block in occurrences[event.id] if block[0] < block[1])
+    # blocks are clipped to the window; each user's and everyone's together are merged by one sweep each
+    clip = lambda blocks: [(max(start, window_start), min(end, window_end)) for start, end in blocks]
+    busy = {user_id: clip(merge_intervals(intervals[user_id])) for user_id in dict.fromkeys(user_ids)}
+    everyone = merge_intervals(block for blocks in busy.values() for block in blocks)
+    return FreeBusyResponse(
+        busy=[UserBusy(user_id=user_id, busy=[TimeBlock(start=start, end=end) for start, end in blocks]) for user_id, blocks in busy.items()],
+        free=[TimeBlock(start=start, end=end) for start, end in free_slots(everyone, window_start, window_end, min_free)]
+    )
+
+async def get_owner_conflicts(event: Event, session) -> List[EventConflict]:
+    # occurrences of the owner's other events overlapping this one's; a series is checked over the
+    # next conflict_horizon_days from its start
+    window_start = event.start_time
+    window_end = max(event.end_time, event.start_time + timedelta(days=settings.conflict_horizon_days)) if event.is_recurring and event.recurrence_pattern else event.end_time
+    if window_end <= window_start:
+        return []
+    rows = await get_busy_events([event.owner_id], window_start, window_end, session, exclude_event_id=event.id)
+    occurrences = _expanded(rows, window_start, window_end)
+    candidates = [(start, end, None) for start, end in event_occurrences(event, window_start, window_end)]
+    busy = [(start, end, (other, start, end)) for other in rows for start, end in occurrences[other.id]]
+    conflicts = {}
+    for _, (other, start, end) in find_overlaps(candidates, busy):
+        conflicts[(other.id, start)] = EventConflict(event_id=other.id, title=other.title, start_time=start, end_time=end)
+    return sorted(conflicts.values(), key=lambda conflict: (conflict.start_time, conflict.event_id))
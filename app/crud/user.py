@@ -1,34 +1,53 @@
+from typing import List
 from fastapi import HTTPException, status
 from app.schema.User import RegisterUser, ReadUser
 from app.utils.hash import hash, verify_hash
 from sqlalchemy.exc import IntegrityError
 from app.model.user import User
 from sqlmodel import select
+from sqlalchemy import ARRAY, Integer, any_, literal
 
 async def create_user(user: RegisterUser, session)->ReadUser:    
+    # hashed before the try: a saturated hash pool answers 503 with Retry-After, which must reach the client as is
+    password_hashed = await hash(user.password)
     try:        
-        db_user = User(username=user.username, email=user.email, password_hashed = await hash(user.password))
+        db_user = User(username=user.username, email=user.email, password_hashed=password_hashed)
         session.add(db_user)
-        session.commit()
+        await session.commit()
     except IntegrityError:        
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email is already registered !")
     except Exception as e: 
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"{str(e)}")
-    session.refresh(db_user)
+    await session.refresh(db_user)
     return db_user
 
+def user_by_email_query(email: str):
+    return select(User).where(User.email == email)
+
 async def get_user_by_email(email: str, session):
-        user = session.exec(select(User).where(User.email == email)).first()
+        user = (await session.exec(user_by_email_query(email))).first()
         if user:
             return user
         else:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User not found in the system")        
 
 async def get_user_by_id(id: int, session):
-        user = session.exec(select(User).where(User.id == id)).first()
+        user = (await session.exec(select(User).where(User.id == id))).first()
         if user:
             return user
         else:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User {id} not found in the system")                
\ No newline at end of file
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User {id} not found in the system")
+
+def users_by_ids_query(ids: List[int]):
+    # a single array parameter instead of one bind per id
+    return select(User).where(User.id == any_(literal(list(ids), ARRAY(Integer))))
+
+async def get_users_by_ids(ids: List[int], session) -> List[User]:
+        ids = set(ids)
+        users = (await session.exec(users_by_ids_query(list(ids)))).all()
+        missing = ids - {user.id for user in users}
+        if missing:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Users {sorted(missing)} not found in the system")
+        return users
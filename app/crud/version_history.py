@@ -1,17 +1,81 @@
 from fastapi import HTTPException, status
+from app.model.event import Event
 from app.model.eventversion import EventVersion
+from app.schema.eventversion import ReadEventVersion
+from app.utils.version_delta import VersionChainGap, event_state, reconstruct
 from uuid import UUID
 from sqlmodel import select
+from sqlalchemy import func, or_
+from typing import List, Optional
 
-async def get_event_version_by_uuid(id:UUID, event_id, session)->EventVersion:        
+def read_version(version: EventVersion, state: dict) -> ReadEventVersion:
+        return ReadEventVersion(
+            id=version.id,
+            event_id=version.event_id,
+            version_id=version.version_id,
+            edited_by=version.edited_by,
+            edited_at=version.edited_at,
+            editor_email=version.editor_email,
+            **state
+        )
+
+async def _walk(event_id: int, versions: List[EventVersion], session) -> List[ReadEventVersion]:
+        current_state = {}
+        if versions and not versions[0].is_snapshot:
+            # reloaded: the deltas just read are relative to the event as it is now, not as the permission check saw it
+            event = await session.get(Event, event_id, populate_existing=True)
+            if event is None:
+                return []
+            current_state = event_state(event)
+        return [read_version(version, state) for version, state in reconstruct(versions, current_state)]
+
+async def reconstruct_versions(event_id: int, versions: List[EventVersion], session) -> List[ReadEventVersion]:
+        # versions newest first; the event itself is only read when the walk does not start at a snapshot
+        try:
+            return await _walk(event_id, versions, session)
+        except VersionChainGap:
+            # the rows given were not one contiguous seq run: rebuild them from the chain as stored
+            chain = (await session.exec(chain_query(event_id, versions[-1].seq, versions[0].seq))).all()
+        try:
+            wanted = {version.id for version in versions}
+            return [version for version in await _walk(event_id, chain, session) if version.id in wanted]
+        except VersionChainGap as e:
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Version history is incomplete: {e}")
+
+def target_seqs(event_id: int, ids: List[UUID]):
+        return select(EventVersion.seq).where(EventVersion.event_id == event_id, EventVersion.version_id.in_(ids))
+
+def chain_query(event_id: int, low_seq, high_seq):
+        # versions low_seq..high_seq and every newer one up to the first snapshot at or after high_seq,
+        # newest first: what it takes to rebuild them (the bounds may be scalar subqueries)
+        snapshot_seq = select(func.min(EventVersion.seq)).where(
+            EventVersion.event_id == event_id, EventVersion.is_snapshot, EventVersion.seq >= high_seq
+        ).scalar_subquery()
+        return select(EventVersion).where(
+            EventVersion.event_id == event_id,
+            EventVersion.seq >= low_seq,
+            or_(snapshot_seq.is_(None), EventVersion.seq <= snapshot_seq)
+        ).order_by(EventVersion.seq.desc())
+
+def version_chain_query(ids: List[UUID], event_id: int):
+        # the requested versions, every version between them and every newer one up to the first snapshot
+        # at or after the newest of them, newest first
+        targets = target_seqs(event_id, ids).subquery()
+        return chain_query(event_id, select(func.min(targets.c.seq)).scalar_subquery(), select(func.max(targets.c.seq)).scalar_subquery())
+
+async def get_event_versions_by_uuids(ids: List[UUID], event_id, session) -> List[ReadEventVersion]:
+        # rebuilt from one query; versions that do not exist are left out, the rest come back newest first
         try:                
-            query = select(EventVersion).where(EventVersion.version_id == id, EventVersion.event_id == event_id)
-            result = session.exec(query).first()
-            return result
+            chain = (await session.exec(version_chain_query(ids, event_id))).all()
+            versions = await reconstruct_versions(event_id, chain, session)
+            return [version for version in versions if version.version_id in ids]
         except Exception as e:
-            session.rollback()
+            await session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to get_event_version_by_uuid : {str(e)}"
+                detail=f"Failed to get_event_versions_by_uuids : {str(e)}"
             ) 
-        
\ No newline at end of file
+
+async def get_event_version_by_uuid(id:UUID, event_id, session)->Optional[ReadEventVersion]:        
+        versions = await get_event_versions_by_uuids([id], event_id, session)
+        return versions[0] if versions else None
@@ -1,32 +1,50 @@
-from sqlmodel import create_engine, SQLModel, Session
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from app.config import settings
+from app.db.pool_metrics import InstrumentedAsyncQueuePool, pool_metrics
 
-POSTGRESS_SQL_DATABASE_URL = f"postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}/{settings.database_name}"
+POSTGRESS_SQL_DATABASE_URL = f"postgresql+asyncpg://{settings.database_username}:{settings.database_password}@{settings.database_hostname}/{settings.database_name}"
 #echo for printing the table creation logs
-# engine = create_engine(POSTGRESS_SQL_DATABASE_URL, echo=True)
-engine = create_engine(POSTGRESS_SQL_DATABASE_URL)
-
-
-def create_tables():
+# engine = create_async_engine(POSTGRESS_SQL_DATABASE_URL, echo=True)
+engine = create_async_engine(
+    POSTGRESS_SQL_DATABASE_URL,
+    poolclass=InstrumentedAsyncQueuePool,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
+    pool_timeout=settings.db_pool_timeout,
+    connect_args={"server_settings": {"statement_timeout": str(settings.db_statement_timeout_ms)}},
+)
+
+# expire_on_commit is disabled so committed objects can still be serialized
+# without triggering an implicit (and in async mode, illegal) lazy reload
+async_session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def create_tables():
     print(POSTGRESS_SQL_DATABASE_URL)
-    SQLModel.metadata.create_all(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
     print("DB tables initiated at", engine.url)
     return "CEMS DB Connected"
 
-def close_connection():
-    engine.dispose()
+async def close_connection():
+    await engine.dispose()
     return "CEMS DB Disconnected"
 
-def drop_tables():
-    SQLModel.metadata.drop_all(engine)
+async def drop_tables():
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
     return "CEMS DB Tables Droped"
 
-def get_session() -> Session: # type: ignore
-    with Session(engine) as session:
+def get_pool_stats() -> dict:
+    return pool_metrics.snapshot(engine.pool)
+
+async def get_session() -> AsyncSession: # type: ignore
+    async with async_session_maker() as session:
         try:
             yield session
         finally:
-            session.close()
-
-
-
+            await session.close()
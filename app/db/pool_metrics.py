@@ -0,0 +1,58 @@
+import time
+from threading import Lock
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.peak_overflow = 0
+
+    def record_checkout(self, waited: float, overflow: int):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            self.peak_overflow = max(self.peak_overflow, overflow)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            avg_wait = self.total_wait_seconds / self.checkouts if self.checkouts else 0.0
+            return {
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                # overflow() is negative while the pool is still below pool_size
+                "overflow": max(pool.overflow(), 0),
+                "peak_overflow": self.peak_overflow,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_checkout_wait_ms": round(avg_wait * 1000, 3),
+                "max_checkout_wait_ms": round(self.max_wait_seconds * 1000, 3),
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.record_timeout()
+            raise
+        pool_metrics.record_checkout(time.perf_counter() - start, self.overflow())
+        return connection
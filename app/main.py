@@ -1,22 +1,37 @@
 from fastapi import FastAPI
-from fastapi_cache import FastAPICache
-from fastapi_cache.backends.inmemory import InMemoryBackend
-from app.api import auth, events, collaboration, version_history, change_log
+from app.api import auth, events, collaboration, version_history, change_log, freebusy, metrics
 from contextlib import asynccontextmanager
 from app.model import *
 from app.config import settings
+from app.db.db_session import close_connection
+from app.services.response_cache import response_cache
+from app.utils.hash import hash_pool
+from app.services.mail_dispatcher import mail_dispatcher
+from app.services.change_notifier import change_notifier
+from app.services.auth_service import sweep_expired_tokens, sync_revocations
+from app.services.revocation import revocation_store
+import asyncio
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):    
-    # app.state.db = drop_tables()
-    # app.state.db = create_tables()         
-    FastAPICache.init(InMemoryBackend(), prefix="fastapi-cache")       
-    
+    # app.state.db = await drop_tables()
+    # app.state.db = await create_tables()         
+    token_sweeper = asyncio.create_task(sweep_expired_tokens(settings.token_sweep_interval_seconds))
+    revocation_syncer = asyncio.create_task(sync_revocations(settings.token_revocation_sync_seconds))
     yield
 
-    # app.state.db = close_connection()
+    token_sweeper.cancel()
+    revocation_syncer.cancel()
+    # open digests are sent before the mail workers drain and the database goes away
+    await change_notifier.flush_all()
+    await revocation_store.close()
+    await response_cache.close()
+    hash_pool.shutdown()
+    # lets queued mail go out, without holding shutdown past the timeout
+    await asyncio.to_thread(mail_dispatcher.shutdown, settings.mail_shutdown_timeout_seconds)
+    app.state.db = await close_connection()
 
 
 
@@ -54,6 +69,8 @@ app.include_router(events.router,prefix="/api/events", tags=["Event Management"]
 app.include_router(collaboration.router, prefix="/api/events", tags=["Collaboration"])
 app.include_router(version_history.router, prefix="/api/events", tags=["Version History"])
 app.include_router(change_log.router, prefix="/api/events", tags=["Changelog & Diff"])
+app.include_router(freebusy.router, prefix="/api/events", tags=["Scheduling"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["Metrics"])
 
 @app.get("/")
 async def root():
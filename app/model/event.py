@@ -1,4 +1,6 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Column, Computed, Index, and_, func, literal_column, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 
 from typing import Optional, List
 from app.db.db_session import engine
@@ -14,6 +16,11 @@ class RecurrencePattern(str, Enum):
 
 
 class Event(SQLModel, table = True):
+    __table_args__ = (
+        Index("ix_event_start_time_id", "start_time", "id"),
+        # covers the revision lookup behind ETags and If-None-Match, so it can skip the heap (see app.crud.event)
+        Index("ix_event_id_revision", "id", unique=True, postgresql_include=["revision"]),
+    )
     id: int = Field(default=None, primary_key=True)
     title: str
     description: str
@@ -24,7 +31,33 @@ class Event(SQLModel, table = True):
     recurrence_pattern: Optional[RecurrencePattern] 
     owner_id: int = Field(foreign_key="user.id")
     create_dtm: Optional[datetime] = Field(default_factory=datetime.now)
+    # bumped by every update; If-Match and ETags carry it (app.utils.etag)
+    revision: int = Field(default=1, sa_column_kwargs={"server_default": text("1")})
     permissions: List["EventPermission"] = Relationship(
         back_populates="event",
         sa_relationship_kwargs={"cascade": "all, delete-orphan"}        
     )
+
+
+# weighted tsvector over title (A), description (B) and location (C), kept up to date by postgres.
+# It is added to the table after mapping so it is never loaded with Event rows; query it through
+# Event.__table__.c.search_vector. 'simple' keeps words unstemmed so a typed prefix ("plann")
+# still matches "planning".
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('simple', title), 'A') "
+    "|| setweight(to_tsvector('simple', description), 'B') "
+    "|| setweight(to_tsvector('simple', coalesce(location, '')), 'C')"
+)
+Event.__table__.append_column(Column("search_vector", TSVECTOR, Computed(SEARCH_VECTOR_EXPRESSION, persisted=True)))
+Index("ix_event_search_vector", Event.__table__.c.search_vector, postgresql_using="gin")
+# the column's statistics target is raised to 1000 by migration 5d2e8b7c41a9 so prefix searches are
+# estimated from enough lexemes to keep the planner walking the user's events (scripts/check_query_plans)
+
+# closed [start_time, end_time] of each event for overlap queries ("what is on between Monday and Friday"),
+# answered by a GiST index. greatest() keeps the range valid for rows whose end precedes their start; being
+# closed, it only widens what a half-open window matches, so queries add the exact comparisons on top.
+event_period = func.tsrange(Event.start_time, func.greatest(Event.start_time, Event.end_time), literal_column("'[]'"))
+Index("ix_event_period", event_period, postgresql_using="gist")
+# recurring series, which match any window after their start (app.crud.event.get_events_in_window)
+is_series = and_(Event.is_recurring, Event.recurrence_pattern.is_not(None))
+Index("ix_event_series_start_time", Event.start_time, postgresql_where=is_series)
@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index, UniqueConstraint
 from enum import Enum
 from typing import Optional
 
@@ -8,6 +9,10 @@ class PermissionLevel(str, Enum):
     view = "viewer"
 
 class EventPermission(SQLModel, table=True):
+    __table_args__ = (
+        UniqueConstraint("event_id", "user_id", name="uq_eventpermission_event_id_user_id"),
+        Index("ix_eventpermission_user_id_event_id", "user_id", "event_id"),
+    )
     id: int = Field(default=None, primary_key=True)
     event_id: int = Field(foreign_key="event.id")
     user_id: int = Field(foreign_key="user.id")
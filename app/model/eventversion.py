@@ -1,20 +1,36 @@
 from sqlmodel import SQLModel, Field
-from typing import Optional
+from sqlalchemy import ARRAY, JSON, Column, Index, String
+from typing import Any, Dict, List, Optional
 from uuid import UUID, uuid4
 from datetime import datetime
 
 class EventVersion(SQLModel, table=True):
+    __table_args__ = (
+        # changelog pages seek on seq, and version_id is carried along so the changelog's ETag (its latest
+        # version) is an index-only lookup
+        Index("ix_eventversion_event_id_seq", "event_id", "seq", unique=True, postgresql_include=["version_id"]),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     event_id: int
     version_id: UUID = Field(default_factory=uuid4, index=True, unique=True)
-    title: str
-    description: str
-    start_time: datetime
-    end_time: datetime
-    location: Optional[str]
-    is_recurring: bool
-    recurrence_pattern: Optional[str]
-    owner_id: int 
+    # position in the event's history, 1 for the first edit
+    seq: int
+    # a snapshot holds every field below; any other version only the fields named in changed_fields
+    # (their values before the edit), see app.utils.version_delta
+    is_snapshot: bool = Field(default=False)
+    changed_fields: Optional[List[str]] = Field(default=None, sa_column=Column(ARRAY(String)))
+    # compare_event_versions output against the previous version, stored when the version is written
+    # (json rather than jsonb keeps its key order); NULL on an event's first version and on versions
+    # written before diffs were recorded
+    diff: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON))
+    title: Optional[str] = None
+    description: Optional[str] = None
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    location: Optional[str] = None
+    is_recurring: Optional[bool] = None
+    recurrence_pattern: Optional[str] = None
+    owner_id: Optional[int] = None
     edited_by: int = Field(foreign_key="user.id")
     edited_at: datetime = Field(default_factory=datetime.now)        
     editor_email: Optional[str] = Field(default=None)
\ No newline at end of file
@@ -0,0 +1,13 @@
+from typing import Optional
+from sqlalchemy import text
+from sqlmodel import SQLModel, Field
+
+
+class RevokedToken(SQLModel, table=True):
+    # sha256 of the bearer token; rows are deleted once the token would have expired anyway
+    token_hash: str = Field(primary_key=True, max_length=64)
+    # the token's exp claim (unix seconds)
+    expires_at: int = Field(index=True)
+    # when it was revoked (unix seconds, by the database clock): workers sync only the revocations made since their last look
+    revoked_at: Optional[float] = Field(default=None, nullable=False, index=True,
+                                        sa_column_kwargs={"server_default": text("extract(epoch from clock_timestamp())")})
@@ -8,7 +8,7 @@ class User(SQLModel, table = True):
     id: int = Field(default=None, primary_key=True)
     # username: str = Field(default=None, primary_key=True)
     username: str 
-    email: EmailStr 
+    email: EmailStr = Field(index=True)
     # email: EmailStr = Field(index=True, unique=True)
     password_hashed: str
     create_dtm: Optional[datetime.datetime] = Field(default_factory=datetime.datetime.now)
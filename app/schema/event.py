@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 
 class RecurrencePattern(str, Enum):
@@ -9,6 +9,14 @@ class RecurrencePattern(str, Enum):
     MONTHLY = "monthly"
     YEARLY = "yearly"
 
+class PaginationMode(str, Enum):
+    offset = "offset"
+    cursor = "cursor"
+
+class SearchMode(str, Enum):
+    like = "like"
+    fulltext = "fulltext"
+
 class Event(BaseModel):        
     title: str 
     description: str 
@@ -18,6 +26,13 @@ class Event(BaseModel):
     is_recurring: bool  
     recurrence_pattern: Optional[RecurrencePattern]     
 
+class EventConflict(BaseModel):
+    # an occurrence of another event on the owner's calendar that overlaps the event
+    event_id: int
+    title: str
+    start_time: datetime
+    end_time: datetime
+
 class ReadEvent(BaseModel):     
     title: str 
     description: str 
@@ -27,6 +42,9 @@ class ReadEvent(BaseModel):
     is_recurring: bool  
     owner_id: int
     recurrence_pattern: Optional[RecurrencePattern]         
+    revision: int
+    # None when the conflict check could not be run; the event itself was saved
+    conflicts: Optional[List[EventConflict]] = []
 
 class ReadEvent(BaseModel):     
     title: str 
@@ -37,6 +55,9 @@ class ReadEvent(BaseModel):
     is_recurring: bool  
     owner_id: int
     recurrence_pattern: Optional[RecurrencePattern]   
+    revision: int
+    # None when the conflict check could not be run; the event itself was saved
+    conflicts: Optional[List[EventConflict]] = []
 
 class ReadListEvent(BaseModel):     
     id: int
@@ -47,4 +68,13 @@ class ReadListEvent(BaseModel):
     location: Optional[str] 
     is_recurring: bool  
     owner_id: int
-    recurrence_pattern: Optional[RecurrencePattern]  
\ No newline at end of file
+    recurrence_pattern: Optional[RecurrencePattern]  
+    revision: int
+
+class EventOccurrence(BaseModel):
+    event_id: int
+    title: str
+    location: Optional[str]
+    recurrence_pattern: Optional[RecurrencePattern]
+    start_time: datetime
+    end_time: datetime
\ No newline at end of file
@@ -1,7 +1,8 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Dict, Optional
 from uuid import UUID
 from datetime import datetime
+from enum import Enum
 
 
 class ReadEventVersion(BaseModel):
@@ -15,8 +16,10 @@ class ReadEventVersion(BaseModel):
     location: Optional[str]
     is_recurring: bool
     recurrence_pattern: Optional[str]
+    owner_id: int
     edited_by: int
     edited_at: datetime
+    editor_email: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -35,3 +38,14 @@ class CreateEventVersion(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class ChangelogMode(str, Enum):
+    page = "page"
+    stream = "stream"
+
+
+class VersionDiff(BaseModel):
+    from_version_id: UUID
+    to_version_id: UUID
+    changes: Dict[str, Dict[str, Any]]
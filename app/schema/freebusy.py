@@ -0,0 +1,24 @@
+from pydantic import BaseModel, ConfigDict, Field
+from datetime import datetime
+from typing import List
+
+class FreeBusyRequest(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+    user_ids: List[int] = Field(min_length=1)
+    window_start: datetime = Field(alias="from")
+    window_end: datetime = Field(alias="to")
+    # free slots shorter than this are left out
+    min_free_minutes: int = Field(default=0, ge=0)
+
+class TimeBlock(BaseModel):
+    start: datetime
+    end: datetime
+
+class UserBusy(BaseModel):
+    user_id: int
+    busy: List[TimeBlock]
+
+class FreeBusyResponse(BaseModel):
+    busy: List[UserBusy]
+    # when every requested user is free
+    free: List[TimeBlock]
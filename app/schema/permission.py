@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from enum import Enum
 
 class PermissionLevel(str, Enum):
@@ -7,6 +7,12 @@ class PermissionLevel(str, Enum):
     editor = "editor"
     view = "viewer"
 
+class EffectiveRole(str, Enum):
+    owner = "owner"
+    editor = "editor"
+    viewer = "viewer"
+    none = "none"
+
 class UserPermissionInput(BaseModel):
     user_id: int
     role: PermissionLevel
@@ -21,3 +27,16 @@ class PermissionInfo(BaseModel):
 class UpdatePermissionRequest(BaseModel):    
     permission: PermissionLevel
 
+class PermissionOperationType(str, Enum):
+    grant = "grant"
+    change = "change"
+    revoke = "revoke"
+
+class PermissionOperation(BaseModel):
+    op: PermissionOperationType
+    user_id: int
+    # required for grant and change, ignored for revoke
+    role: Optional[PermissionLevel] = None
+
+class PermissionPatchRequest(BaseModel):
+    operations: List[PermissionOperation]
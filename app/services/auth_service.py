@@ -3,12 +3,18 @@ from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, status
 from app.schema.token import TokenUserData, ReadToken
 from app.config import settings
+from app.services.revocation import revocation_store, token_key
+from app.utils.lru_cache import LRUCache, MISSING
+import asyncio
 import jwt
+import logging
 
 
+logger = logging.getLogger(__name__)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='api/auth/login')
 
-token_blacklist = set()
+# verified claims per token, each entry expiring with the token's own exp
+token_claims_cache = LRUCache(maxsize=settings.token_cache_size)
 
 SECRET_KEY = f"{settings.secret_key}"
 ALGORITHM = f"{settings.algorithm}"
@@ -30,8 +36,11 @@ async def create_refresh_jwt_token(data: dict):
     return token
 
 async def verify_jwt_token(token: str, credentials_exception):     
-    if token in token_blacklist:
+    if await revocation_store.is_revoked(token_key(token)):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked")
+    token_data = token_claims_cache.get(token)
+    if token_data is not MISSING:
+        return token_data
     try:        
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email : str = payload.get("email")
@@ -47,8 +56,41 @@ async def verify_jwt_token(token: str, credentials_exception):
     
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,detail="Invalid token")
+    if payload.get("exp") is not None:
+        token_claims_cache.set(token, token_data, expires_at=payload["exp"])
     return token_data
 
+async def revoke_jwt_token(token: str):
+    # only called for tokens that just passed verify_jwt_token, so the signature needs no second check
+    exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+    if exp is None:
+        exp = (datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)).timestamp()
+    await revocation_store.revoke(token_key(token), exp)
+    token_claims_cache.pop(token)
+
+async def sweep_expired_tokens(interval: float):
+    # runs for the lifetime of the app: drops revocations and cached claims of tokens past their exp
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await revocation_store.sweep()
+            token_claims_cache.sweep()
+        except Exception:
+            logger.exception("Failed to sweep expired tokens")
+
+async def sync_revocations(interval: float):
+    # brings the local filter of revoked tokens up to date so revocations made by other workers take effect here
+    while True:
+        try:
+            await revocation_store.sync()
+        except Exception:
+            # until a sync succeeds, tokens revoked on other workers keep passing here
+            logger.exception("Failed to sync revoked tokens")
+        await asyncio.sleep(interval)
+
+def token_stats() -> dict:
+    return {"claims_cache": token_claims_cache.stats(), "revocations": revocation_store.stats()}
+
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):    
     credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Invalid Credentials", headers={"WWW-Authenticate":"Bearer"})
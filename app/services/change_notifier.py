@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+from app.config import settings
+from app.crud.collaboration import get_notification_recipients
+from app.db.db_session import async_session_maker
+from app.model.eventversion import EventVersion
+from app.services.mail_dispatcher import mail_dispatcher
+from app.utils.compare_version import compare_event_versions
+from app.utils.version_delta import event_state
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class PendingDigest:
+    # the event as it was before the first edit of the digest
+    before: Dict[str, Any]
+    first_edit_at: datetime
+    last_edit_at: datetime
+    editors: Set[int] = field(default_factory=set)
+    edits: int = 0
+    # addresses named on the edits themselves (PUT ?email=), told whether or not they collaborate on the event
+    also_notify: Set[str] = field(default_factory=set)
+    deadline: float = 0.0
+    timer: Optional[asyncio.TimerHandle] = None
+    # sends that failed so far
+    attempts: int = 0
+
+
+class ChangeNotifier:
+    """Coalesces the edits of an event into one digest mail to its collaborators.
+
+    The first edit of an event opens a digest; it is sent `debounce_seconds`
+    after the latest edit, or `max_delay_seconds` after the first if editing
+    never pauses that long. The digest reports what changed between the event
+    before the first edit and the event at send time, as compare_event_versions
+    sees it, so edits that undo each other drop out. It goes to every owner
+    and editor (one query), except a collaborator who made all of its edits.
+    Digests are kept per worker process; each worker's edits are coalesced
+    on their own. A digest that fails to go out is kept and retried
+    `debounce_seconds` later, up to `max_retries` times.
+    """
+
+    def __init__(self, debounce_seconds: float, max_delay_seconds: float, max_retries: int = 3, session_factory=async_session_maker):
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.max_retries = max_retries
+        self.session_factory = session_factory
+        self._pending: Dict[int, PendingDigest] = {}
+        self._flushing: Set[asyncio.Task] = set()
+        self.edits = 0
+        self.digests = 0
+        self.unchanged = 0
+        self.mails_queued = 0
+        self.failures = 0
+        self.retries = 0
+        self.dropped = 0
+
+    def edited(self, event_id: int, before: Dict[str, Any], editor_id: int, also_notify: Optional[str] = None):
+        now = datetime.now()
+        digest = self._pending.get(event_id)
+        if digest is None:
+            digest = self._pending[event_id] = PendingDigest(before=before, first_edit_at=now, last_edit_at=now,
+                                                             deadline=time.monotonic() + self.max_delay_seconds)
+        elif digest.timer is not None:
+            digest.timer.cancel()
+        digest.last_edit_at = now
+        digest.editors.add(editor_id)
+        digest.edits += 1
+        if also_notify:
+            digest.also_notify.add(also_notify)
+        self.edits += 1
+        delay = max(min(self.debounce_seconds, digest.deadline - time.monotonic()), 0)
+        digest.timer = asyncio.get_running_loop().call_later(delay, self._start_flush, event_id)
+
+    def _start_flush(self, event_id: int):
+        task = asyncio.create_task(self.flush(event_id))
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    async def flush(self, event_id: int):
+        # later edits open a new digest while this one is being sent
+        digest = self._pending.pop(event_id, None)
+        if digest is None:
+            return
+        if digest.timer is not None:
+            digest.timer.cancel()
+        try:
+            async with self.session_factory() as session:
+                event, recipients = await get_notification_recipients(event_id, session)
+            # a deleted event has no collaborators left to tell
+            if event is None:
+                return
+            changes = await compare_event_versions(self._as_version(event_id, digest.before), self._as_version(event_id, event_state(event)))
+            if not changes:
+                self.unchanged += 1
+                return
+            to_emails = {email for user_id, email in recipients.items() if digest.editors != {user_id}} | digest.also_notify
+            subject = f"CEMS: '{event.title}' was updated"
+            body = self._digest_body(event_id, event.title, digest, changes, recipients)
+            self.digests += 1
+            for to_email in sorted(to_emails):
+                # one body for every recipient, so the dispatcher sends it as a single transaction
+                if mail_dispatcher.enqueue(subject=subject, body=body, to_email=to_email):
+                    self.mails_queued += 1
+        except Exception:
+            self.failures += 1
+            logger.exception("Failed to notify collaborators of event %s", event_id)
+            self._retry(event_id, digest)
+
+    def _retry(self, event_id: int, digest: PendingDigest):
+        digest.attempts += 1
+        if digest.attempts > self.max_retries:
+            self.dropped += 1
+            logger.error("Gave up notifying collaborators of event %s after %s attempts", event_id, digest.attempts)
+            return
+        self.retries += 1
+        newer = self._pending.get(event_id)
+        if newer is not None:
+            # edited again while this digest was being sent: the open digest takes over this one's edits,
+            # reporting from the state before the first of them, and goes out on its own timer
+            newer.before, newer.first_edit_at = digest.before, digest.first_edit_at
+            newer.editors |= digest.editors
+            newer.edits += digest.edits
+            newer.also_notify |= digest.also_notify
+            newer.attempts = digest.attempts
+            return
+        self._pending[event_id] = digest
+        digest.timer = asyncio.get_running_loop().call_later(self.debounce_seconds, self._start_flush, event_id)
+
+    def _as_version(self, event_id: int, state: Dict[str, Any]) -> EventVersion:
+        # both sides carry the same edit metadata, so only the event's own fields can differ
+        return EventVersion(event_id=event_id, seq=0, edited_by=0, **state)
+
+    def _digest_body(self, event_id: int, title: str, digest: PendingDigest, changes: Dict[str, Dict[str, Any]], recipients: Dict[int, str]) -> str:
+        editors = ", ".join(sorted(recipients.get(user_id, f"user {user_id}") for user_id in digest.editors))
+        edits = f"{digest.edits} edit" + ("s" if digest.edits > 1 else "")
+        lines = [
+            f"The event with id='{event_id}' and title='{title}' was updated by {editors}",
+            f"({edits} between {digest.first_edit_at:%Y-%m-%d %H:%M:%S} and {digest.last_edit_at:%Y-%m-%d %H:%M:%S}).",
+            "",
+            "Changes:",
+        ]
+        lines += [f"  {name}: {change['old']} -> {change['new']}" for name, change in changes.items()]
+        return "\n".join(lines)
+
+    async def flush_all(self):
+        # on shutdown: send every open digest now rather than lose it
+        for event_id in list(self._pending):
+            await self.flush(event_id)
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "pending_digests": len(self._pending),
+            "edits": self.edits,
+            "digests": self.digests,
+            "unchanged": self.unchanged,
+            "mails_queued": self.mails_queued,
+            "failures": self.failures,
+            "retries": self.retries,
+            "dropped": self.dropped,
+            "debounce_seconds": self.debounce_seconds,
+            "max_delay_seconds": self.max_delay_seconds,
+        }
+
+
+change_notifier = ChangeNotifier(debounce_seconds=settings.notification_debounce_seconds, max_delay_seconds=settings.notification_max_delay_seconds,
+                                 max_retries=settings.notification_max_retries)
@@ -0,0 +1,133 @@
+import json
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, List
+from pydantic import ValidationError
+from app.config import settings
+from app.db.db_session import async_session_maker
+from app.crud.collaboration import forget_effective_roles
+from app.crud.event import insert_events_with_owner
+from app.schema.event import Event
+
+
+class LineTooLong(Exception):
+    pass
+
+
+async def ndjson_lines(body: AsyncIterable[bytes], max_line_bytes: int):
+    # yields (line number, raw line); a line split across body chunks is buffered until its newline arrives
+    buffer = b""
+    number = 0
+    async for data in body:
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            if len(line) > max_line_bytes:
+                raise LineTooLong(f"line {number} is longer than {max_line_bytes} bytes")
+            yield number, line
+        # fail before the rest of an overlong line is read, not only once its newline arrives
+        if len(buffer) > max_line_bytes:
+            raise LineTooLong(f"line {number + 1} is longer than {max_line_bytes} bytes")
+    if buffer:
+        if len(buffer) > max_line_bytes:
+            raise LineTooLong(f"line {number + 1} is longer than {max_line_bytes} bytes")
+        yield number + 1, buffer
+
+
+class ImportSummary:
+    def __init__(self, max_errors: int):
+        self.max_errors = max_errors
+        self.lines = 0
+        self.imported = 0
+        self.failed = 0
+        self.chunks = 0
+        self.errors: List[dict] = []
+        self.error_count = 0
+        self.aborted = False
+
+    def error(self, line: int, message: str):
+        self.error_count += 1
+        # only the first errors are kept so a broken upload cannot grow the response without bound
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "error": message})
+
+    def to_dict(self) -> dict:
+        return {
+            "lines": self.lines,
+            "imported": self.imported,
+            "failed": self.failed,
+            "aborted": self.aborted,
+            "chunks": self.chunks,
+            "errors": self.errors,
+            "errors_truncated": self.error_count > len(self.errors),
+        }
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, e['loc'])) or 'event'}: {e['msg']}" for e in error.errors())
+
+
+async def import_events_ndjson(body: AsyncIterable[bytes], owner_id: int, session) -> AsyncIterator[dict]:
+    """Validate and insert one event per NDJSON line, committing every chunk.
+
+    Yields {"chunk": ...} as soon as each chunk is committed (or rolled back),
+    then a final {"summary": ...}. Only one chunk of rows is held at a time,
+    and the body is not read any further until that chunk is committed, so
+    memory stays flat and a slow database slows the upload down instead of
+    piling it up in the worker.
+    """
+    summary = ImportSummary(max_errors=settings.event_import_max_errors)
+    chunk_size = settings.event_batch_chunk_size
+    create_dtm = datetime.now()
+    rows: List[dict] = []
+    first_line = last_line = 0
+
+    async def flush() -> dict:
+        summary.chunks += 1
+        chunk = {"chunk": summary.chunks, "first_line": first_line, "last_line": last_line, "imported": 0, "failed": 0}
+        try:
+            created = await insert_events_with_owner(rows, owner_id, session)
+            await session.commit()
+            chunk["imported"] = len(created)
+            summary.imported += len(created)
+        except Exception as e:
+            await session.rollback()
+            chunk["failed"] = len(rows)
+            summary.failed += len(rows)
+            summary.error(first_line, f"chunk {chunk['chunk']} was not imported: {str(e)}")
+        # committed events are not needed again; left in the identity map they would grow with the upload
+        session.expunge_all()
+        rows.clear()
+        return chunk
+
+    try:
+        async for number, line in ndjson_lines(body, settings.event_import_max_line_bytes):
+            last_line = number
+            if not line.strip():
+                continue
+            summary.lines += 1
+            try:
+                event = Event.model_validate_json(line)
+            except ValidationError as e:
+                summary.failed += 1
+                summary.error(number, _describe(e))
+                continue
+            if not rows:
+                first_line = number
+            rows.append({**event.model_dump(), "owner_id": owner_id, "create_dtm": create_dtm})
+            if len(rows) >= chunk_size:
+                yield {"chunk": await flush()}
+    except LineTooLong as e:
+        summary.aborted = True
+        summary.error(last_line + 1, str(e))
+    if rows:
+        yield {"chunk": await flush()}
+    forget_effective_roles(session)
+    yield {"summary": summary.to_dict()}
+
+
+async def stream_import_ndjson(body: AsyncIterable[bytes], owner_id: int) -> AsyncIterator[bytes]:
+    # runs on its own session: a streamed response outlives the request's session dependency
+    async with async_session_maker() as session:
+        async for progress in import_events_ndjson(body, owner_id, session):
+            yield json.dumps(progress).encode() + b"\n"
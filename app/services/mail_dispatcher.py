@@ -0,0 +1,227 @@
+import queue
+import smtplib
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from app.config import settings
+from app.utils.email_utils import build_message, open_smtp
+
+
+class OutgoingMail(NamedTuple):
+    subject: str
+    body: str
+    to_email: str
+
+
+# one per worker, queued behind the pending mail by shutdown()
+_STOP = object()
+
+
+class MailDispatcher:
+    """Sends queued mail from worker threads, each keeping one SMTP connection open.
+
+    enqueue() never blocks the caller: the message joins a bounded queue, and
+    once `queue_size` messages are waiting new ones are dropped and counted.
+    A worker takes up to `batch_size` waiting messages at a time; those with
+    the same subject and body go out as one transaction to all their
+    recipients, each address once. Lost connections and 4xx replies are retried on a fresh
+    connection with exponential backoff, 5xx replies are not. A worker left
+    idle for `idle_close_seconds` closes its connection rather than find it
+    dropped by the server on the next send.
+    """
+
+    def __init__(self, workers: int, queue_size: int, batch_size: int, max_retries: int, retry_backoff_seconds: float,
+                 idle_close_seconds: float, connect: Callable[[], smtplib.SMTP] = open_smtp):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.idle_close_seconds = idle_close_seconds
+        self.connect = connect
+        # unbounded underneath so the stop markers always fit; enqueue() enforces queue_size
+        self._queue = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.peak_queued = 0
+        self.enqueued = 0
+        self.dropped = 0
+        self.sent = 0
+        self.failed = 0
+        # the same address queued more than once for one message: sent it once
+        self.duplicates = 0
+        self.retries = 0
+        self.connections_opened = 0
+        self.batches = 0
+        self.transactions = 0
+        self.total_send_ms = 0.0
+        self.first_enqueued_at: Optional[float] = None
+        self.last_sent_at: Optional[float] = None
+
+    def enqueue(self, subject: str, body: str, to_email: str) -> bool:
+        with self._lock:
+            if self.queued >= self.queue_size:
+                self.dropped += 1
+                print(f"Mail queue full, dropped email to {to_email}")
+                return False
+            if not self._threads:
+                self._start()
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+            self.enqueued += 1
+            if self.first_enqueued_at is None:
+                self.first_enqueued_at = time.perf_counter()
+            self._queue.put(OutgoingMail(subject, body, to_email))
+        return True
+
+    def _start(self):
+        self._threads = [threading.Thread(target=self._work, name=f"mail-{i}", daemon=True) for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def _next_batch(self, idle_timeout: Optional[float]) -> Tuple[List[OutgoingMail], bool]:
+        # blocks for the first message, then takes whatever else is already waiting
+        try:
+            item = self._queue.get(timeout=idle_timeout)
+        except queue.Empty:
+            return [], False
+        batch = []
+        while item is not _STOP:
+            batch.append(item)
+            if len(batch) == self.batch_size:
+                break
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+        with self._lock:
+            self.queued -= len(batch)
+        return batch, item is _STOP
+
+    def _work(self):
+        connection = None
+        try:
+            while True:
+                batch, stop = self._next_batch(self.idle_close_seconds if connection is not None else None)
+                if batch:
+                    connection = self._send_batch(connection, batch)
+                elif connection is not None:
+                    self._close(connection)
+                    connection = None
+                if stop:
+                    return
+        finally:
+            self._close(connection)
+
+    def _send_batch(self, connection: Optional[smtplib.SMTP], batch: List[OutgoingMail]) -> Optional[smtplib.SMTP]:
+        recipients: Dict[Tuple[str, str], List[str]] = {}
+        for mail in batch:
+            recipients.setdefault((mail.subject, mail.body), []).append(mail.to_email)
+        # an address queued twice for the same message gets it once, in first-queued order
+        unique = {key: list(dict.fromkeys(to_emails)) for key, to_emails in recipients.items()}
+        with self._lock:
+            self.batches += 1
+            self.duplicates += len(batch) - sum(len(to_emails) for to_emails in unique.values())
+        for (subject, body), to_emails in unique.items():
+            connection = self._deliver(connection, subject, body, to_emails)
+        return connection
+
+    def _deliver(self, connection: Optional[smtplib.SMTP], subject: str, body: str, to_emails: List[str]) -> Optional[smtplib.SMTP]:
+        message = build_message(subject, body, to_emails).as_string()
+        for attempt in range(self.max_retries + 1):
+            try:
+                if connection is None:
+                    connection = self.connect()
+                    with self._lock:
+                        self.connections_opened += 1
+                started_at = time.perf_counter()
+                refused = connection.sendmail(settings.email_id, to_emails, message)
+                self._record(len(to_emails) - len(refused), len(refused), (time.perf_counter() - started_at) * 1000)
+                for to_email, (code, reply) in refused.items():
+                    print(f"Failed to send email to {to_email}: {code} {reply!r}")
+                return connection
+            except smtplib.SMTPRecipientsRefused as e:
+                # every recipient was refused; the connection itself is fine
+                self._record(0, len(to_emails))
+                print(f"Failed to send email to {', '.join(to_emails)}: {e}")
+                return connection
+            except (smtplib.SMTPException, OSError) as e:
+                transient = not isinstance(e, smtplib.SMTPResponseException) or 400 <= e.smtp_code < 500
+                self._close(connection)
+                connection = None
+                if not transient or attempt == self.max_retries:
+                    self._record(0, len(to_emails))
+                    print(f"Failed to send email to {', '.join(to_emails)}: {e}")
+                    return None
+            except Exception as e:
+                # anything else (an address that cannot be encoded, ...) fails the message, not the worker
+                self._close(connection)
+                self._record(0, len(to_emails))
+                print(f"Failed to send email to {', '.join(to_emails)}: {e}")
+                return None
+            with self._lock:
+                self.retries += 1
+            time.sleep(self.retry_backoff_seconds * 2 ** attempt)
+
+    def _record(self, sent: int, failed: int, send_ms: Optional[float] = None):
+        with self._lock:
+            self.sent += sent
+            self.failed += failed
+            if send_ms is not None:
+                self.transactions += 1
+                self.total_send_ms += send_ms
+            if sent:
+                self.last_sent_at = time.perf_counter()
+
+    def _close(self, connection: Optional[smtplib.SMTP]):
+        if connection is None:
+            return
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+    def shutdown(self, timeout: float):
+        # workers finish the mail queued before the stop markers, within timeout
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(_STOP)
+        deadline = time.monotonic() + timeout
+        for thread in threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+
+    def stats(self) -> dict:
+        with self._lock:
+            elapsed = (self.last_sent_at - self.first_enqueued_at) if self.last_sent_at and self.first_enqueued_at else 0.0
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "batch_size": self.batch_size,
+                "queued": self.queued,
+                "peak_queued": self.peak_queued,
+                "enqueued": self.enqueued,
+                "dropped": self.dropped,
+                "sent": self.sent,
+                "failed": self.failed,
+                "duplicates": self.duplicates,
+                "retries": self.retries,
+                "connections_opened": self.connections_opened,
+                "batches": self.batches,
+                "transactions": self.transactions,
+                "avg_batch_size": round((self.sent + self.failed + self.duplicates) / self.batches, 2) if self.batches else 0.0,
+                "avg_transaction_ms": round(self.total_send_ms / self.transactions, 3) if self.transactions else 0.0,
+                # from the first message queued to the last one delivered
+                "sent_per_second": round(self.sent / elapsed, 1) if elapsed else 0.0,
+            }
+
+
+mail_dispatcher = MailDispatcher(
+    workers=settings.mail_workers,
+    queue_size=settings.mail_queue_size,
+    batch_size=settings.mail_batch_size,
+    max_retries=settings.mail_max_retries,
+    retry_backoff_seconds=settings.mail_retry_backoff_seconds,
+    idle_close_seconds=settings.mail_idle_close_seconds
+)
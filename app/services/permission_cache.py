@@ -0,0 +1,58 @@
+from typing import Dict, Iterable, Optional, Set
+from app.config import settings
+from app.model.eventpermission import PermissionLevel
+from app.utils.lru_cache import LRUCache
+
+
+class PermissionCache:
+    """(event_id, user_id) -> PermissionLevel, or None when the user holds no grant on an existing event.
+
+    The cache is per process: writes invalidate it precisely in the worker that
+    served them, other workers converge once their entries reach the TTL.
+    Readers take generation() before querying and pass it to set(), so a row
+    read before a concurrent invalidation is never cached.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries = LRUCache(maxsize=maxsize, ttl=ttl, on_evict=lambda key: self._forget_index(*key))
+        self._users_by_event: Dict[int, Set[int]] = {}
+        self._generation = 0
+
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, event_id: int, user_id: int):
+        return self._entries.get((event_id, user_id))
+
+    def set(self, event_id: int, user_id: int, permission: Optional[PermissionLevel], generation: int):
+        if generation != self._generation:
+            return
+        self._entries.set((event_id, user_id), permission)
+        self._users_by_event.setdefault(event_id, set()).add(user_id)
+
+    def invalidate(self, event_id: int, user_ids: Iterable[int]):
+        self._generation += 1
+        for user_id in user_ids:
+            self._entries.pop((event_id, user_id))
+            self._forget_index(event_id, user_id)
+
+    def invalidate_event(self, event_id: int):
+        self._generation += 1
+        for user_id in self._users_by_event.pop(event_id, set()):
+            self._entries.pop((event_id, user_id))
+
+    def stats(self) -> dict:
+        return self._entries.stats()
+
+    def _forget_index(self, event_id: int, user_id: int):
+        users = self._users_by_event.get(event_id)
+        if users is not None:
+            users.discard(user_id)
+            if not users:
+                del self._users_by_event[event_id]
+
+
+permission_cache = PermissionCache(
+    maxsize=settings.permission_cache_size,
+    ttl=settings.permission_cache_ttl_seconds
+)
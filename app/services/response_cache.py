@@ -0,0 +1,187 @@
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+from fastapi import Response
+from pydantic import TypeAdapter
+from app.config import settings
+
+
+class InMemoryLRUBackend:
+    """Per-process LRU cache bounded by the total size of the cached payloads."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple[bytes, float, Set[str]]]" = OrderedDict()
+        self._keys_by_tag: Dict[str, Set[str]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        payload, expires_at, _ = entry
+        if expires_at <= time.time():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return payload
+
+    async def set(self, key: str, payload: bytes, ttl: float, tags: Iterable[str]):
+        if len(payload) > self.max_bytes:
+            return
+        self._remove(key)
+        tags = set(tags)
+        self._entries[key] = (payload, time.time() + ttl, tags)
+        self.used_bytes += len(payload)
+        for tag in tags:
+            self._keys_by_tag.setdefault(tag, set()).add(key)
+        while self.used_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    async def invalidate_tags(self, tags: Iterable[str]):
+        for tag in tags:
+            for key in list(self._keys_by_tag.get(tag, ())):
+                self._remove(key)
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "used_bytes": self.used_bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        payload, _, tags = entry
+        self.used_bytes -= len(payload)
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+
+class RedisBackend:
+    """Shared cache on any server speaking the Redis protocol; a tag is a set of the keys it covers."""
+
+    def __init__(self, client, prefix: str = "cems:cache:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, payload: bytes, ttl: float, tags: Iterable[str]):
+        ttl = int(ttl)
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(self.prefix + key, payload, ex=ttl)
+            for tag in tags:
+                tag_key = self._tag_key(tag)
+                pipe.sadd(tag_key, self.prefix + key)
+                # every key shares the same ttl, so pushing the tag's expiry forward keeps it alive as long as its keys
+                pipe.expire(tag_key, ttl)
+            await pipe.execute()
+
+    async def invalidate_tags(self, tags: Iterable[str]):
+        for tag in tags:
+            tag_key = self._tag_key(tag)
+            keys = await self.client.smembers(tag_key)
+            await self.client.delete(tag_key, *keys)
+
+    async def close(self):
+        await self.client.aclose()
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+
+class ResponseCache:
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        payload = await self.backend.get(key)
+        if payload is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return payload
+
+    async def set(self, key: str, payload: bytes, tags: Iterable[str], ttl: Optional[float] = None):
+        await self.backend.set(key, payload, ttl or self.ttl, tags)
+
+    async def invalidate(self, *tags: str):
+        self.invalidations += 1
+        await self.backend.invalidate_tags(tags)
+
+    async def cached_json(self, key: str, tags: Iterable[str], adapter: TypeAdapter, load: Callable[[], Awaitable[Any]], headers: Optional[Dict[str, str]] = None) -> Response:
+        # load() may raise (e.g. a 404); only successful payloads are cached
+        payload = await self.get(key)
+        if payload is None:
+            invalidations = self.invalidations
+            payload = adapter.dump_json(adapter.validate_python(await load(), from_attributes=True))
+            # skip the fill if a write invalidated anything while we were loading
+            if invalidations == self.invalidations:
+                await self.set(key, payload, tags)
+        return Response(content=payload, media_type="application/json", headers=headers)
+
+    async def cached_page(self, key: str, tags: Iterable[str], adapter: TypeAdapter, load: Callable[[], Awaitable[Tuple[Any, Optional[str]]]], headers: Optional[Dict[str, str]] = None) -> Response:
+        # like cached_json for keyset pages: load() returns (items, next cursor) and the cursor, cached
+        # on the first line of the payload, is sent back in X-Next-Cursor
+        cached = await self.get(key)
+        if cached is None:
+            invalidations = self.invalidations
+            items, next_cursor = await load()
+            cached = (next_cursor or "").encode() + b"\n" + adapter.dump_json(adapter.validate_python(items, from_attributes=True))
+            if invalidations == self.invalidations:
+                await self.set(key, cached, tags)
+        next_cursor, payload = cached.split(b"\n", 1)
+        response = Response(content=payload, media_type="application/json", headers=headers)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor.decode()
+        return response
+
+    async def close(self):
+        await self.backend.close()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            **self.backend.stats(),
+        }
+
+
+def event_tag(event_id: int) -> str:
+    return f"event:{event_id}"
+
+
+def build_backend():
+    if settings.response_cache_backend == "redis":
+        from redis.asyncio import Redis
+        return RedisBackend(Redis.from_url(settings.redis_url))
+    return InMemoryLRUBackend(max_bytes=settings.response_cache_max_bytes)
+
+
+response_cache = ResponseCache(build_backend(), ttl=settings.response_cache_ttl_seconds)
@@ -0,0 +1,293 @@
+import hashlib
+import heapq
+import time
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select
+from app.config import settings
+from app.db.db_session import async_session_maker
+from app.model.revokedtoken import RevokedToken
+from app.utils.bloom_filter import BloomFilter
+
+
+# an incremental sync looks this far back past its watermark: a revocation is stamped before its write becomes
+# visible, and one stamped just before the last sync may only show up after it
+SYNC_OVERLAP_SECONDS = 2.0
+
+
+def token_key(token: str) -> str:
+    # tokens carry no jti, so a revoked token is remembered by its digest rather than the bearer string itself
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class InMemoryRevocationStore:
+    """Revoked token digests, each kept only until the token would have expired anyway.
+
+    A heap ordered by expiry lets sweep() drop expired entries without scanning
+    the whole store, so memory follows the number of live revoked tokens.
+    Revocations are only seen by the process that made them.
+    """
+
+    def __init__(self):
+        self._expires_at: Dict[str, float] = {}
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self.revocations = 0
+        self.expirations = 0
+
+    async def revoke(self, key: str, expires_at: float):
+        if expires_at <= time.time():
+            return
+        self._expires_at[key] = expires_at
+        heapq.heappush(self._expiry_heap, (expires_at, key))
+        self.revocations += 1
+
+    async def is_revoked(self, key: str) -> bool:
+        expires_at = self._expires_at.get(key)
+        return expires_at is not None and expires_at > time.time()
+
+    async def sweep(self) -> int:
+        now = time.time()
+        swept = 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiry_heap)
+            # a key revoked twice has a stale heap entry; only the current expiry removes it
+            if self._expires_at.get(key) == expires_at:
+                del self._expires_at[key]
+                swept += 1
+        self.expirations += swept
+        return swept
+
+    async def active_keys(self) -> List[str]:
+        now = time.time()
+        return [key for key, expires_at in self._expires_at.items() if expires_at > now]
+
+    async def sync(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "revoked": len(self._expires_at),
+            "revocations": self.revocations,
+            "expirations": self.expirations,
+        }
+
+
+class DatabaseRevocationStore:
+    """Revocations in the revokedtoken table, shared by every worker using the database."""
+
+    async def revoke(self, key: str, expires_at: float):
+        async with async_session_maker() as session:
+            await session.exec(insert(RevokedToken)
+                .values(token_hash=key, expires_at=int(expires_at))
+                .on_conflict_do_nothing(index_elements=["token_hash"]))
+            await session.commit()
+
+    async def is_revoked(self, key: str) -> bool:
+        async with async_session_maker() as session:
+            row = (await session.exec(select(RevokedToken.token_hash)
+                .where(RevokedToken.token_hash == key, RevokedToken.expires_at > int(time.time())))).first()
+            return row is not None
+
+    async def sweep(self) -> int:
+        async with async_session_maker() as session:
+            result = await session.exec(delete(RevokedToken).where(RevokedToken.expires_at <= int(time.time())))
+            await session.commit()
+            return result.rowcount
+
+    async def active_keys(self) -> List[str]:
+        async with async_session_maker() as session:
+            return list((await session.exec(select(RevokedToken.token_hash)
+                .where(RevokedToken.expires_at > int(time.time())))).all())
+
+    async def revoked_since(self, since: Optional[float]) -> Tuple[List[str], float]:
+        # live keys revoked at or after `since` (all of them for None), and the watermark to pass next time
+        async with async_session_maker() as session:
+            now = (await session.exec(select(func.extract("epoch", func.clock_timestamp())))).one()
+            query = select(RevokedToken.token_hash).where(RevokedToken.expires_at > int(time.time()))
+            if since is not None:
+                query = query.where(RevokedToken.revoked_at >= since)
+            keys = list((await session.exec(query)).all())
+        return keys, float(now) - SYNC_OVERLAP_SECONDS
+
+    async def sync(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": "database"}
+
+
+class RedisRevocationStore:
+    """Revocations in a sorted set on a Redis-protocol server, scored by the token's exp.
+
+    A second set scores the same keys by when they were revoked (server time),
+    so a sync can read just the revocations made since the previous one.
+    """
+
+    def __init__(self, client, key: str = "cems:revoked"):
+        self.client = client
+        self.key = key
+        self.revoked_at_key = f"{key}:at"
+
+    async def _server_time(self) -> float:
+        seconds, microseconds = await self.client.time()
+        return seconds + microseconds / 1_000_000
+
+    async def revoke(self, key: str, expires_at: float):
+        revoked_at = await self._server_time()
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zadd(self.key, {key: expires_at})
+            pipe.zadd(self.revoked_at_key, {key: revoked_at})
+            await pipe.execute()
+
+    async def is_revoked(self, key: str) -> bool:
+        expires_at = await self.client.zscore(self.key, key)
+        return expires_at is not None and expires_at > time.time()
+
+    async def sweep(self) -> int:
+        expired = await self.client.zrangebyscore(self.key, "-inf", time.time())
+        if not expired:
+            return 0
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.key, *expired)
+            pipe.zrem(self.revoked_at_key, *expired)
+            swept, _ = await pipe.execute()
+        return swept
+
+    async def active_keys(self) -> List[str]:
+        keys = await self.client.zrangebyscore(self.key, f"({time.time()}", "+inf")
+        return [key.decode() if isinstance(key, bytes) else key for key in keys]
+
+    async def revoked_since(self, since: Optional[float]) -> Tuple[List[str], float]:
+        # keys revoked at or after `since` (every live key for None), and the watermark to pass next time;
+        # a key that has expired since is harmless in the filter, the backend check turns it down
+        now = await self._server_time()
+        if since is None:
+            return await self.active_keys(), now - SYNC_OVERLAP_SECONDS
+        keys = await self.client.zrangebyscore(self.revoked_at_key, since, "+inf")
+        return [key.decode() if isinstance(key, bytes) else key for key in keys], now - SYNC_OVERLAP_SECONDS
+
+    async def sync(self):
+        pass
+
+    async def close(self):
+        await self.client.aclose()
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+
+class BloomFilteredRevocationStore:
+    """Puts a per-process Bloom filter in front of a shared revocation backend.
+
+    A token that is not in the filter was not revoked as of the last sync()
+    (or by this process since), so the common case never leaves the process;
+    only filter hits are confirmed against the backend. A revocation made by
+    another worker is picked up at the next sync(), which adds the keys
+    revoked since the previous one, so that is how long a logged-out token can
+    still pass elsewhere. Expired keys stay in the filter until it is rebuilt
+    from the backend's live keys, every `full_sync_seconds` or sooner once it
+    holds more keys than it was sized for.
+    """
+
+    def __init__(self, backend, capacity: int, error_rate: float, full_sync_seconds: float):
+        self.backend = backend
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.full_sync_seconds = full_sync_seconds
+        self._filter = BloomFilter(capacity, error_rate)
+        self.fast_negatives = 0
+        self.backend_checks = 0
+        self.false_positives = 0
+        self.incremental_syncs = 0
+        self.full_syncs = 0
+        self.last_sync = None
+        self.last_full_sync = None
+        self._watermark: Optional[float] = None
+        self._revoked_during_sync: List[str] = []
+
+    async def revoke(self, key: str, expires_at: float):
+        await self.backend.revoke(key, expires_at)
+        self._filter.add(key)
+        self._revoked_during_sync.append(key)
+
+    async def is_revoked(self, key: str) -> bool:
+        if key not in self._filter:
+            self.fast_negatives += 1
+            return False
+        self.backend_checks += 1
+        revoked = await self.backend.is_revoked(key)
+        if not revoked:
+            self.false_positives += 1
+        return revoked
+
+    async def sweep(self) -> int:
+        return await self.backend.sweep()
+
+    async def active_keys(self) -> List[str]:
+        return await self.backend.active_keys()
+
+    async def sync(self):
+        now = time.time()
+        if self._watermark is None or self._filter.count > self._filter.capacity or now - self.last_full_sync >= self.full_sync_seconds:
+            await self._rebuild()
+            self.last_full_sync = now
+            self.full_syncs += 1
+        else:
+            keys, self._watermark = await self.backend.revoked_since(self._watermark)
+            for key in keys:
+                self._filter.add(key)
+            self.incremental_syncs += 1
+        self.last_sync = now
+
+    async def _rebuild(self):
+        self._revoked_during_sync = []
+        keys, watermark = await self.backend.revoked_since(None)
+        # sized for at least twice the live keys so the error rate holds as revocations pile up
+        bloom = BloomFilter(max(self.capacity, 2 * len(keys)), self.error_rate)
+        # local revocations committed after the backend was read must not drop out of the new filter
+        for key in keys + self._revoked_during_sync:
+            bloom.add(key)
+        self._filter = bloom
+        self._watermark = watermark
+
+    async def close(self):
+        await self.backend.close()
+
+    def stats(self) -> dict:
+        return {
+            **self.backend.stats(),
+            "bloom": self._filter.stats(),
+            "fast_negatives": self.fast_negatives,
+            "backend_checks": self.backend_checks,
+            "false_positives": self.false_positives,
+            "incremental_syncs": self.incremental_syncs,
+            "full_syncs": self.full_syncs,
+            "seconds_since_sync": round(time.time() - self.last_sync, 3) if self.last_sync else None,
+        }
+
+
+def build_revocation_store():
+    if settings.token_revocation_backend == "memory":
+        return InMemoryRevocationStore()
+    if settings.token_revocation_backend == "redis":
+        from redis.asyncio import Redis
+        backend = RedisRevocationStore(Redis.from_url(settings.redis_url))
+    else:
+        backend = DatabaseRevocationStore()
+    return BloomFilteredRevocationStore(
+        backend,
+        capacity=settings.token_revocation_bloom_capacity,
+        error_rate=settings.token_revocation_bloom_error_rate,
+        full_sync_seconds=settings.token_revocation_full_sync_seconds
+    )
+
+
+revocation_store = build_revocation_store()
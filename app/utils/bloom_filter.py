@@ -0,0 +1,35 @@
+import math
+
+
+class BloomFilter:
+    """Set membership with no false negatives and a bounded false positive rate.
+
+    Keys are expected to be hex digests (e.g. sha256), whose bits are already
+    uniformly distributed, so the k probe positions are derived from the key
+    itself with double hashing instead of hashing it again.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        h1 = int(key[:16], 16)
+        h2 = int(key[16:32], 16) | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def stats(self) -> dict:
+        return {"bits": self.size, "hashes": self.hashes, "capacity": self.capacity, "keys": self.count}
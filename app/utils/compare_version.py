@@ -1,16 +1,11 @@
-from typing import Any
+from typing import Any, Mapping
 from app.model.eventversion import EventVersion
 
-async def compare_event_versions(version1: EventVersion, version2: EventVersion) -> dict[str, dict[str, Any]]:
+def diff_fields(old: Mapping[str, Any], new: Mapping[str, Any]) -> dict[str, dict[str, Any]]:
         diffs = {}
-        exclude_fields = {"id", "version_id", "edited_at"}  
-        
-        for field in version1.__fields__:
-            if field in exclude_fields:
-                continue
 
-            val1 = getattr(version1, field)
-            val2 = getattr(version2, field)
+        for field, val1 in old.items():
+            val2 = new.get(field)
 
             if val1 != val2:
                 diffs[field] = {
@@ -18,4 +13,13 @@ async def compare_event_versions(version1: EventVersion, version2: EventVersion)
                     "new": val2
                 }
 
-        return diffs
\ No newline at end of file
+        return diffs
+
+async def compare_event_versions(version1: EventVersion, version2: EventVersion) -> dict[str, dict[str, Any]]:
+        exclude_fields = {"id", "version_id", "edited_at"}  
+        fields = [field for field in version1.__fields__ if field not in exclude_fields]
+
+        return diff_fields(
+            {field: getattr(version1, field) for field in fields},
+            {field: getattr(version2, field) for field in fields}
+        )
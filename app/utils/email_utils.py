@@ -1,24 +1,26 @@
 import smtplib
+from typing import List
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from app.config import settings
 
-def send_email(subject: str, body: str, to_email: str) -> bool:
-    from_email = settings.email_id
-    password = settings.email_password
-
+def build_message(subject: str, body: str, to_emails: List[str]) -> MIMEMultipart:
     msg = MIMEMultipart()
-    msg["From"] = from_email
-    msg["To"] = to_email
+    msg["From"] = settings.email_id
+    # one message to many recipients goes out as a single transaction; they are not shown each other
+    msg["To"] = to_emails[0] if len(to_emails) == 1 else "undisclosed-recipients:;"
     msg["Subject"] = subject
     msg.attach(MIMEText(body, "plain"))
+    return msg
 
+def open_smtp() -> smtplib.SMTP:
+    server = smtplib.SMTP(settings.smtp_host, settings.smtp_port, timeout=settings.smtp_timeout_seconds)
     try:
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
+        if settings.smtp_use_tls:
             server.starttls()
-            server.login(from_email, password)
-            server.sendmail(from_email, to_email, msg.as_string())        
-        return True
-    except smtplib.SMTPException as e:
-        print(f"Failed to send email to {to_email}: {e}")
-        return False
+        if settings.smtp_auth:
+            server.login(settings.email_id, settings.email_password)
+    except Exception:
+        server.close()
+        raise
+    return server
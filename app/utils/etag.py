@@ -0,0 +1,47 @@
+import re
+from typing import List, Optional
+from uuid import UUID
+from fastapi import Response, status
+
+# strong validator of an event: its revision goes up by one on every edit
+EVENT_ETAG = re.compile(r'"e(?P<event_id>\d+)-r(?P<revision>\d+)"')
+
+
+def event_etag(event_id: int, revision: int) -> str:
+    return f'"e{event_id}-r{revision}"'
+
+
+def version_etag(version_id: UUID) -> str:
+    # versions are never rewritten, so their id is all the validator needs
+    return f'"v{version_id}"'
+
+
+def changelog_etag(latest_version_id: UUID) -> str:
+    # every page of a changelog is fixed until the next edit appends a version
+    return f'"c{latest_version_id}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match compares weakly, so W/"x" matches "x"
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def if_match_revisions(if_match: Optional[str], event_id: int) -> Optional[List[int]]:
+    # None when the request sets no precondition (no header, or "*" for any current revision); otherwise the
+    # revisions its tags name, possibly none. If-Match compares strongly, so weak (W/) tags never match.
+    if if_match is None or if_match.strip() == "*":
+        return None
+    revisions = []
+    for tag in if_match.split(","):
+        match = EVENT_ETAG.fullmatch(tag.strip())
+        if match and int(match["event_id"]) == event_id:
+            revisions.append(int(match["revision"]))
+    return revisions
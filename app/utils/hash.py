@@ -1,11 +1,90 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
+from app.config import settings
 pass_context = CryptContext(schemes=["bcrypt"], deprecated = "auto")
 
 # encryption : password + salt
 # varification : take same salt parameter and regenerate the same salt and varify the hash value
 
+
+class HashPool:
+    """Runs bcrypt in worker threads so hashing never blocks the event loop.
+
+    bcrypt releases the GIL while it works, so the threads hash in parallel.
+    At most `workers` hashes run at once; further callers wait for a slot, and
+    once `max_pending` callers are waiting new ones are turned away with a 503.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._slots = asyncio.Semaphore(workers)
+        self.waiting = 0
+        self.running = 0
+        self.peak_waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.total_run_ms = 0.0
+
+    async def run(self, fn, *args):
+        if self.waiting >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many concurrent logins, retry shortly", headers={"Retry-After": "1"})
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        started_at = time.perf_counter()
+        wait_ms = (started_at - queued_at) * 1000
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        self.running += 1
+        try:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self.total_run_ms += (time.perf_counter() - started_at) * 1000
+            self._slots.release()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        # the semaphore binds to the loop it first blocked on; a restarted app gets a fresh one
+        self._slots = asyncio.Semaphore(self.workers)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "running": self.running,
+            "waiting": self.waiting,
+            "peak_waiting": self.peak_waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait_ms / self.completed, 3) if self.completed else 0.0,
+            "max_wait_ms": round(self.max_wait_ms, 3),
+            "avg_hash_ms": round(self.total_run_ms / self.completed, 3) if self.completed else 0.0,
+        }
+
+
+hash_pool = HashPool(workers=settings.password_hash_workers, max_pending=settings.password_hash_max_pending)
+
+
 async def hash(password: str):
-    return pass_context.hash(password)
+    return await hash_pool.run(pass_context.hash, password)
 
 async def verify_hash(row_password, hashed_password):
-    return pass_context.verify(row_password, hashed_password)
\ No newline at end of file
+    return await hash_pool.run(pass_context.verify, row_password, hashed_password)
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Iterator, List, Sequence, Tuple
+
+# half-open [start, end)
+Interval = Tuple[datetime, datetime]
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    # sweep in start order: each interval extends the current block or opens the next one;
+    # touching intervals ([9:00, 10:00) and [10:00, 11:00)) become one block
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def free_slots(busy: Sequence[Interval], window_start: datetime, window_end: datetime, min_length: timedelta = timedelta(0)) -> List[Interval]:
+    # the gaps between merged busy blocks within the window, keeping those at least min_length long
+    slots: List[Interval] = []
+    free_from = window_start
+    for start, end in busy:
+        if start >= window_end:
+            break
+        if start > free_from and start - free_from >= min_length:
+            slots.append((free_from, start))
+        free_from = max(free_from, end)
+    if window_end > free_from and window_end - free_from >= min_length:
+        slots.append((free_from, window_end))
+    return slots
+
+
+def find_overlaps(candidates: Iterable[Tuple[datetime, datetime, Any]], busy: Iterable[Tuple[datetime, datetime, Any]]) -> Iterator[Tuple[Any, Any]]:
+    """(candidate payload, busy payload) for every candidate interval overlapping a busy one.
+
+    A single sweep over both lists in start order: each side keeps the
+    intervals still open at the current start, and an interval arriving is
+    paired with the other side's open ones. Cost is the sort plus the pairs.
+    """
+    points = sorted(
+        [(start, end, 0, payload) for start, end, payload in candidates] + [(start, end, 1, payload) for start, end, payload in busy],
+        key=lambda point: (point[0], point[1])
+    )
+    open_intervals: Tuple[list, list] = ([], [])
+    for start, end, side, payload in points:
+        for open_side in open_intervals:
+            open_side[:] = [interval for interval in open_side if interval[1] > start]
+        for other_start, other_end, other_payload in open_intervals[1 - side]:
+            # strictly overlapping: an empty interval at another's start touches nothing
+            if other_start < end and start < other_end:
+                yield (payload, other_payload) if side == 0 else (other_payload, payload)
+        open_intervals[side].append((start, end, payload))
@@ -0,0 +1,76 @@
+import heapq
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import Iterable, Iterator, Optional, Tuple
+from dateutil.relativedelta import relativedelta
+from dateutil.rrule import MONTHLY, YEARLY, rrule
+
+
+def naive_utc(moment: datetime) -> datetime:
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _pattern(event) -> Optional[str]:
+    pattern = event.recurrence_pattern
+    if isinstance(pattern, Enum):
+        pattern = pattern.value
+    return pattern if event.is_recurring else None
+
+
+def _every(first: datetime, step: timedelta) -> Iterator[datetime]:
+    while True:
+        yield first
+        first += step
+
+
+def _series_from(start_time: datetime, pattern: str, lower: datetime) -> Iterable[datetime]:
+    """The event's series, restarted at the period holding `lower`.
+
+    Occurrences of earlier periods all start before `lower`. Event times carry
+    no zone, so daily and weekly steps are fixed and need no rule (building an
+    rrule costs more than expanding a week of it). For the others only the
+    dtstart moves; the rule still pins the original day of month (and month),
+    so a monthly series on the 31st keeps skipping shorter months and a yearly
+    one on Feb 29 keeps to leap years, as dateutil does for the full series.
+    """
+    if pattern in ("daily", "weekly"):
+        step = timedelta(days=1 if pattern == "daily" else 7)
+        return _every(start_time + max((lower - start_time) // step, 0) * step, step)
+    if pattern == "monthly":
+        months = max((lower.year - start_time.year) * 12 + lower.month - start_time.month, 0)
+        first = start_time.replace(day=1) + relativedelta(months=months)
+        return rrule(MONTHLY, dtstart=first, bymonthday=start_time.day)
+    years = max(lower.year - start_time.year, 0)
+    first = start_time.replace(month=1, day=1) + relativedelta(years=years)
+    return rrule(YEARLY, dtstart=first, bymonth=start_time.month, bymonthday=start_time.day)
+
+
+def event_occurrences(event, window_start: datetime, window_end: datetime) -> Iterator[Tuple[datetime, datetime]]:
+    # (start, end) of each occurrence overlapping [window_start, window_end), in order and computed as they are
+    # consumed; the series is entered at the window rather than walked from the event's start_time
+    duration = event.end_time - event.start_time
+    pattern = _pattern(event)
+    if pattern is None:
+        if event.start_time < window_end and event.end_time > window_start:
+            yield event.start_time, event.end_time
+        return
+    # an occurrence overlaps the window when it starts after window_start - duration and before window_end
+    lower = window_start - duration
+    for start in _series_from(event.start_time, pattern, lower):
+        if start >= window_end:
+            return
+        if start > lower and start >= event.start_time:
+            yield start, start + duration
+
+
+def _keyed_occurrences(event, window_start: datetime, window_end: datetime):
+    for start, end in event_occurrences(event, window_start, window_end):
+        yield start, event.id, end, event
+
+
+def occurrences_in_window(events: Iterable, window_start: datetime, window_end: datetime) -> Iterator[Tuple[datetime, datetime, object]]:
+    # every event's occurrences merged by start time (then event id); nothing past what the caller reads is expanded
+    for start, _, end, event in heapq.merge(*(_keyed_occurrences(event, window_start, window_end) for event in events)):
+        yield start, end, event
@@ -0,0 +1,72 @@
+from enum import Enum
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+from app.utils.compare_version import diff_fields
+
+# columns of an event that a version records; everything else on a version row is edit metadata
+VERSIONED_FIELDS = ("title", "description", "start_time", "end_time", "location", "is_recurring", "recurrence_pattern", "owner_id")
+
+
+def event_state(event) -> Dict[str, Any]:
+    state = {field: getattr(event, field) for field in VERSIONED_FIELDS}
+    # versions keep the pattern as its plain value ("weekly"), whatever form the event holds it in
+    if isinstance(state["recurrence_pattern"], Enum):
+        state["recurrence_pattern"] = state["recurrence_pattern"].value
+    return state
+
+
+def version_columns(before: Dict[str, Any], after: Dict[str, Any], seq: int, snapshot_interval: int) -> Dict[str, Any]:
+    """Column values of the version recording an edit from `before` to `after`.
+
+    Versions are reverse deltas, as in RCS: a version keeps only the old value
+    of each field the edit changed, so the state it describes is the next
+    newer state with those values put back. Every `snapshot_interval`-th
+    version keeps the whole old state, which bounds how far a read walks.
+    """
+    delta = {field: change["old"] for field, change in diff_fields(before, after).items()}
+    is_snapshot = seq % max(snapshot_interval, 1) == 0
+    return {
+        "seq": seq,
+        "is_snapshot": is_snapshot,
+        "changed_fields": list(delta),
+        **(before if is_snapshot else delta),
+    }
+
+
+def step_diff(previous, state: Dict[str, Any], edited_by: int, editor_email: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    # what compare_event_versions reports between the previous version and a new one whose full state is `state`;
+    # the previous version's delta is relative to exactly that state
+    return diff_fields(
+        {**apply_version(previous, state), "edited_by": previous.edited_by, "editor_email": previous.editor_email},
+        {**state, "edited_by": edited_by, "editor_email": editor_email}
+    )
+
+
+def apply_version(version, newer_state: Dict[str, Any]) -> Dict[str, Any]:
+    if version.is_snapshot:
+        return {field: getattr(version, field) for field in VERSIONED_FIELDS}
+    state = dict(newer_state)
+    for field in version.changed_fields or ():
+        state[field] = getattr(version, field)
+    return state
+
+
+class VersionChainGap(ValueError):
+    """A delta was about to be applied to a state it is not relative to."""
+
+
+def check_follows(version, newer) -> None:
+    # a delta is relative to the version one seq above it; a snapshot stands on its own
+    if newer is not None and not version.is_snapshot and version.seq != newer.seq - 1:
+        raise VersionChainGap(f"version seq {version.seq} does not follow seq {newer.seq} of event {version.event_id}")
+
+
+def reconstruct(versions: Iterable, current_state: Dict[str, Any]) -> Iterator[Tuple[Any, Dict[str, Any]]]:
+    # versions newest first and without gaps; the walk starts from the event as it is now
+    # (or the first snapshot reached) and yields each version with the full state it describes
+    state = current_state
+    newer = None
+    for version in versions:
+        check_follows(version, newer)
+        state = apply_version(version, state)
+        newer = version
+        yield version, state
@@ -0,0 +1,98 @@
+"""Mail sent during a busy editing session: a mail per edit vs coalesced digests.
+
+    python -m benchmarks.bench_change_notifications
+
+EDITORS collaborators (the owner and editors) keep editing EVENTS shared
+events for SESSION_SECONDS through update_event_by_id. Telling every other
+collaborator about every edit would send (collaborators - 1) mails per edit;
+the change notifier sends one digest per event and pause in editing (or per
+MAX_DELAY of non-stop editing) to each collaborator, and the dispatcher sends
+each digest as one SMTP transaction. Mail goes to the local SMTP stand-in.
+"""
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from app.config import settings
+from app.crud.event import update_event_by_id
+from app.schema.event import Event
+from app.services.change_notifier import change_notifier
+from app.services.mail_dispatcher import mail_dispatcher
+from benchmarks.common import execute, rolled_back_session, seed_user
+from benchmarks.smtp_sink import SMTPSink
+
+EVENTS = 20
+EDITORS = 10
+SESSION_SECONDS = 20
+EDIT_PAUSE = 0.005
+DEBOUNCE = 2.0
+MAX_DELAY = 10.0
+
+
+async def seed_shared_events(session, user_ids: list) -> list:
+    result = await execute(session, f"""
+        INSERT INTO event (title, description, start_time, end_time, location, is_recurring, owner_id, create_dtm)
+        SELECT 'Planning ' || g, 'notification benchmark', now() + g * interval '1 day', now() + g * interval '1 day' + interval '1 hour',
+               'Room 1', false, :owner_id, now()
+        FROM generate_series(1, {EVENTS}) g
+        RETURNING id
+    """, owner_id=user_ids[0])
+    event_ids = result.scalars().all()
+    await execute(session, """
+        INSERT INTO eventpermission (event_id, user_id, permission)
+        SELECT e.id, u.id, CASE WHEN u.id = :owner_id THEN 'owner'::permissionlevel ELSE 'editor'::permissionlevel END
+        FROM unnest(CAST(:event_ids AS integer[])) e(id), unnest(CAST(:user_ids AS integer[])) u(id)
+    """, owner_id=user_ids[0], event_ids=event_ids, user_ids=user_ids)
+    return event_ids
+
+
+async def editing_session(session, lock: asyncio.Lock, event_ids: list, user_ids: list) -> int:
+    edits = 0
+    start = datetime.now() + timedelta(days=1)
+    deadline = time.monotonic() + SESSION_SECONDS
+    while time.monotonic() < deadline:
+        event_id, editor_id = random.choice(event_ids), random.choice(user_ids)
+        edit = Event(title=f"Planning {event_id}", description=f"draft {edits}", start_time=start, end_time=start + timedelta(hours=1),
+                     location=f"Room {random.randint(1, 5)}", is_recurring=False, recurrence_pattern=None)
+        async with lock:
+            await update_event_by_id(event_id, edit, f"editor{editor_id}@bench.example.com", editor_id, session)
+        edits += 1
+        await asyncio.sleep(EDIT_PAUSE)
+    return edits
+
+
+async def main():
+    random.seed(7)
+    sink = SMTPSink().start()
+    settings.smtp_host, settings.smtp_port, settings.smtp_use_tls, settings.smtp_auth = "127.0.0.1", sink.port, False, False
+    async with rolled_back_session() as session:
+        user_ids = [await seed_user(session, f"notify_bench_{n}") for n in range(EDITORS)]
+        event_ids = await seed_shared_events(session, user_ids)
+        # digests are read through the benchmark's own (rolled back) session, one statement at a time
+        lock = asyncio.Lock()
+
+        @asynccontextmanager
+        async def shared_session():
+            async with lock:
+                yield session
+
+        change_notifier.session_factory = shared_session
+        change_notifier.debounce_seconds, change_notifier.max_delay_seconds = DEBOUNCE, MAX_DELAY
+        edits = await editing_session(session, lock, event_ids, user_ids)
+        await change_notifier.flush_all()
+        while mail_dispatcher.sent + mail_dispatcher.failed + mail_dispatcher.duplicates < mail_dispatcher.enqueued:
+            await asyncio.sleep(0.01)
+    mail_dispatcher.shutdown(timeout=5.0)
+    sink.stop()
+    stats = change_notifier.stats()
+    per_edit = edits * (EDITORS - 1)
+    print(f"{edits} edits of {EVENTS} events by {EDITORS} collaborators over {SESSION_SECONDS} s, debounce {DEBOUNCE:.0f} s, max delay {MAX_DELAY:.0f} s")
+    print(f"{'':>22} {'mails':>8} {'SMTP transactions':>18}")
+    print(f"{'a mail per edit':>22} {per_edit:>8} {per_edit:>18}")
+    print(f"{'coalesced digests':>22} {sink.recipients:>8} {sink.messages:>18}")
+    print(f"{stats['digests']} digests, {per_edit / max(sink.recipients, 1):.0f}x fewer mails, {per_edit / max(sink.messages, 1):.0f}x fewer transactions")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
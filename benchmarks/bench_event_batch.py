@@ -0,0 +1,61 @@
+"""POST /api/events/batch: refresh-per-event inserts vs chunked INSERT ... RETURNING.
+
+    python -m benchmarks.bench_event_batch
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from app.crud.event import create_events_batch
+from app.model.event import Event
+from app.model.eventpermission import EventPermission, PermissionLevel
+from app.schema.event import Event as NewEvent
+from benchmarks.common import rolled_back_session, seed_user
+
+BATCH_SIZES = [100, 1_000, 5_000]
+
+
+async def previous_create_events_batch(events, owner_id, session):
+    # the implementation this endpoint used before: a model object per event, add_all, one refresh per event,
+    # a second commit for the owners
+    events = [Event(**event.model_dump(), owner_id=owner_id) for event in events]
+    session.add_all(events)
+    await session.commit()
+    for event in events:
+        await session.refresh(event)
+    session.add_all([EventPermission(event_id=event.id, user_id=event.owner_id, permission=PermissionLevel.owner) for event in events])
+    await session.commit()
+    return events
+
+
+def make_events(count: int):
+    # the validated request body
+    start = datetime(2030, 1, 1, 9)
+    return [
+        NewEvent(title=f"Batch event {i}", description="imported", start_time=start + timedelta(hours=i),
+                 end_time=start + timedelta(hours=i, minutes=30), location=f"Room {i % 20}",
+                 is_recurring=False, recurrence_pattern=None)
+        for i in range(count)
+    ]
+
+
+async def main():
+    async with rolled_back_session() as session:
+        owner_id = await seed_user(session, "batch_bench")
+        print(f"{'events':>8} {'previous ev/s':>14} {'set-based ev/s':>15} {'speedup':>8}")
+        for count in BATCH_SIZES:
+            events = make_events(count)
+            start = time.perf_counter()
+            await previous_create_events_batch(events, owner_id, session)
+            previous = count / (time.perf_counter() - start)
+            session.expunge_all()
+
+            start = time.perf_counter()
+            created = await create_events_batch(events, owner_id, session)
+            current = count / (time.perf_counter() - start)
+            session.expunge_all()
+            assert len(created) == count
+            print(f"{count:>8} {previous:>14.0f} {current:>15.0f} {current / previous:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+"""Peak memory of a large event load: JSON array through /batch vs streamed NDJSON through /import.
+
+    python -m benchmarks.bench_event_import
+
+Memory is measured with tracemalloc (Python allocations only) while the
+events are parsed and inserted; the request body itself is generated on the
+fly for the NDJSON path, as a socket would deliver it.
+"""
+import asyncio
+import json
+import time
+import tracemalloc
+from pydantic import TypeAdapter
+from typing import List
+from app.crud.event import create_events_batch
+from app.schema.event import Event
+from app.services.event_import import import_events_ndjson
+from benchmarks.common import rolled_back_session, seed_user
+
+ROW_COUNTS = [5_000, 20_000, 40_000]
+BODY_CHUNK_BYTES = 64 * 1024
+
+
+def event_line(i: int) -> bytes:
+    return json.dumps({
+        "title": f"Imported event {i}", "description": "legacy calendar entry " * 4,
+        "start_time": "2030-01-01T09:00:00", "end_time": "2030-01-01T10:00:00",
+        "location": f"Room {i % 20}", "is_recurring": False, "recurrence_pattern": None,
+    }).encode()
+
+
+async def ndjson_body(count: int):
+    buffer = b""
+    for i in range(count):
+        buffer += event_line(i) + b"\n"
+        if len(buffer) >= BODY_CHUNK_BYTES:
+            yield buffer
+            buffer = b""
+    if buffer:
+        yield buffer
+
+
+async def measure(load) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    await load()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024 / 1024, elapsed
+
+
+async def main():
+    async with rolled_back_session() as session:
+        owner_id = await seed_user(session, "import_bench")
+        adapter = TypeAdapter(List[Event])
+        print(f"{'rows':>8} {'batch MiB':>10} {'batch s':>8} {'import MiB':>11} {'import s':>9}")
+        for count in ROW_COUNTS:
+            async def batch():
+                # what /batch does: the whole array is in memory, then validated into models, then inserted
+                body = b"[" + b",".join(event_line(i) for i in range(count)) + b"]"
+                await create_events_batch(adapter.validate_json(body), owner_id, session)
+                session.expunge_all()
+
+            async def streamed():
+                async for progress in import_events_ndjson(ndjson_body(count), owner_id, session):
+                    pass
+                assert progress["summary"]["imported"] == count
+
+            batch_mib, batch_s = await measure(batch)
+            import_mib, import_s = await measure(streamed)
+            print(f"{count:>8} {batch_mib:>10.1f} {batch_s:>8.2f} {import_mib:>11.1f} {import_s:>9.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""Recurrence expansion for GET /api/events/occurrences on multi-year daily series.
+
+    python -m benchmarks.bench_event_occurrences
+
+The engine enters each series at the window; the baseline walks it from
+start_time with rrule.between, as a client expanding raw events would. The
+walk grows with the series' age, entering at the window does not. The last
+table times the endpoint's work (window query + merged expansion) against
+seeded series.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+from types import SimpleNamespace
+from dateutil.rrule import DAILY, rrule
+from app.crud.event import get_events_in_window
+from app.utils.recurrence import event_occurrences, occurrences_in_window
+from benchmarks.common import execute, rolled_back_session, seed_user, timed
+
+SERIES_START = datetime(2016, 1, 1, 9)
+WINDOW_OFFSETS_YEARS = [1, 5, 10]
+WINDOW = timedelta(days=7)
+REPEAT = 200
+SEED_SERIES = 2_000
+SEED_ONE_OFFS = 50_000
+LIMIT = 1000
+
+
+def walk_from_start(event, window_start: datetime, window_end: datetime) -> list:
+    duration = event.end_time - event.start_time
+    starts = rrule(DAILY, dtstart=event.start_time).between(window_start - duration, window_end, inc=False)
+    return [(start, start + duration) for start in starts if start < window_end]
+
+
+def per_call_ms(fn, *args) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn(*args)
+    return (time.perf_counter() - start) * 1000 / REPEAT
+
+
+def expansion_table():
+    event = SimpleNamespace(id=1, start_time=SERIES_START, end_time=SERIES_START + timedelta(minutes=30), is_recurring=True, recurrence_pattern="daily")
+    print(f"one daily series from {SERIES_START:%Y-%m-%d}, {WINDOW.days}-day window")
+    print(f"{'window at':>10} {'walk ms':>9} {'enter ms':>9} {'speedup':>8}")
+    for years in WINDOW_OFFSETS_YEARS:
+        window_start = SERIES_START + timedelta(days=365 * years)
+        window_end = window_start + WINDOW
+        assert list(event_occurrences(event, window_start, window_end)) == walk_from_start(event, window_start, window_end)
+        walk_ms = per_call_ms(walk_from_start, event, window_start, window_end)
+        enter_ms = per_call_ms(lambda *args: list(event_occurrences(*args)), event, window_start, window_end)
+        print(f"{f'+{years}y':>10} {walk_ms:>9.3f} {enter_ms:>9.3f} {walk_ms / enter_ms:>7.0f}x")
+
+
+async def seed_calendar(session, owner_id: int):
+    # daily series started over the past ten years, plus one-off events spread over the same years
+    await execute(session, f"""
+        WITH new_events AS (
+            INSERT INTO event (title, description, start_time, end_time, location, is_recurring, recurrence_pattern, owner_id, create_dtm)
+            SELECT 'Daily sync ' || g, 'series', TIMESTAMP '2016-01-01 09:00' + (g % 3650) * interval '1 day' + (g % 8) * interval '1 hour',
+                   TIMESTAMP '2016-01-01 09:30' + (g % 3650) * interval '1 day' + (g % 8) * interval '1 hour', NULL, true, 'DAILY'::recurrencepattern, CAST(:owner_id AS integer), now()
+            FROM generate_series(1, {SEED_SERIES}) g
+            UNION ALL
+            SELECT 'Meeting ' || g, 'one-off', TIMESTAMP '2016-01-01 09:00' + g * interval '100 minutes',
+                   TIMESTAMP '2016-01-01 10:00' + g * interval '100 minutes', NULL, false, NULL, CAST(:owner_id AS integer), now()
+            FROM generate_series(1, {SEED_ONE_OFFS}) g
+            RETURNING id
+        )
+        INSERT INTO eventpermission (event_id, user_id, permission)
+        SELECT id, :owner_id, 'owner' FROM new_events
+    """, owner_id=owner_id)
+    await execute(session, "ANALYZE event")
+    await execute(session, "ANALYZE eventpermission")
+
+
+async def main():
+    expansion_table()
+    async with rolled_back_session() as session:
+        owner_id = await seed_user(session, "occurrence_bench")
+        await seed_calendar(session, owner_id)
+        print(f"\n{SEED_SERIES} daily series + {SEED_ONE_OFFS} one-off events, first {LIMIT} occurrences")
+        print(f"{'window':>10} {'query ms':>9} {'expand ms':>10} {'occurrences':>12}")
+        window_start = datetime(2026, 3, 1)
+        for days in (1, 7, 31):
+            window_end = window_start + timedelta(days=days)
+            query_ms = await timed(lambda: get_events_in_window(owner_id, window_start, window_end, session))
+            events = await get_events_in_window(owner_id, window_start, window_end, session)
+            start = time.perf_counter()
+            found = len(list(islice(occurrences_in_window(events, window_start, window_end), LIMIT)))
+            expand_ms = (time.perf_counter() - start) * 1000
+            print(f"{f'{days}d':>10} {query_ms:>9.1f} {expand_ms:>10.1f} {found:>12}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
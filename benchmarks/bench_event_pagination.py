@@ -0,0 +1,48 @@
+"""Offset vs keyset (cursor) pagination for GET /api/events.
+
+    python -m benchmarks.bench_event_pagination
+"""
+import asyncio
+from sqlmodel import select
+from app.crud.event import get_all_event_of_current_user, get_event_page_of_current_user
+from app.model.event import Event
+from app.model.eventpermission import EventPermission
+from app.utils.cursor import encode_cursor
+from benchmarks.common import rolled_back_session, seed_events, seed_user, timed
+
+EVENTS = 50_000
+PAGE = 20
+DEPTHS = [0, 1_000, 10_000, 40_000]
+
+
+async def main():
+    async with rolled_back_session() as session:
+        user_id = await seed_user(session, "pagination_bench")
+        await seed_events(session, user_id, EVENTS)
+
+        async def previous_offset(skip):
+            # the join + DISTINCT + OFFSET query this endpoint used before cursor pagination
+            query = (select(Event)
+                .join(EventPermission, EventPermission.event_id == Event.id)
+                .where(EventPermission.user_id == user_id, Event.title.contains(""))
+                .limit(PAGE).offset(skip).distinct())
+            await session.exec(query)
+
+        print(f"{EVENTS} events, page size {PAGE}")
+        print(f"{'depth':>8} {'join+distinct':>14} {'offset':>10} {'keyset':>10}  (median ms)")
+        for depth in DEPTHS:
+            anchor = None
+            if depth:
+                row = (await session.exec(
+                    select(Event.start_time, Event.id).where(Event.owner_id == user_id)
+                    .order_by(Event.start_time, Event.id).offset(depth - 1).limit(1)
+                )).first()
+                anchor = encode_cursor(row.start_time, row.id)
+            legacy_ms = await timed(lambda: previous_offset(depth))
+            offset_ms = await timed(lambda: get_all_event_of_current_user(user_id, PAGE, depth, "", session))
+            keyset_ms = await timed(lambda: get_event_page_of_current_user(user_id, PAGE, anchor, "", session))
+            print(f"{depth:>8} {legacy_ms:>14.2f} {offset_ms:>10.2f} {keyset_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+"""Substring (LIKE) vs indexed full-text search for GET /api/events.
+
+    python -m benchmarks.bench_event_search
+
+LIKE can stop early on a frequent title word in start_time order, full-text
+ranking has to score every match; the gap shows on rare words and multi-word queries.
+"""
+import asyncio
+from app.crud.event import get_all_event_of_current_user, get_event_page_of_current_user
+from app.schema.event import SearchMode
+from benchmarks.common import execute, rolled_back_session, seed_user, timed
+
+EVENTS = 200_000
+PAGE = 20
+# a rare word in ~0.1% of the rows, a common one in ~10%
+QUERIES = ["retrospective", "plann", "retro quart"]
+
+
+async def seed_searchable_events(session, owner_id: int, count: int):
+    await execute(session, f"""
+        WITH new_events AS (
+            INSERT INTO event (title, description, start_time, end_time, location, is_recurring, owner_id, create_dtm)
+            SELECT CASE WHEN g % 1000 = 0 THEN 'Quarterly retrospective ' || g
+                        WHEN g % 10 = 0 THEN 'Sprint planning ' || g
+                        ELSE 'Team sync ' || g END,
+                   'agenda item ' || md5(g::text), now() + g * interval '1 hour',
+                   now() + g * interval '1 hour' + interval '30 minutes', 'Room ' || (g % 50), false, :owner_id, now()
+            FROM generate_series(1, {count}) g
+            RETURNING id
+        )
+        INSERT INTO eventpermission (event_id, user_id, permission)
+        SELECT id, :owner_id, 'owner' FROM new_events
+    """, owner_id=owner_id)
+    await execute(session, "ANALYZE event")
+    await execute(session, "ANALYZE eventpermission")
+
+
+async def main():
+    async with rolled_back_session() as session:
+        user_id = await seed_user(session, "search_bench")
+        await seed_searchable_events(session, user_id, EVENTS)
+
+        print(f"{EVENTS} events, page size {PAGE}")
+        print(f"{'query':>14} {'like':>10} {'fulltext':>10} {'ft cursor':>10}  (median ms)")
+        for search in QUERIES:
+            async def like():
+                try:
+                    await get_all_event_of_current_user(user_id, PAGE, 0, search, session)
+                except Exception:
+                    # "retro quart" is not a substring of any title, LIKE finds nothing (404)
+                    pass
+            like_ms = await timed(like)
+            fulltext_ms = await timed(lambda: get_all_event_of_current_user(user_id, PAGE, 0, search, session, SearchMode.fulltext))
+            cursor_ms = await timed(lambda: get_event_page_of_current_user(user_id, PAGE, None, search, session, SearchMode.fulltext))
+            print(f"{search:>14} {like_ms:>10.2f} {fulltext_ms:>10.2f} {cursor_ms:>10.2f}")
+
+        plan = (await execute(session, """
+            EXPLAIN SELECT id FROM event WHERE search_vector @@ to_tsquery('simple', 'retrospective:*')
+        """)).scalars().all()
+        print("\n".join(plan))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
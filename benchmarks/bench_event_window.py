@@ -0,0 +1,97 @@
+"""Time-window filtering of GET /api/events (from/to) on a large calendar.
+
+    python -m benchmarks.bench_event_window
+
+"start < to AND end > from" on its own can only use the start_time btree for
+its first half: everything that started before `to` is read and filtered, so
+a window late in the calendar costs a scan of the years before it. The tsrange
+overlap is answered by the GiST index (ix_event_period) wherever the window
+falls. Both return the same rows; the plan column names the index each used.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy.dialects import postgresql
+from sqlmodel import select
+from app.crud.event import get_all_event_of_current_user, overlapping_window
+from app.model.event import Event
+from app.model.eventpermission import EventPermission
+from benchmarks.common import execute, rolled_back_session, seed_user, timed
+
+EVENTS = 500_000
+SEED_CHUNK = 100_000
+PAGE = 50
+CALENDAR_START = datetime(2020, 1, 1)
+# one event every 10 minutes: ~9.5 years; every 100th lasts three days
+WINDOWS = [("week, year 1", 30, 7), ("week, year 5", 1800, 7), ("week, year 9", 3300, 7), ("month, year 9", 3300, 31)]
+
+
+async def seed_calendar(session, owner_id: int):
+    # in chunks, so no single statement (GiST inserts included) outlasts the app's statement timeout
+    for first in range(1, EVENTS + 1, SEED_CHUNK):
+        await seed_chunk(session, owner_id, first, min(first + SEED_CHUNK - 1, EVENTS))
+    await execute(session, "ANALYZE event")
+    await execute(session, "ANALYZE eventpermission")
+
+
+async def seed_chunk(session, owner_id: int, first: int, last: int):
+    await execute(session, f"""
+        WITH new_events AS (
+            INSERT INTO event (title, description, start_time, end_time, location, is_recurring, owner_id, create_dtm)
+            SELECT 'Calendar entry ' || g, 'window benchmark', TIMESTAMP '{CALENDAR_START}' + g * interval '10 minutes',
+                   TIMESTAMP '{CALENDAR_START}' + g * interval '10 minutes' + CASE WHEN g % 100 = 0 THEN interval '3 days' ELSE interval '30 minutes' END,
+                   NULL, false, :owner_id, now()
+            FROM generate_series({first}, {last}) g
+            RETURNING id
+        )
+        INSERT INTO eventpermission (event_id, user_id, permission)
+        SELECT id, :owner_id, 'owner' FROM new_events
+    """, owner_id=owner_id)
+
+
+def comparison_query(user_id: int, window_start: datetime, window_end: datetime):
+    # the same page with only the plain comparisons
+    return (select(Event)
+        .where(Event.id.in_(select(EventPermission.event_id).where(EventPermission.user_id == user_id)))
+        .where(Event.start_time < window_end, Event.end_time > window_start)
+        .order_by(Event.start_time, Event.id)
+        .limit(PAGE))
+
+
+def range_query(user_id: int, window_start: datetime, window_end: datetime):
+    return (select(Event)
+        .where(Event.id.in_(select(EventPermission.event_id).where(EventPermission.user_id == user_id)))
+        .where(*overlapping_window(window_start, window_end))
+        .order_by(Event.start_time, Event.id)
+        .limit(PAGE))
+
+
+async def event_index(session, query) -> str:
+    compiled = query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    plan = "\n".join((await execute(session, f"EXPLAIN {compiled}")).scalars().all())
+    for index in ("ix_event_period", "ix_event_start_time_id"):
+        if index in plan:
+            return index
+    return "seq scan" if "Seq Scan on event" in plan else "other"
+
+
+async def main():
+    async with rolled_back_session() as session:
+        owner_id = await seed_user(session, "window_bench")
+        await seed_calendar(session, owner_id)
+        print(f"{EVENTS} events of one user, first page of {PAGE}")
+        print(f"{'window':>14} {'compare ms':>11} {'plan':>22} {'tsrange ms':>11} {'plan':>22}")
+        for label, offset_days, days in WINDOWS:
+            window_start = CALENDAR_START + timedelta(days=offset_days)
+            window_end = window_start + timedelta(days=days)
+            compare = comparison_query(owner_id, window_start, window_end)
+            ranged = range_query(owner_id, window_start, window_end)
+            expected = [event.id for event in (await session.exec(compare)).all()]
+            found = [event.id for event in await get_all_event_of_current_user(owner_id, PAGE, 0, "", session, window_start=window_start, window_end=window_end)]
+            assert found == expected, label
+            compare_ms = await timed(lambda: session.exec(compare))
+            range_ms = await timed(lambda: get_all_event_of_current_user(owner_id, PAGE, 0, "", session, window_start=window_start, window_end=window_end))
+            print(f"{label:>14} {compare_ms:>11.1f} {await event_index(session, compare):>22} {range_ms:>11.1f} {await event_index(session, ranged):>22}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+"""Free/busy (POST /api/events/freebusy) for up to 200 attendees over a month.
+
+    python -m benchmarks.bench_freebusy
+
+Every attendee's events come from one query (the user ids travel as a single
+array parameter); the baseline issues the per-user window query once per
+attendee, as a client assembling free/busy from calendars would. Both feed the
+same expansion and sweep-line merge, timed separately in the last columns.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from app.crud.event import get_events_in_window
+from app.crud.freebusy import get_busy_events, get_freebusy
+from app.utils.intervals import merge_intervals
+from app.utils.recurrence import event_occurrences
+from benchmarks.common import execute, rolled_back_session, timed
+
+USERS = 200
+MEETINGS = 28_000
+ATTENDEES_PER_MEETING = 8
+SEED_CHUNK = 10_000
+CALENDAR_START = datetime(2030, 1, 1, 8)
+# a meeting every 37 minutes around the clock: ~2 years of calendar
+WINDOW_START = datetime(2031, 3, 1)
+WINDOW = timedelta(days=31)
+ATTENDEE_COUNTS = [10, 50, 200]
+
+
+async def seed_users(session) -> list:
+    result = await execute(session, f"""
+        INSERT INTO "user" (username, email, password_hashed, create_dtm)
+        SELECT 'freebusy_bench_' || g, 'freebusy_bench_' || g || '@bench.example.com', 'x', now()
+        FROM generate_series(1, {USERS}) g
+        RETURNING id
+    """)
+    return sorted(result.scalars().all())
+
+
+async def seed_calendar(session, user_ids: list):
+    # in chunks, so no single statement outlasts the app's statement timeout
+    for first in range(1, MEETINGS + 1, SEED_CHUNK):
+        await seed_meetings(session, user_ids, first, min(first + SEED_CHUNK - 1, MEETINGS))
+    # each user also owns a daily stand-up and a weekly 1:1, started years before the window
+    await execute(session, f"""
+        WITH new_events AS (
+            INSERT INTO event (title, description, start_time, end_time, location, is_recurring, recurrence_pattern, owner_id, create_dtm)
+            SELECT 'Stand-up', 'series', TIMESTAMP '2027-01-01 09:00' + u.n * interval '1 day', TIMESTAMP '2027-01-01 09:15' + u.n * interval '1 day',
+                   NULL, true, 'DAILY'::recurrencepattern, u.id, now()
+            FROM unnest(CAST(:ids AS integer[])) WITH ORDINALITY u(id, n)
+            UNION ALL
+            SELECT '1:1', 'series', TIMESTAMP '2028-01-03 14:00' + u.n * interval '1 day', TIMESTAMP '2028-01-03 15:00' + u.n * interval '1 day',
+                   NULL, true, 'WEEKLY'::recurrencepattern, u.id, now()
+            FROM unnest(CAST(:ids AS integer[])) WITH ORDINALITY u(id, n)
+            RETURNING id, owner_id
+        )
+        INSERT INTO eventpermission (event_id, user_id, permission)
+        SELECT id, owner_id, 'owner' FROM new_events
+    """, ids=user_ids)
+    await execute(session, "ANALYZE event")
+    await execute(session, "ANALYZE eventpermission")
+
+
+async def seed_meetings(session, user_ids: list, first: int, last: int):
+    # the owner plus the attendees 29, 58, ... places further along the user list
+    await execute(session, f"""
+        WITH new_events AS (
+            INSERT INTO event (title, description, start_time, end_time, location, is_recurring, owner_id, create_dtm)
+            SELECT 'Meeting ' || g, 'freebusy benchmark', TIMESTAMP '{CALENDAR_START}' + g * interval '37 minutes',
+                   TIMESTAMP '{CALENDAR_START}' + g * interval '37 minutes' + interval '45 minutes', NULL, false,
+                   (CAST(:ids AS integer[]))[1 + g % {USERS}], now()
+            FROM generate_series({first}, {last}) g
+            RETURNING id, owner_id
+        )
+        INSERT INTO eventpermission (event_id, user_id, permission)
+        SELECT id,
+               (CAST(:ids AS integer[]))[1 + (array_position(CAST(:ids AS integer[]), owner_id) - 1 + k * 29) % {USERS}],
+               CASE WHEN k = 0 THEN 'owner'::permissionlevel ELSE 'editor'::permissionlevel END
+        FROM new_events, generate_series(0, {ATTENDEES_PER_MEETING - 1}) k
+    """, ids=user_ids)
+
+
+async def per_user_queries(user_ids: list, window_start: datetime, window_end: datetime, session) -> list:
+    return [(user_id, event) for user_id in user_ids for event in await get_events_in_window(user_id, window_start, window_end, session)]
+
+
+def merge_ms(rows: list, window_start: datetime, window_end: datetime) -> float:
+    start = time.perf_counter()
+    per_user = {}
+    for event in rows:
+        per_user.setdefault(event.user_id, []).extend(event_occurrences(event, window_start, window_end))
+    merge_intervals(block for blocks in per_user.values() for block in merge_intervals(blocks))
+    return (time.perf_counter() - start) * 1000
+
+
+async def main():
+    async with rolled_back_session() as session:
+        user_ids = await seed_users(session)
+        await seed_calendar(session, user_ids)
+        window_end = WINDOW_START + WINDOW
+        print(f"{MEETINGS} meetings of {ATTENDEES_PER_MEETING} attendees among {USERS} users + daily and weekly series, {WINDOW.days}-day window")
+        print(f"{'attendees':>10} {'per-user ms':>12} {'one query ms':>13} {'merge ms':>9} {'endpoint ms':>12} {'busy blocks':>12} {'free slots':>11}")
+        for count in ATTENDEE_COUNTS:
+            attendees = user_ids[:count]
+            rows = await get_busy_events(attendees, WINDOW_START, window_end, session)
+            baseline = await per_user_queries(attendees, WINDOW_START, window_end, session)
+            assert sorted((row.user_id, row.id) for row in rows) == sorted((user_id, event.id) for user_id, event in baseline)
+            per_user_ms = await timed(lambda: per_user_queries(attendees, WINDOW_START, window_end, session))
+            query_ms = await timed(lambda: get_busy_events(attendees, WINDOW_START, window_end, session))
+            endpoint_ms = await timed(lambda: get_freebusy(attendees, WINDOW_START, window_end, timedelta(minutes=30), session))
+            result = await get_freebusy(attendees, WINDOW_START, window_end, timedelta(minutes=30), session)
+            blocks = sum(len(user.busy) for user in result.busy)
+            print(f"{count:>10} {per_user_ms:>12.1f} {query_ms:>13.1f} {merge_ms(rows, WINDOW_START, window_end):>9.1f} {endpoint_ms:>12.1f} {blocks:>12} {len(result.free):>11}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,128 @@
+"""Login throughput and the latency of other requests during a login storm.
+
+    python -m benchmarks.bench_login_storm
+
+Password checks run either inline on the event loop (how login worked
+before) or through the bcrypt thread pool. While they run, a probe keeps
+requesting GET / through the ASGI app and records its latency.
+
+Then the revocation check every authenticated request makes, against the
+Redis-protocol stand-in (benchmarks.resp_sink) holding REVOKED revocations:
+a round trip per token on the bare store, the Bloom filter in front of it as
+each worker runs it, and the full and incremental syncs that keep the filter
+current. No database is needed.
+"""
+import asyncio
+import statistics
+import time
+import httpx
+from redis.asyncio import Redis
+from app.config import settings
+from app.main import app
+from app.services.revocation import BloomFilteredRevocationStore, RedisRevocationStore, token_key
+from app.utils.hash import hash_pool, pass_context, verify_hash
+from benchmarks.resp_sink import RESPSink
+
+LOGINS = 32
+CONCURRENCY = 16
+REVOKED = 10_000
+LOGOUTS = 100
+TOKEN_CHECKS = 5_000
+
+
+async def inline_verify(password, hashed):
+    return pass_context.verify(password, hashed)
+
+
+async def storm(verify, hashed: str) -> float:
+    # CONCURRENCY clients logging in back to back until LOGINS are done
+    remaining = iter(range(LOGINS))
+
+    async def client():
+        for _ in remaining:
+            assert await verify("correct horse", hashed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(CONCURRENCY)))
+    return time.perf_counter() - start
+
+
+async def probe(client: httpx.AsyncClient, done: asyncio.Event) -> list:
+    # latency is measured from when the request was due, so time spent waiting for a blocked loop counts
+    samples = []
+    while not done.is_set():
+        due = time.perf_counter() + 0.005
+        await asyncio.sleep(0.005)
+        await client.get("/")
+        samples.append((time.perf_counter() - due) * 1000)
+    return samples
+
+
+async def run(label: str, verify, hashed: str, client: httpx.AsyncClient):
+    done = asyncio.Event()
+    probe_task = asyncio.create_task(probe(client, done))
+    await asyncio.sleep(0)
+    elapsed = await storm(verify, hashed)
+    done.set()
+    samples = sorted(await probe_task)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{label:>8} {LOGINS / elapsed:>10.1f} {len(samples):>8} {statistics.median(samples):>10.2f} {p99:>10.2f} {samples[-1]:>10.2f}")
+
+
+async def timed(fn) -> float:
+    start = time.perf_counter()
+    await fn()
+    return (time.perf_counter() - start) * 1000
+
+
+async def revocation_checks():
+    sink = RESPSink().start()
+    bare = RedisRevocationStore(Redis.from_url(sink.url))
+    filtered = BloomFilteredRevocationStore(RedisRevocationStore(Redis.from_url(sink.url)), capacity=settings.token_revocation_bloom_capacity,
+                                            error_rate=settings.token_revocation_bloom_error_rate, full_sync_seconds=3600)
+    expires_at = time.time() + 3600
+    revoked = [token_key(f"revoked {n}") for n in range(REVOKED)]
+    for key in revoked:
+        await bare.revoke(key, expires_at)
+    full_ms = await timed(filtered.sync)
+    # logouts on other workers, picked up by the next sync
+    logouts = [token_key(f"logout {n}") for n in range(LOGOUTS)]
+    for key in logouts:
+        await bare.revoke(key, expires_at)
+    incremental_ms = await timed(filtered.sync)
+    assert all([await filtered.is_revoked(key) for key in logouts + revoked[:LOGOUTS]])
+    live = [token_key(f"live {n}") for n in range(TOKEN_CHECKS)]
+    print(f"{REVOKED} revoked tokens; full sync {full_ms:.1f} ms, incremental sync of {LOGOUTS} logouts {incremental_ms:.1f} ms")
+    print(f"{'store':>14} {'checks/s':>10} {'us/check':>10}  ({TOKEN_CHECKS} live tokens, one after another)")
+    for label, store in [("bare redis", bare), ("bloom + redis", filtered)]:
+
+        async def check_all():
+            for key in live:
+                assert not await store.is_revoked(key)
+
+        elapsed = await timed(check_all)
+        print(f"{label:>14} {TOKEN_CHECKS / elapsed * 1000:>10.0f} {elapsed * 1000 / TOKEN_CHECKS:>10.1f}")
+    stats = filtered.stats()
+    print(f"bloom: {stats['fast_negatives']} answered locally, {stats['backend_checks']} backend checks ({stats['false_positives']} false positives)")
+    await bare.close()
+    await filtered.close()
+    sink.stop()
+
+
+async def main():
+    hashed = pass_context.hash("correct horse")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/")
+        print(f"{LOGINS} logins, {CONCURRENCY} concurrent, {hash_pool.workers} hash workers")
+        print(f"{'mode':>8} {'logins/s':>10} {'probes':>8} {'p50 ms':>10} {'p99 ms':>10} {'max ms':>10}  (GET / latency)")
+        await run("inline", inline_verify, hashed, client)
+        await run("pool", verify_hash, hashed, client)
+    print(hash_pool.stats())
+    hash_pool.shutdown()
+    print()
+    await revocation_checks()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+"""Outbound mail during an edit burst: a connection per message vs the mail dispatcher.
+
+    python -m benchmarks.bench_mail_dispatch
+
+Mail goes to the local SMTP stand-in (benchmarks.smtp_sink), which waits
+SESSION_DELAY per connection in place of the TLS handshake and login. The
+baseline sends each message on a connection of its own from THREADS threads,
+as BackgroundTasks did from the web worker's threadpool. The dispatcher reuses
+its workers' connections and, when a burst notifies several recipients of
+the same update, sends it once to all of them. No database is needed.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.config import settings
+from app.services.mail_dispatcher import MailDispatcher
+from app.utils.email_utils import build_message, open_smtp
+from benchmarks.smtp_sink import SMTPSink
+
+UPDATES = 2_000
+RECIPIENTS_PER_UPDATE = [1, 10]
+THREADS = 40
+SESSION_DELAY = 0.05
+MESSAGE_DELAY = 0.002
+WORKERS = 4
+BATCH_SIZE = 50
+
+
+def burst(recipients_per_update: int) -> list:
+    updates = UPDATES // recipients_per_update
+    return [(f"Event {update} updated", f"The event with id='{update}' has been successfully updated.", f"user{update}-{n}@bench.example.com")
+            for update in range(updates) for n in range(recipients_per_update)]
+
+
+def send_one(subject: str, body: str, to_email: str):
+    with open_smtp() as server:
+        server.sendmail(settings.email_id, to_email, build_message(subject, body, [to_email]).as_string())
+
+
+def per_call(mails: list):
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        list(executor.map(lambda mail: send_one(*mail), mails))
+
+
+def dispatched(mails: list) -> MailDispatcher:
+    dispatcher = MailDispatcher(workers=WORKERS, queue_size=len(mails), batch_size=BATCH_SIZE, max_retries=3,
+                                retry_backoff_seconds=0.1, idle_close_seconds=60.0)
+    for subject, body, to_email in mails:
+        assert dispatcher.enqueue(subject, body, to_email)
+    while dispatcher.sent + dispatcher.failed + dispatcher.duplicates < len(mails):
+        time.sleep(0.005)
+    dispatcher.shutdown(timeout=5.0)
+    assert dispatcher.failed == 0
+    return dispatcher
+
+
+def run(label: str, fn, mails: list):
+    sink = SMTPSink(session_delay=SESSION_DELAY, message_delay=MESSAGE_DELAY).start()
+    settings.smtp_host, settings.smtp_port = "127.0.0.1", sink.port
+    start = time.perf_counter()
+    fn(mails)
+    elapsed = time.perf_counter() - start
+    sink.stop()
+    assert sink.recipients == len(mails), label
+    print(f"{label:>26} {elapsed:>8.2f} {len(mails) / elapsed:>8.0f} {sink.connections:>12} {sink.messages:>13}")
+
+
+def main():
+    settings.smtp_use_tls, settings.smtp_auth = False, False
+    print(f"{UPDATES} notifications, {SESSION_DELAY * 1000:.0f} ms per SMTP session setup, {MESSAGE_DELAY * 1000:.0f} ms per message")
+    print(f"{'mode':>26} {'seconds':>8} {'mail/s':>8} {'connections':>12} {'transactions':>13}")
+    for recipients in RECIPIENTS_PER_UPDATE:
+        mails = burst(recipients)
+        run(f"per call, {recipients} rcpt/update", per_call, mails)
+        run(f"dispatcher, {recipients} rcpt/update", dispatched, mails)
+
+
+if __name__ == "__main__":
+    main()
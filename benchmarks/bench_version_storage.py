@@ -0,0 +1,85 @@
+"""Storage and read cost of event versions: full copies vs reverse deltas with periodic snapshots.
+
+    python -m benchmarks.bench_version_storage
+
+Each run edits one event the same way (mostly location changes, sometimes the
+title, rarely the long description) through update_event_by_id. A snapshot
+interval of 1 makes every version a full copy, which is what versions used to
+be. Reads reconstruct a version the way /history does, and a first page of
+/changelog.
+"""
+import asyncio
+import hashlib
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from app.config import settings
+from app.crud.change_log import get_changelog_page
+from app.crud.event import update_event_by_id
+from app.crud.version_history import get_event_version_by_uuid
+from app.model.event import Event
+from benchmarks.common import execute, rolled_back_session, seed_user, timed
+
+EDITS = 500
+SNAPSHOT_INTERVALS = [1, 10, 50]
+READ_SAMPLES = 100
+CHANGELOG_PAGE = 100
+
+
+def long_description(seed: int) -> str:
+    # ~2 KB of hex words, which postgres cannot compress away the way it would repeated text
+    return " ".join(hashlib.md5(f"{seed}:{i}".encode()).hexdigest() for i in range(64))
+
+
+def edited(event: Event, i: int, rnd: random.Random) -> Event:
+    fields = event.model_dump(exclude={"id", "owner_id", "create_dtm"})
+    roll = rnd.random()
+    if roll < 0.80:
+        fields["location"] = f"Room {i % 40}"
+    elif roll < 0.95:
+        fields["title"] = f"Design review #{i}"
+    else:
+        fields["description"] = long_description(i)
+    return Event(**fields)
+
+
+async def run(session, owner_id: int, interval: int) -> tuple:
+    settings.version_snapshot_interval = interval
+    event = Event(
+        title="Design review", description=long_description(0), start_time=datetime(2030, 1, 1, 9),
+        end_time=datetime(2030, 1, 1, 10), location="Room 0", is_recurring=False, recurrence_pattern=None, owner_id=owner_id
+    )
+    session.add(event)
+    await session.commit()
+    rnd = random.Random(7)
+    current = event
+    for i in range(1, EDITS + 1):
+        current = await update_event_by_id(event.id, edited(current, i, rnd), "bench@bench.example.com", owner_id, session)
+
+    stored = (await execute(session, "SELECT sum(pg_column_size(v.*)) FROM eventversion v WHERE event_id = :id", id=event.id)).scalar_one()
+    version_ids = (await execute(session, "SELECT version_id FROM eventversion WHERE event_id = :id", id=event.id)).scalars().all()
+
+    samples = []
+    for version_id in rnd.sample(version_ids, READ_SAMPLES):
+        start = time.perf_counter()
+        await get_event_version_by_uuid(version_id, event.id, session)
+        samples.append((time.perf_counter() - start) * 1000)
+    changelog_ms = await timed(lambda: get_changelog_page(event.id, CHANGELOG_PAGE, None, session))
+    return stored, statistics.median(samples), max(samples), changelog_ms
+
+
+async def main():
+    async with rolled_back_session() as session:
+        owner_id = await seed_user(session, "version_bench")
+        print(f"{EDITS} edits per run, {READ_SAMPLES} random version reads")
+        print(f"{'snapshot every':>14} {'KiB stored':>11} {'B/version':>10} {'saved':>7} {'read p50 ms':>12} {'read max ms':>12} {'page ms':>8}")
+        baseline = None
+        for interval in SNAPSHOT_INTERVALS:
+            stored, p50, worst, changelog_ms = await run(session, owner_id, interval)
+            baseline = baseline or stored
+            print(f"{interval:>14} {stored / 1024:>11.1f} {stored / EDITS:>10.0f} {1 - stored / baseline:>7.0%} {p50:>12.2f} {worst:>12.2f} {changelog_ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+"""Shared helpers for the benchmark scripts in this directory.
+
+Benchmarks run against the database configured in .env (migrated with
+alembic upgrade head). Everything they write happens inside one outer
+transaction that is rolled back, so they leave no data behind.
+"""
+import statistics
+import time
+from contextlib import asynccontextmanager
+from sqlalchemy import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db.db_session import engine
+# registers every table so ORM flushes can resolve foreign keys, as alembic/env.py does
+from app.model import event, eventpermission, eventversion, user
+
+
+@asynccontextmanager
+async def rolled_back_session():
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        # commits issued by crud code become savepoints inside the outer transaction
+        session = AsyncSession(bind=conn, expire_on_commit=False, join_transaction_mode="create_savepoint")
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+    await engine.dispose()
+
+
+async def execute(session, statement: str, **params):
+    return await session.exec(text(statement), params=params)
+
+
+async def timed(fn, repeat: int = 5) -> float:
+    """Median wall time of fn() in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+async def seed_user(session, label: str) -> int:
+    result = await execute(
+        session,
+        "INSERT INTO \"user\" (username, email, password_hashed, create_dtm) "
+        "VALUES (:name, :email, 'x', now()) RETURNING id",
+        name=label, email=f"{label}@bench.example.com"
+    )
+    return result.scalar_one()
+
+
+async def seed_events(session, owner_id: int, count: int, title: str = "Bench event"):
+    # events spread one hour apart starting now, each with the owner's permission row
+    await execute(session, f"""
+        WITH new_events AS (
+            INSERT INTO event (title, description, start_time, end_time, location, is_recurring, owner_id, create_dtm)
+            SELECT :title || ' ' || g, 'benchmark description ' || g, now() + g * interval '1 hour',
+                   now() + g * interval '1 hour' + interval '30 minutes', 'Room ' || (g % 50), false, :owner_id, now()
+            FROM generate_series(1, {count}) g
+            RETURNING id
+        )
+        INSERT INTO eventpermission (event_id, user_id, permission)
+        SELECT id, :owner_id, 'owner' FROM new_events
+    """, owner_id=owner_id, title=title)
+    await execute(session, "ANALYZE event")
+    await execute(session, "ANALYZE eventpermission")
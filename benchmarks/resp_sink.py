@@ -0,0 +1,256 @@
+"""A local Redis-protocol stand-in that keeps its data in memory.
+
+    python -m benchmarks.resp_sink --port 6380
+
+and point the app at it with REDIS_URL=redis://127.0.0.1:6380/0. It speaks
+RESP2 and just the commands the response cache and the revocation store
+send: strings with EX, sets, sorted sets, TIME and MULTI/EXEC. Expired keys
+are dropped when next touched. One lock serializes every command, so a
+MULTI/EXEC block runs as one step like on a real server.
+"""
+import argparse
+import socket
+import socketserver
+import threading
+import time
+
+
+class RESPError(Exception):
+    pass
+
+
+class RESPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 256
+
+    def __init__(self, address=("127.0.0.1", 0)):
+        super().__init__(address, RESPSinkHandler)
+        self.lock = threading.Lock()
+        self.data = {}
+        self.expires_at = {}
+        self.connections = 0
+        self.commands = 0
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    @property
+    def url(self) -> str:
+        return f"redis://127.0.0.1:{self.port}/0"
+
+    def start(self) -> "RESPSink":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def _live(self, key: bytes, kind: type):
+        expires_at = self.expires_at.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self.data.pop(key, None)
+            del self.expires_at[key]
+        value = self.data.get(key)
+        if value is not None and not isinstance(value, kind):
+            raise RESPError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _store(self, key: bytes, value):
+        self.data[key] = value
+        self.expires_at.pop(key, None)
+
+    def execute(self, command: list):
+        # called with the lock held
+        self.commands += 1
+        name, args = command[0].upper().decode(), command[1:]
+        handler = getattr(self, f"cmd_{name.lower()}", None)
+        if handler is None:
+            raise RESPError(f"ERR unknown command '{name}'")
+        return handler(*args)
+
+    def cmd_ping(self, *args):
+        return args[0] if args else "PONG"
+
+    def cmd_client(self, *args):
+        return "OK"
+
+    def cmd_select(self, db):
+        return "OK"
+
+    def cmd_time(self):
+        now = time.time()
+        return [str(int(now)).encode(), str(int(now % 1 * 1_000_000)).encode()]
+
+    def cmd_get(self, key):
+        return self._live(key, bytes)
+
+    def cmd_set(self, key, value, *options):
+        self._live(key, object)
+        self._store(key, value)
+        options = [option.upper() for option in options]
+        if b"EX" in options:
+            self.expires_at[key] = time.monotonic() + int(options[options.index(b"EX") + 1])
+        return "OK"
+
+    def cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._live(key, object) is not None:
+                del self.data[key]
+                self.expires_at.pop(key, None)
+                removed += 1
+        return removed
+
+    def cmd_expire(self, key, seconds):
+        if self._live(key, object) is None:
+            return 0
+        self.expires_at[key] = time.monotonic() + int(seconds)
+        return 1
+
+    def cmd_sadd(self, key, *members):
+        members_set = self._live(key, set)
+        if members_set is None:
+            members_set = set()
+            self._store(key, members_set)
+        added = len(set(members) - members_set)
+        members_set.update(members)
+        return added
+
+    def cmd_smembers(self, key):
+        return sorted(self._live(key, set) or ())
+
+    def cmd_zadd(self, key, *args):
+        scores = self._live(key, dict)
+        if scores is None:
+            scores = {}
+            self._store(key, scores)
+        added = 0
+        for score, member in zip(args[::2], args[1::2]):
+            added += member not in scores
+            scores[member] = float(score)
+        return added
+
+    def cmd_zscore(self, key, member):
+        score = (self._live(key, dict) or {}).get(member)
+        return None if score is None else repr(score).encode()
+
+    def cmd_zcard(self, key):
+        return len(self._live(key, dict) or {})
+
+    def cmd_zrem(self, key, *members):
+        scores = self._live(key, dict) or {}
+        return sum(scores.pop(member, None) is not None for member in members)
+
+    def _in_range(self, key, low, high):
+        low_bound, high_bound = _score_bound(low), _score_bound(high)
+        scores = self._live(key, dict) or {}
+        return [member for member, score in sorted(scores.items(), key=lambda item: (item[1], item[0]))
+                if _above(score, low_bound) and _below(score, high_bound)]
+
+    def cmd_zrangebyscore(self, key, low, high):
+        return self._in_range(key, low, high)
+
+    def cmd_zremrangebyscore(self, key, low, high):
+        return self.cmd_zrem(key, *self._in_range(key, low, high))
+
+
+def _score_bound(value: bytes):
+    # (value, exclusive) from "1.5", "(1.5", "-inf" or "+inf"
+    exclusive = value.startswith(b"(")
+    return float(value[1:] if exclusive else value), exclusive
+
+
+def _above(score: float, bound) -> bool:
+    value, exclusive = bound
+    return score > value if exclusive else score >= value
+
+
+def _below(score: float, bound) -> bool:
+    value, exclusive = bound
+    return score < value if exclusive else score <= value
+
+
+class RESPSinkHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        # pipelined commands get one small reply each; without this every MULTI/EXEC waits on delayed ACKs
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.split()
+        command = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            command.append(self.rfile.read(length + 2)[:-2])
+        return command
+
+    def encode(self, reply) -> bytes:
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, RESPError):
+            return b"-" + str(reply).encode() + b"\r\n"
+        if isinstance(reply, str):
+            return b"+" + reply.encode() + b"\r\n"
+        if isinstance(reply, int):
+            return b":" + str(reply).encode() + b"\r\n"
+        if isinstance(reply, bytes):
+            return b"$" + str(len(reply)).encode() + b"\r\n" + reply + b"\r\n"
+        return b"*" + str(len(reply)).encode() + b"\r\n" + b"".join(self.encode(item) for item in reply)
+
+    def handle(self):
+        sink = self.server
+        with sink.lock:
+            sink.connections += 1
+        queued = None
+        while True:
+            command = self.read_command()
+            if command is None:
+                return
+            if not command:
+                continue
+            name = command[0].upper()
+            if name == b"QUIT":
+                self.wfile.write(self.encode("OK"))
+                return
+            if name == b"MULTI":
+                queued, reply = [], "OK"
+            elif name == b"DISCARD":
+                queued, reply = None, "OK"
+            elif name == b"EXEC":
+                with sink.lock:
+                    reply = [self.run(sink, queued_command) for queued_command in queued or []]
+                queued = None
+            elif queued is not None:
+                queued.append(command)
+                reply = "QUEUED"
+            else:
+                with sink.lock:
+                    reply = self.run(sink, command)
+            self.wfile.write(self.encode(reply))
+
+    def run(self, sink: RESPSink, command: list):
+        try:
+            return sink.execute(command)
+        except RESPError as e:
+            return e
+        except (ValueError, TypeError, IndexError):
+            return RESPError(f"ERR wrong arguments for '{command[0].decode()}' command")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=6380)
+    args = parser.parse_args()
+    sink = RESPSink(("127.0.0.1", args.port))
+    print(f"RESP sink listening on 127.0.0.1:{sink.port}")
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        print(f"{sink.connections} connections, {sink.commands} commands, {len(sink.data)} keys")
@@ -0,0 +1,96 @@
+"""A local SMTP stand-in that accepts and counts mail without delivering it.
+
+    python -m benchmarks.smtp_sink --port 2525
+
+and point the app at it with SMTP_HOST=127.0.0.1 SMTP_PORT=2525
+SMTP_USE_TLS=false SMTP_AUTH=false. It speaks just enough SMTP for smtplib
+(no TLS or AUTH); `session_delay` stands in for the TLS handshake and login a
+real server costs per connection, `message_delay` for its time per message.
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    # the default backlog of 5 drops connections when a burst opens dozens at once
+    request_queue_size = 256
+
+    def __init__(self, address=("127.0.0.1", 0), session_delay: float = 0.0, message_delay: float = 0.0):
+        super().__init__(address, SMTPSinkHandler)
+        self.session_delay = session_delay
+        self.message_delay = message_delay
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+        self.recipients = 0
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> "SMTPSink":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        sink = self.server
+        with sink.lock:
+            sink.connections += 1
+        time.sleep(sink.session_delay)
+        self.reply("220 smtp-sink ready")
+        recipients = 0
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command in (b"EHLO", b"HELO"):
+                self.reply("250-smtp-sink")
+                self.reply("250 8BITMIME")
+            elif command in (b"MAIL", b"RSET"):
+                recipients = 0
+                self.reply("250 OK")
+            elif command == b"RCPT":
+                recipients += 1
+                self.reply("250 OK")
+            elif command == b"DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                time.sleep(sink.message_delay)
+                with sink.lock:
+                    sink.messages += 1
+                    sink.recipients += recipients
+                self.reply("250 OK queued")
+            elif command == b"NOOP":
+                self.reply("250 OK")
+            elif command == b"QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=2525)
+    args = parser.parse_args()
+    sink = SMTPSink(("127.0.0.1", args.port))
+    print(f"SMTP sink listening on 127.0.0.1:{sink.port}")
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        print(f"{sink.connections} connections, {sink.messages} messages, {sink.recipients} recipients")
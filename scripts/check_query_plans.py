@@ -0,0 +1,148 @@
+"""EXPLAIN the hot authorization/listing queries against seeded data and fail on sequential scans
+(and on heap access for the ETag lookups, which must be index-only).
+
+Run from the project root against a migrated database (alembic upgrade head):
+
+    python -m scripts.check_query_plans
+
+All seed rows are written inside one transaction that is rolled back at the end,
+so the script can be pointed at a shared development database.
+"""
+import asyncio
+import sys
+from uuid import uuid4
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from app.db.db_session import engine
+from app.crud.version_history import version_chain_query
+from app.crud.change_log import changelog_query, latest_version_query, newer_versions_query, version_diffs_query
+from app.crud.event import event_list_query, event_page_query, event_revision_query, events_in_window_query
+from app.crud.freebusy import busy_events_query
+from app.crud.collaboration import effective_role_query, notification_recipients_query
+from app.crud.user import user_by_email_query, users_by_ids_query
+from app.schema.event import SearchMode
+
+SEED_USERS = 2_000
+SEED_EVENTS = 20_000
+SEED_VERSIONS_PER_EVENT = 3
+HOT_TABLES = {"event", "eventpermission", "eventversion", "user"}
+# validators behind ETags / If-None-Match: answered from a covering index without reading the row
+INDEX_ONLY = {"get_event_revision", "get_latest_version_id"}
+
+SEED_STATEMENTS = [
+    f"""
+    INSERT INTO "user" (username, email, password_hashed, create_dtm)
+    SELECT 'plan_user_' || g, 'plan_user_' || g || '@example.com', 'x', now()
+    FROM generate_series(1, {SEED_USERS}) g
+    """,
+    f"""
+    INSERT INTO event (title, description, start_time, end_time, location, is_recurring, owner_id, create_dtm)
+    SELECT 'Plan event ' || g, 'seeded', now() + g * interval '1 hour', now() + g * interval '1 hour' + interval '30 minutes',
+           NULL, false, u.id, now()
+    FROM generate_series(1, {SEED_EVENTS}) g
+    JOIN LATERAL (SELECT id FROM "user" WHERE email = 'plan_user_' || (g % {SEED_USERS} + 1) || '@example.com') u ON true
+    """,
+    """
+    INSERT INTO eventpermission (event_id, user_id, permission)
+    SELECT id, owner_id, 'owner' FROM event WHERE description = 'seeded'
+    """,
+    f"""
+    INSERT INTO eventpermission (event_id, user_id, permission)
+    SELECT e.id, u.id, 'editor'
+    FROM event e
+    JOIN LATERAL (SELECT id FROM "user" WHERE email = 'plan_user_' || ((e.id * 7) % {SEED_USERS} + 1) || '@example.com') u ON true
+    WHERE e.description = 'seeded' AND u.id <> e.owner_id
+    """,
+    f"""
+    INSERT INTO eventversion (event_id, version_id, seq, is_snapshot, title, description, start_time, end_time, location,
+                              is_recurring, recurrence_pattern, owner_id, edited_by, edited_at)
+    SELECT e.id, gen_random_uuid(), {SEED_VERSIONS_PER_EVENT} + 1 - v, true, e.title, e.description, e.start_time, e.end_time, e.location,
+           e.is_recurring, NULL, e.owner_id, e.owner_id, now() - v * interval '1 minute'
+    FROM event e, generate_series(1, {SEED_VERSIONS_PER_EVENT}) v
+    WHERE e.description = 'seeded'
+    """,
+    # rows inserted into a GIN index wait in its pending list, which the planner costs as a full scan of it
+    "SELECT gin_clean_pending_list('ix_event_search_vector')",
+    "ANALYZE \"user\"",
+    "ANALYZE event",
+    "ANALYZE eventpermission",
+    "ANALYZE eventversion",
+]
+
+
+def hot_queries(event_id: int, user_id: int, email: str) -> dict:
+    # the statements app/crud issues for authorization and listing, built by the same query builders
+    window_start = datetime.now() + timedelta(days=100)
+    return {
+        "get_effective_role": effective_role_query(event_id, user_id),
+        "get_event_revision": event_revision_query(event_id),
+        "get_latest_version_id": latest_version_query(event_id),
+        "get_notification_recipients": notification_recipients_query(event_id),
+        "get_users_by_ids": users_by_ids_query([user_id, user_id + 1]),
+        "get_changelog_page": changelog_query(event_id, 2).limit(100),
+        "get_changelog_page (newer versions)": newer_versions_query(event_id, 2),
+        "get_event_versions_by_uuids": version_chain_query([uuid4(), uuid4()], event_id),
+        "get_version_diffs": version_diffs_query(event_id, uuid4(), uuid4()),
+        "get_user_by_email": user_by_email_query(email),
+        "get_all_event_of_current_user": event_list_query(user_id, "").limit(5).offset(0),
+        "get_all_event_of_current_user (window)": event_list_query(user_id, "", SearchMode.like, window_start, window_start + timedelta(days=7)).limit(5),
+        "get_event_page_of_current_user": event_page_query(user_id, None, "").limit(6),
+        "get_events_in_window": events_in_window_query(user_id, window_start, window_start + timedelta(days=7)),
+        "get_busy_events": busy_events_query(list(range(user_id, user_id + 200)), window_start, window_start + timedelta(days=31)),
+        # prefix searches as the API issues them (term:*), within the events the user can access: a rare
+        # term and words of every seeded title
+        "search_events_fulltext": event_list_query(user_id, f"{SEED_EVENTS // 10}", SearchMode.fulltext).limit(5),
+        "search_events_fulltext (common words)": event_list_query(user_id, "plan event", SearchMode.fulltext).limit(5),
+        "search_events_fulltext (cursor)": event_page_query(user_id, None, "plan event", SearchMode.fulltext).limit(6),
+    }
+
+
+def scan_types(plan: dict) -> set:
+    found = {plan["Node Type"]} if plan.get("Relation Name") in HOT_TABLES else set()
+    for child in plan.get("Plans", []):
+        found |= scan_types(child)
+    return found
+
+
+def seq_scans(plan: dict) -> list:
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in HOT_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+async def main() -> int:
+    failures = []
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            for statement in SEED_STATEMENTS:
+                await conn.execute(text(statement))
+            row = (await conn.execute(text(
+                "SELECT e.id, e.owner_id, u.email FROM event e JOIN \"user\" u ON u.id = e.owner_id "
+                "WHERE e.description = 'seeded' ORDER BY e.id DESC LIMIT 1"
+            ))).first()
+            for name, query in hot_queries(row.id, row.owner_id, row.email).items():
+                compiled = query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+                plan = (await conn.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))).scalar()[0]["Plan"]
+                scanned = seq_scans(plan)
+                status = "SEQ SCAN on " + ", ".join(scanned) if scanned else "ok"
+                if not scanned and name in INDEX_ONLY and scan_types(plan) != {"Index Only Scan"}:
+                    status = "NOT INDEX ONLY: " + ", ".join(sorted(scan_types(plan)))
+                print(f"{name:40} {status}")
+                if status != "ok":
+                    failures.append(name)
+        finally:
+            await transaction.rollback()
+    await engine.dispose()
+    if failures:
+        print(f"{len(failures)} hot queries fall back to sequential scans or heap reads: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
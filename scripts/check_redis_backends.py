@@ -0,0 +1,112 @@
+"""Run the Redis-protocol backends against the local stand-in (benchmarks.resp_sink) and fail on wrong results.
+
+    python -m scripts.check_redis_backends
+
+Checks that the response cache stores entries with their ttl and that invalidating
+a tag deletes every key it covers (and the tag set itself) on the server, leaving
+keys under other tags alone; and that a token revoked through one worker's
+Bloom-filtered revocation store is rejected by another worker after its next
+(incremental) sync, while tokens never revoked are answered from the filter, and
+that expired revocations are swept from both sorted sets. No database or Redis
+server is needed.
+"""
+import asyncio
+import sys
+import time
+from uuid import uuid4
+from redis.asyncio import Redis
+from app.services.response_cache import RedisBackend, ResponseCache, event_tag
+from app.services.revocation import BloomFilteredRevocationStore, RedisRevocationStore, token_key
+from benchmarks.resp_sink import RESPSink
+
+
+async def check_response_cache(sink: RESPSink) -> list:
+    failures = []
+    backend = RedisBackend(Redis.from_url(sink.url))
+    cache = ResponseCache(backend, ttl=60)
+    entries = {
+        "event:1:1:owner": (b"owner view", [event_tag(1)]),
+        "event:1:1:viewer": (b"viewer view", [event_tag(1)]),
+        "event:2:1:owner": (b"other event", [event_tag(2)]),
+    }
+    for key, (payload, tags) in entries.items():
+        await cache.set(key, payload, tags)
+    for key, (payload, _) in entries.items():
+        if await cache.get(key) != payload:
+            failures.append(f"get {key} did not return what was set")
+        if (backend.prefix + key).encode() not in sink.expires_at:
+            failures.append(f"{key} was stored without a ttl")
+    tag_key = backend._tag_key(event_tag(1)).encode()
+    if sink.data.get(tag_key) != {b"cems:cache:event:1:1:owner", b"cems:cache:event:1:1:viewer"}:
+        failures.append(f"tag set of {event_tag(1)} holds {sink.data.get(tag_key)}")
+    await cache.invalidate(event_tag(1))
+    for key in ("event:1:1:owner", "event:1:1:viewer"):
+        if await cache.get(key) is not None or (backend.prefix + key).encode() in sink.data:
+            failures.append(f"{key} survived invalidating {event_tag(1)}")
+    if tag_key in sink.data:
+        failures.append(f"tag set of {event_tag(1)} survived its invalidation")
+    if await cache.get("event:2:1:owner") != b"other event":
+        failures.append(f"invalidating {event_tag(1)} dropped a key tagged {event_tag(2)}")
+    await cache.close()
+    return failures
+
+
+def worker_store(sink: RESPSink) -> BloomFilteredRevocationStore:
+    # what build_revocation_store gives each worker for TOKEN_REVOCATION_BACKEND=redis
+    return BloomFilteredRevocationStore(RedisRevocationStore(Redis.from_url(sink.url)), capacity=1000, error_rate=0.01, full_sync_seconds=300)
+
+
+async def check_revocations(sink: RESPSink) -> list:
+    failures = []
+    first, second = worker_store(sink), worker_store(sink)
+    await first.sync()
+    await second.sync()
+    revoked, short_lived, never = (token_key(str(uuid4())) for _ in range(3))
+    await first.revoke(revoked, time.time() + 60)
+    await first.revoke(short_lived, time.time() + 1)
+    if not await first.is_revoked(revoked):
+        failures.append("a revoked token passes on the worker that revoked it")
+    await second.sync()
+    if not await second.is_revoked(revoked):
+        failures.append("a revoked token passes on another worker after its sync")
+    checks = second.backend_checks
+    if await second.is_revoked(never) or second.backend_checks != checks:
+        failures.append("a token never revoked was not answered by the Bloom filter")
+    syncs = second.stats()
+    if (syncs["full_syncs"], syncs["incremental_syncs"]) != (1, 1):
+        failures.append(f"expected one full and one incremental sync, got {syncs['full_syncs']} and {syncs['incremental_syncs']}")
+    await asyncio.sleep(1.1)
+    if await first.sweep() != 1:
+        failures.append("sweep did not remove exactly the expired revocation")
+    backend = first.backend
+    for key in (backend.key, backend.revoked_at_key):
+        if set(sink.data.get(key.encode(), {})) != {revoked.encode()}:
+            failures.append(f"{key} holds {sorted(sink.data.get(key.encode(), {}))} after the sweep")
+    if await second.is_revoked(short_lived):
+        failures.append("an expired revocation still rejects its token")
+    second.full_sync_seconds = 0
+    await second.sync()
+    if not await second.is_revoked(revoked):
+        failures.append("a revoked token passes after a full rebuild")
+    await first.close()
+    await second.close()
+    return failures
+
+
+async def main() -> int:
+    sink = RESPSink().start()
+    failures = []
+    try:
+        for name, check in [("response cache", check_response_cache), ("token revocation", check_revocations)]:
+            found = await check(sink)
+            print(f"{name:20} {'ok' if not found else 'FAILED'}")
+            for failure in found:
+                print(f"  {failure}")
+            failures.extend(found)
+    finally:
+        sink.stop()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))